@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+from pagination import InvalidQuery
+
+# ?period= -> column of calendar_days grouping the days
+PERIODS = {'day': 'c.day', 'week': 'c.week', 'month': 'c.month'}
+
+
+class Filters:
+    """Date range (?start=, ?end=), ?department= and ?period= of an /api/analytics request"""
+
+    def __init__(self, args, periods=tuple(PERIODS)):
+        self.start = self._date(args, 'start')
+        self.end = self._date(args, 'end')
+        if self.start and self.end and self.start > self.end:
+            raise InvalidQuery('end doit être postérieure à start')
+        self.department = args.get('department')
+        self.period = args.get('period', 'week')
+        if self.period not in periods:
+            raise InvalidQuery('period doit être : ' + ', '.join(periods))
+
+    @staticmethod
+    def _date(args, name):
+        if not args.get(name):
+            return None
+        try:
+            return date.fromisoformat(args[name][:10])
+        except ValueError:
+            raise InvalidQuery(f'Paramètre {name} invalide (format attendu : AAAA-MM-JJ)')
+
+    def where(self, column, department_column, weekly=False):
+        """WHERE clause and parameters of the filters
+
+        weekly: column holds the Monday of a week, so a week overlapping
+        start may begin up to 6 days before it.
+        """
+        clauses, params = ['1'], []
+        if self.start:
+            clauses.append(f'{column} >= ?')
+            params.append((self.start - timedelta(days=6) if weekly else self.start).isoformat())
+        if self.end:
+            clauses.append(f'{column} <= ?')
+            params.append(self.end.isoformat())
+        if self.department is not None:
+            clauses.append(f'{department_column} = ?')
+            params.append(self.department)
+        return ' AND '.join(clauses), params
+
+
+def utilization(cursor, filters):
+    """Available and assigned worker-days per period and worker department"""
+    clause, params = filters.where('a.day', 'a.department')
+    period = PERIODS[filters.period]
+    cursor.execute(f'''
+        SELECT {period} AS period, a.department, SUM(a.available) AS available_days,
+               SUM(a.assigned) AS assigned_days
+        FROM analytics_days a JOIN calendar_days c ON c.day = a.day
+        WHERE {clause}
+        GROUP BY {period}, a.department
+        HAVING SUM(a.available) != 0 OR SUM(a.assigned) != 0
+        ORDER BY period, a.department
+    ''', params)
+    rows = [dict(row) for row in cursor.fetchall()]
+    for row in rows:
+        available = row['available_days']
+        row['utilization'] = round(row['assigned_days'] / available, 4) if available else None
+    return rows
+
+
+def backlog(cursor, filters):
+    """Pending tasks per priority and required department
+
+    The date range keeps the tasks starting in it (by week); tasks without
+    a start date only count when there is no range.
+    """
+    clause, params = filters.where('week', 'department', weekly=True)
+    cursor.execute(f'''
+        SELECT priority, department, SUM(pending) AS pending
+        FROM analytics_backlog
+        WHERE {clause}
+        GROUP BY priority, department
+        HAVING SUM(pending) != 0
+        ORDER BY pending DESC, priority, department
+    ''', params)
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def lead_times(cursor, filters):
+    """Assignments made and average days from proposal to assignment
+
+    Per week, or per month (a week counts in the month of its Monday).
+    """
+    clause, params = filters.where('week', 'department', weekly=True)
+    period = 'substr(week, 1, 7)' if filters.period == 'month' else 'week'
+    cursor.execute(f'''
+        SELECT {period} AS period, SUM(assignments) AS assignments,
+               SUM(total_days) / SUM(assignments) AS average_days
+        FROM analytics_lead_times
+        WHERE {clause}
+        GROUP BY {period}
+        HAVING SUM(assignments) > 0
+        ORDER BY period
+    ''', params)
+    return [dict(row) for row in cursor.fetchall()]
@@ -10,6 +10,9 @@ let chiefs = [];
 let availabilityPeriods = [];
 let proposedTasks = [];
 let taskAssignments = [];
+let dataVersion = null;
+let currentTab = null;
+let eventSource = null;
 
 // API Helper Functions
 async function apiRequest(endpoint, method = 'GET', data = null) {
@@ -32,16 +35,22 @@ async function apiRequest(endpoint, method = 'GET', data = null) {
         const response = await fetch(fullUrl, options);
         
         if (!response.ok) {
-            throw new Error(`HTTP error! statut: ${response.status}`);
+            const error = new Error(`HTTP error! statut: ${response.status}`);
+            // Keep the server's answer (e.g. the conflicts of a 409)
+            error.status = response.status;
+            error.body = await response.json().catch(() => null);
+            throw error;
         }
         
         const result = await response.json();
         console.log('📥 Response:', result);
         return result;
-    } catch (error) {Admin
+    } catch (error) {
         console.error('❌ API request failed:', error);
         console.error('URL:', fullUrl);
-        updateConnectionStatus(false);
+        if (!error.status) {
+            updateConnectionStatus(false);
+        }
         throw error;
     }
 }
@@ -72,23 +81,54 @@ async function checkServerConnection() {
 }
 
 // Data Loading Functions
+const byCreatedDesc = (a, b) => b.created_at.localeCompare(a.created_at) || b.id - a.id;
+const byStartDate = (a, b) => a.start_date.localeCompare(b.start_date) || a.id - b.id;
+
+// Rows per page of the initial load: the first page of each list is enough to render
+const PAGE_SIZE = 200;
+
+// In-memory collections: list endpoint (paginated or not), /changes key, sort order
+const COLLECTIONS = [
+    { endpoint: '/workers', change: 'workers', compare: byCreatedDesc, paginated: true,
+      get: () => workers, set: rows => { workers = rows; } },
+    { endpoint: '/chiefs', change: 'chiefs', compare: byCreatedDesc, paginated: false,
+      get: () => chiefs, set: rows => { chiefs = rows; } },
+    { endpoint: '/availability', change: 'availability', compare: byStartDate, paginated: true,
+      get: () => availabilityPeriods, set: rows => { availabilityPeriods = rows; } },
+    { endpoint: '/tasks', change: 'tasks', compare: byCreatedDesc, paginated: true,
+      get: () => proposedTasks, set: rows => { proposedTasks = rows; } },
+    { endpoint: '/assignments', change: 'assignments', compare: byStartDate, paginated: true,
+      get: () => taskAssignments, set: rows => { taskAssignments = rows; } },
+];
+
+// Bumped by each full load: pages still arriving for an older one are dropped
+let loadGeneration = 0;
+// Ids patched by /changes while the remaining pages load, per /changes key: the
+// patch is at least as recent as a page, which may have been read before it
+let syncedDuringLoad = {};
+
 async function loadAllData() {
     try {
-        const [workersData, chiefsData, periodsData, tasksData, assignmentsData] = await Promise.all([
-            apiRequest('/workers'),
-            apiRequest('/chiefs'),
-            apiRequest('/availability'),
-            apiRequest('/tasks'),
-            apiRequest('/assignments')
-        ]);
-
-        workers = workersData;
-        chiefs = chiefsData;
-        availabilityPeriods = periodsData;
-        proposedTasks = tasksData;
-        taskAssignments = assignmentsData;
+        // Read the change version first so nothing written during the load is missed
+        const { version } = await apiRequest('/changes');
+
+        // First page of each list now, the rest in the background
+        const pages = await Promise.all(COLLECTIONS.map(collection =>
+            apiRequest(collection.paginated ? `${collection.endpoint}?limit=${PAGE_SIZE}` : collection.endpoint)
+        ));
+
+        const generation = ++loadGeneration;
+        syncedDuringLoad = {};
+        COLLECTIONS.forEach((collection, i) => {
+            const page = pages[i];
+            collection.set(collection.paginated ? page.items : page);
+            if (collection.paginated && page.next_cursor) {
+                loadRemainingPages(collection, page.next_cursor, generation);
+            }
+        });
+        dataVersion = version;
 
-        console.log('✅ Data loaded:', { 
+        console.log('✅ Data loaded (first pages):', { 
             workers: workers.length, 
             chiefs: chiefs.length, 
             periods: availabilityPeriods.length,
@@ -101,6 +141,56 @@ async function loadAllData() {
     }
 }
 
+async function loadRemainingPages(collection, cursor, generation) {
+    while (cursor) {
+        let page;
+        try {
+            page = await apiRequest(`${collection.endpoint}?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`);
+        } catch (error) {
+            console.warn(`⚠️ Chargement incomplet de ${collection.endpoint}`, error);
+            return;
+        }
+        if (generation !== loadGeneration) return;
+        const synced = syncedDuringLoad[collection.change] || new Set();
+        const rows = page.items.filter(row => !synced.has(row.id));
+        collection.set(patchArray(collection.get(), { deleted: [], upserted: rows }, collection.compare));
+        cursor = page.next_cursor;
+    }
+    console.log(`✅ ${collection.endpoint} loaded:`, collection.get().length);
+    refreshCurrentTab();
+}
+
+// Patch the in-memory arrays with what changed since dataVersion
+async function syncChanges() {
+    if (dataVersion === null) {
+        return loadAllData();
+    }
+
+    try {
+        const result = await apiRequest(`/changes?since=${dataVersion}`);
+        const { changes } = result;
+
+        for (const collection of COLLECTIONS) {
+            const change = changes[collection.change];
+            collection.set(patchArray(collection.get(), change, collection.compare));
+            const synced = syncedDuringLoad[collection.change] || (syncedDuringLoad[collection.change] = new Set());
+            change.deleted.forEach(id => synced.add(id));
+            change.upserted.forEach(row => synced.add(row.id));
+        }
+        dataVersion = result.version;
+
+        console.log('🔄 Changes applied up to version', dataVersion);
+    } catch (error) {
+        console.error('Failed to sync changes:', error);
+        await loadAllData();
+    }
+}
+
+function patchArray(items, change, compare) {
+    const removed = new Set([...change.deleted, ...change.upserted.map(row => row.id)]);
+    return items.filter(item => !removed.has(item.id)).concat(change.upserted).sort(compare);
+}
+
 // Utility Functions
 
 function formatDateEU(date) {
@@ -203,6 +293,7 @@ async function loginChief() {
 function logout() {
     currentUser = null;
     currentUserType = null;
+    unsubscribeFromEvents();
     document.getElementById('mainApp').style.display = 'none';
     document.getElementById('loginScreen').style.display = 'block';
     document.getElementById('adminUsername').value = '';
@@ -237,10 +328,58 @@ async function showMainApp() {
 
     updateFilterOptions();
     renderWorkers();
+    subscribeToEvents();
+}
+
+// Live updates: the server pushes a 'change' event for every write (SSE)
+let syncTimer = null;
+let filterTimer = null;
+let filterRequest = 0;
+
+function subscribeToEvents() {
+    if (eventSource || !window.EventSource) return;
+
+    eventSource = new EventSource(`${API_URL}/events`);
+    eventSource.addEventListener('change', scheduleSync);
+    eventSource.addEventListener('resync', async () => {
+        await loadAllData();
+        refreshCurrentTab();
+    });
+    eventSource.onopen = () => updateConnectionStatus(true);
+    eventSource.onerror = () => updateConnectionStatus(false);
+}
+
+function unsubscribeFromEvents() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+}
+
+function scheduleSync() {
+    // Bursts of changes are applied in a single /changes call
+    clearTimeout(syncTimer);
+    syncTimer = setTimeout(async () => {
+        await syncChanges();
+        refreshCurrentTab();
+    }, 300);
+}
+
+function refreshCurrentTab() {
+    // Don't replace the tab while a form is open
+    if (!currentTab || document.querySelector('.modal.active')) return;
+    if (currentTab === 'workers') {
+        updateFilterOptions();
+        filterWorkers();
+    } else {
+        switchTab(currentTab);
+    }
 }
 
 // Tab Switching
 function switchTab(tabName) {
+    currentTab = tabName;
+
     // Hide all tabs
     document.querySelectorAll('.tab-content').forEach(tab => tab.style.display = 'none');
     document.querySelectorAll('.tab').forEach(tab => tab.classList.remove('active'));
@@ -299,7 +438,7 @@ async function addWorker() {
 
     try {
         await apiRequest('/workers', 'POST', { name, department, workerChief, skills, phoneNumber, email });
-        await loadAllData();
+        await syncChanges();
         await loadSuggestions();
         closeModal('addWorkerModal');
         renderWorkers();
@@ -321,7 +460,7 @@ async function deleteWorker(workerId) {
     if (confirm('Etes vous sûr de vouloir supprimer cet alternant ?')) {
         try {
             await apiRequest(`/workers/${workerId}`, 'DELETE');
-            await loadAllData();
+            await syncChanges();
             renderWorkers();
         } catch (error) {
             alert('Failed to delete worker');
@@ -372,7 +511,7 @@ async function updateWorker() {
             email
         });
 
-        await loadAllData();
+        await syncChanges();
         await loadSuggestions();
         closeModal('editWorkerModal');
         renderWorkers();
@@ -409,7 +548,7 @@ async function addAvailability() {
 
     try {
         await apiRequest('/availability', 'POST', { workerId, startDate, endDate });
-        await loadAllData();
+        await syncChanges();
         // closeModal('addAvailabilityModal');
         // alert('Période ajoutée avec succès');
         renderWorkers();
@@ -426,7 +565,7 @@ async function deleteAvailabilityPeriod(periodId) {
     if (confirm('Etes vous sûr de vouloir supprimer cette période de disponibilité ?')) {
         try {
             await apiRequest(`/availability/${periodId}`, 'DELETE');
-            await loadAllData();
+            await syncChanges();
             renderWorkers();
         } catch (error) {
             alert('Failed to delete availability period');
@@ -473,7 +612,7 @@ async function proposeTask() {
             end_date: endDate
         });
 
-        await loadAllData();
+        await syncChanges();
         await loadSuggestions();
         closeModal('proposeTaskModal');
         renderProposedTasks();
@@ -494,7 +633,7 @@ async function deleteTask(taskId) {
     if (confirm('Etes vous sûr de vouloir supprimer cette tâche ?')) {
         try {
             await apiRequest(`/tasks/${taskId}`, 'DELETE');
-            await loadAllData();
+            await syncChanges();
             renderProposedTasks();
         } catch (error) {
             alert('Failed to delete task');
@@ -504,13 +643,16 @@ async function deleteTask(taskId) {
 
 // Matching Algorithm
 let matchingResults = null;
+let matchingPlan = null;
 
-async function runMatchingAlgorithm() {
+async function runMatchingAlgorithm(mode = 'top3') {
     try {
-        const result = await apiRequest('/match-tasks', 'POST');
+        const result = await apiRequest(`/match-tasks?mode=${mode}`, 'POST');
 
         // Normalize matches
         matchingResults = Array.isArray(result.matches) ? result.matches : [];
+        // Conflict-free plan, only returned by mode=optimal
+        matchingPlan = Array.isArray(result.plan) && result.plan.length > 0 ? result.plan : null;
 
         matchingResults.forEach(match => {
             // Ensure task.required_skills is always an array
@@ -554,15 +696,45 @@ async function confirmMatch(taskId, workerId, startDate, endDate, matchScore) {
             match_score: matchScore
         });
         
-        await loadAllData();
+        await syncChanges();
         await runMatchingAlgorithm();
         renderMatchingView();
         
     } catch (error) {
-        alert('Failed to confirm assignment');
+        alert(conflictMessage(error) || 'Failed to confirm assignment');
+    }
+}
+
+async function confirmPlan() {
+    if (!matchingPlan || !confirm(`Confirmer les ${matchingPlan.length} assignations du plan ?`)) {
+        return;
+    }
+
+    try {
+        await apiRequest('/assignments/confirm-batch', 'POST', matchingPlan);
+
+        matchingPlan = null;
+        await syncChanges();
+        await runMatchingAlgorithm();
+        renderMatchingView();
+
+    } catch (error) {
+        alert(conflictMessage(error) || 'Failed to confirm assignment plan');
     }
 }
 
+function conflictMessage(error) {
+    // 409 from the server: nothing was saved, list why
+    if (error.status !== 409 || !error.body) return null;
+
+    const lines = error.body.conflicts.map(conflict => {
+        const task = proposedTasks.find(t => t.id === conflict.task_id);
+        const worker = workers.find(w => w.id === conflict.worker_id);
+        return `• ${task ? task.title : 'Tâche ' + conflict.task_id} / ${worker ? worker.name : 'Alternant ' + conflict.worker_id} : ${conflict.error}`;
+    });
+    return `❌ ${error.body.error}\n\n${lines.join('\n')}`;
+}
+
 async function cancelAssignment(assignmentId) {
     if (!confirm('Etes vous sûr de vouloir annuler cette assignation ? La tâche reviendra au statut "En attente"')) {
         return;
@@ -570,7 +742,7 @@ async function cancelAssignment(assignmentId) {
     
     try {
         await apiRequest(`/assignments/${assignmentId}`, 'DELETE');
-        await loadAllData();
+        await syncChanges();
         alert('✅ Assignation annulée!');
         renderMatchingView();
     } catch (error) {
@@ -595,7 +767,7 @@ async function addChief() {
 
     try {
         await apiRequest('/chiefs', 'POST', { name, department, email });
-        await loadAllData();
+        await syncChanges();
         await loadSuggestions();
         closeModal('addChiefModal');
         renderChiefs();
@@ -613,7 +785,7 @@ async function deleteChief(chiefId) {
     if (confirm('Etes vous sûr de vouloir supprimer ce responsable ?')) {
         try {
             await apiRequest(`/chiefs/${chiefId}`, 'DELETE');
-            await loadAllData();
+            await syncChanges();
             await loadSuggestions();
             renderChiefs();
         } catch (error) {
@@ -654,7 +826,7 @@ async function updateChief() {
             email
         });
 
-        await loadAllData();
+        await syncChanges();
         await loadSuggestions();
         closeModal('editChiefModal');
         renderChiefs();
@@ -703,27 +875,54 @@ function updateFilterOptions() {
     }
 }
 
-function filterWorkers() {
+function scheduleFilterWorkers() {
+    // Typing filters once the user pauses instead of on every keystroke
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(filterWorkers, 250);
+}
+
+async function filterWorkers() {
+    // Only the latest call renders: answers to earlier ones may arrive after it
+    const request = ++filterRequest;
     const searchTerm = document.getElementById('searchWorkers').value.toLowerCase();
     const skillFilter = document.getElementById('skillFilter').value;
     const departmentFilter = document.getElementById('departmentFilter').value;
     const availabilityFilter = document.getElementById('availabilityFilter').value;
+    const availableFrom = document.getElementById('availableFromFilter').value;
+    const availableTo = document.getElementById('availableToFilter').value;
 
-    console.log('🔍 Filtering with:', { searchTerm, skillFilter, departmentFilter, availabilityFilter });
+    console.log('🔍 Filtering with:', { searchTerm, skillFilter, departmentFilter, availabilityFilter, availableFrom, availableTo });
 
-    const filtered = workers.filter(worker => {
-        const matchesSearch = worker.name.toLowerCase().includes(searchTerm);
-        const matchesSkill = !skillFilter || (worker.skills && worker.skills.includes(skillFilter));
-        const matchesDepartment = !departmentFilter || worker.department === departmentFilter;
-        
-        let matchesAvailability = true;
-        if (availabilityFilter === 'available') {
-            const workerPeriods = availabilityPeriods.filter(p => p.worker_id === worker.id);
-            matchesAvailability = workerPeriods.length > 0;
+    // Free-for-range check is answered by the server-side availability index
+    let freeWorkerIds = null;
+    if (availableFrom && availableTo) {
+        try {
+            const freeWorkers = await apiRequest(`/workers/available?start=${availableFrom}&end=${availableTo}`);
+            freeWorkerIds = new Set(freeWorkers.map(w => w.id));
+        } catch (error) {
+            console.warn('⚠️ Impossible de filtrer par période de disponibilité');
         }
+        if (request !== filterRequest) return;
+    }
 
-        return matchesSearch && matchesSkill && matchesDepartment && matchesAvailability;
-    });
+    // Name, skill, department and availability filters run server-side on indexed columns
+    let candidates = workers;
+    if (searchTerm || skillFilter || departmentFilter || availabilityFilter === 'available') {
+        const params = new URLSearchParams();
+        if (searchTerm) params.set('name', searchTerm);
+        if (skillFilter) params.set('skill', skillFilter);
+        if (departmentFilter) params.set('department', departmentFilter);
+        if (availabilityFilter === 'available') params.set('available', '1');
+        try {
+            candidates = await apiRequest(`/workers?${params}`);
+        } catch (error) {
+            console.warn('⚠️ Impossible de filtrer les alternants');
+            return;
+        }
+        if (request !== filterRequest) return;
+    }
+
+    const filtered = candidates.filter(worker => !freeWorkerIds || freeWorkerIds.has(worker.id));
 
     console.log(`🔍 Filtered: ${filtered.length} of ${workers.length} workers`);
     renderWorkers(filtered);
@@ -994,9 +1193,19 @@ function renderMatchingView() {
                         ${pendingTasks.length} tâche(s) en attente(s) | ${assignedTasks.length} mission(s) assignée(s)
                     </p>
                 </div>
-                <button class="btn btn-primary" onclick="runMatchingAlgorithm()">
-                    🤖 Lancer l'analyse de correspondance
-                </button>
+                <div style="display: flex; gap: 10px;">
+                    <button class="btn btn-primary" onclick="runMatchingAlgorithm()">
+                        🤖 Lancer l'analyse de correspondance
+                    </button>
+                    <button class="btn btn-secondary" onclick="runMatchingAlgorithm('optimal')">
+                        🧩 Plan optimal
+                    </button>
+                    ${matchingPlan ? `
+                        <button class="btn btn-success" onclick="confirmPlan()">
+                            ✓ Tout confirmer (${matchingPlan.length})
+                        </button>
+                    ` : ''}
+                </div>
             </div>
 
             ${matchingResults && matchingResults.length > 0 ? `
@@ -0,0 +1,109 @@
+"""Production server: the Flask routes under uvicorn (ASGI)
+
+    python asgi.py
+
+(uvicorn and a2wsgi are in requirements.txt)
+
+`python server.py` stays the development server. Here the routes run in a
+fixed pool of threads (server.threads), /api/events is served natively by
+the event loop so an open stream holds no thread, and SIGTERM/Ctrl+C
+drains the running requests before closing the database connections.
+"""
+import asyncio
+from a2wsgi import WSGIMiddleware
+from omegaconf import OmegaConf
+import uvicorn
+import events
+from init_db import init_db
+from server import app as flask_app, cfg, pool, job_pool, matcher
+
+HOST = OmegaConf.select(cfg, 'server.host', default='0.0.0.0')
+PORT = OmegaConf.select(cfg, 'server.port', default=8050)
+HEARTBEAT = OmegaConf.select(cfg, 'events.heartbeat', default=15)
+
+wsgi = WSGIMiddleware(flask_app, workers=OmegaConf.select(cfg, 'server.threads', default=16))
+
+
+async def stream_events(scope, receive, send):
+    """/api/events on the event loop, same stream as the Flask route"""
+    headers = dict(scope['headers'])
+    last_event_id = headers.get(b'last-event-id', b'').decode()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+
+    async def pump():
+        stream = events.astream(events.broadcaster,
+                                int(last_event_id) if last_event_id.isdigit() else None,
+                                heartbeat=HEARTBEAT)
+        async for chunk in stream:
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    # Runs until the client goes away or the server shuts down (end of pump)
+    streaming = asyncio.ensure_future(pump())
+    watching = asyncio.ensure_future(disconnected())
+    await asyncio.wait((streaming, watching), return_when=asyncio.FIRST_COMPLETED)
+    watching.cancel()
+    if streaming.done():
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    else:
+        streaming.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            init_db()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # uvicorn has stopped accepting requests and drained the open ones
+            await asyncio.get_running_loop().run_in_executor(None, job_pool.shutdown)
+            matcher.shutdown()
+            pool.close_all()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['path'] == '/api/events' and scope['method'] == 'GET':
+        await stream_events(scope, receive, send)
+    else:
+        await wsgi(scope, receive, send)
+
+
+class Server(uvicorn.Server):
+    async def shutdown(self, sockets=None):
+        # Event streams never end by themselves: close them so the drain can finish
+        events.broadcaster.close()
+        await super().shutdown(sockets)
+
+
+if __name__ == '__main__':
+    # One process: the caches, indexes and ETag versions live in memory
+    server = Server(uvicorn.Config(
+        app,
+        host=HOST,
+        port=PORT,
+        workers=1,
+        limit_concurrency=OmegaConf.select(cfg, 'server.max_connections', default=None),
+        timeout_graceful_shutdown=OmegaConf.select(cfg, 'server.shutdown_timeout', default=10),
+    ))
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        # uvicorn re-raises Ctrl+C once the shutdown is complete
+        pass
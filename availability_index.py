@@ -0,0 +1,138 @@
+import threading
+from collections import defaultdict
+from intervals import IntervalSet, to_day, to_days
+import changes
+
+
+class AvailabilityIndex:
+    """Process-wide interval index over availability periods and assignments.
+
+    Loaded lazily from the database on first use, then kept up to date by the
+    write endpoints through changes.notify() instead of being reloaded.
+    Rows whose dates do not parse are left out.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.periods = defaultdict(IntervalSet)
+        self.all_periods = IntervalSet()
+        self.assignments = defaultdict(IntervalSet)
+        self.all_assignments = IntervalSet()
+
+    def load(self, conn):
+        """Build the index from the database (no-op once loaded)"""
+        with self.lock:
+            if self.loaded:
+                return
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, worker_id, start_date, end_date FROM availability_periods')
+            for row in cursor.fetchall():
+                self._add_period(row)
+            cursor.execute('''
+                SELECT id, worker_id, start_date, end_date FROM task_assignments
+                WHERE status = 'assignée'
+            ''')
+            for row in cursor.fetchall():
+                self._add_assignment(row)
+            self.loaded = True
+
+    def reset(self):
+        """Drop everything; the next query reloads from the database"""
+        with self.lock:
+            self.loaded = False
+            self.periods.clear()
+            self.all_periods = IntervalSet()
+            self.assignments.clear()
+            self.all_assignments = IntervalSet()
+
+    @staticmethod
+    def _interval(row):
+        """(start, end, id) of a row, None when its dates do not parse"""
+        days = to_days(row['start_date'], row['end_date'])
+        return None if days is None else (*days, row['id'])
+
+    def _add_period(self, row):
+        item = self._interval(row)
+        if item is None:
+            return
+        start, end, key = item
+        # The row may already be there if the index was loaded after the commit
+        for intervals, item in ((self.periods[row['worker_id']], (start, end, key)),
+                                (self.all_periods, (start, end, (row['worker_id'], key)))):
+            intervals.remove(*item)
+            intervals.add(*item)
+
+    def _remove_period(self, row):
+        item = self._interval(row)
+        if item is None:
+            return
+        start, end, key = item
+        self.periods[row['worker_id']].remove(start, end, key)
+        self.all_periods.remove(start, end, (row['worker_id'], key))
+
+    def _add_assignment(self, row):
+        item = self._interval(row)
+        if item is None:
+            return
+        for intervals in (self.assignments[row['worker_id']], self.all_assignments):
+            intervals.remove(*item)
+            intervals.add(*item)
+
+    def _remove_assignment(self, row):
+        item = self._interval(row)
+        if item is None:
+            return
+        self.assignments[row['worker_id']].remove(*item)
+        self.all_assignments.remove(*item)
+
+    def on_change(self, table, op, row):
+        with self.lock:
+            if not self.loaded:
+                return
+            if table == 'availability_periods':
+                if op == 'insert':
+                    self._add_period(row)
+                elif op == 'delete':
+                    self._remove_period(row)
+            elif table == 'task_assignments':
+                if op == 'insert' and row.get('status', 'assignée') == 'assignée':
+                    self._add_assignment(row)
+                elif op == 'delete':
+                    self._remove_assignment(row)
+            elif table == 'workers' and op == 'delete':
+                for start, end, key in self.periods.pop(row['id'], ()):
+                    self.all_periods.remove(start, end, (row['id'], key))
+                for item in self.assignments.pop(row['id'], ()):
+                    self.all_assignments.remove(*item)
+
+    def is_free(self, worker_id, start, end):
+        """Worker has one period covering [start, end] and no assignment overlapping it"""
+        periods = self.periods.get(worker_id)
+        if not periods or not periods.covers(start, end):
+            return False
+        assignments = self.assignments.get(worker_id)
+        return not assignments or not assignments.overlaps(start, end)
+
+    def free_workers(self, start_date, end_date):
+        """Ids of the workers free for the whole of [start_date, end_date]
+
+        One query over the periods of every worker finds the ones covering
+        the range, then only those workers are checked for an assignment.
+        """
+        start, end = to_day(start_date), to_day(end_date)
+        with self.lock:
+            covered = {worker_id for _, _, (worker_id, _) in self.all_periods.covering(start, end)}
+            return [worker_id for worker_id in sorted(covered)
+                    if worker_id not in self.assignments
+                    or not self.assignments[worker_id].overlaps(start, end)]
+
+    def overlapping_assignments(self, start_date, end_date):
+        """Ids of the assignments sharing at least one day with [start_date, end_date]"""
+        start, end = to_day(start_date), to_day(end_date)
+        with self.lock:
+            return [key for _, _, key in self.all_assignments.overlapping(start, end)]
+
+
+index = AvailabilityIndex()
+changes.listen(index.on_change)
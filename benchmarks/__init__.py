@@ -0,0 +1 @@
+"""Synthetic data generator and benchmarks: python -m benchmarks --help"""
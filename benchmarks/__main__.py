@@ -0,0 +1,136 @@
+"""Benchmark the API and the matcher on a synthetic database
+
+    python -m benchmarks --scale small -o results.json
+    python -m benchmarks --workers 5000 --tasks 2000 --mix benchmarks/mix.jsonl
+    python -m benchmarks compare before.json after.json
+
+Runs from a temporary directory holding its own config.yaml and database,
+so the real database is never touched.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='pairtache-bench-')
+    db_path = os.path.join(workdir, 'bench.db')
+    with open(os.path.join(workdir, 'config.yaml'), 'w') as f:
+        f.write(f'db:\n  path: {db_path}\nmatching:\n  backend: {args.backend}\nmetrics:\n  log: false\n')
+    # server.py and init_db.py read ./config.yaml when imported
+    os.chdir(workdir)
+    from benchmarks.datagen import SCALES, generate
+
+    workers, tasks, periods = SCALES[args.scale]
+    workers = args.workers or workers
+    tasks = args.tasks or tasks
+    periods = args.periods or periods
+
+    start = time.perf_counter()
+    counts = generate(db_path, workers, tasks, periods, seed=args.seed)
+    generation = time.perf_counter() - start
+    print(f'📦 {counts} generated in {generation:.1f}s', file=sys.stderr)
+
+    import server
+    from benchmarks import micro, replay
+
+    results = {
+        'commit': git_commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'seed': args.seed,
+        'rows': counts,
+        'generation_s': generation,
+    }
+    if not args.skip_micro:
+        results['micro'] = micro.run(server, repeat=args.repeat)
+    if args.mix:
+        results['replay'] = replay.replay(server, replay.load_mix(args.mix), args.requests,
+                                          args.concurrency, seed=args.seed)
+    return results
+
+
+def compare(before_path, after_path, threshold):
+    """Print the p50 of each benchmark of two result files; exit 1 on a regression"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def timings(results):
+        rows = {name: stats['p50_ms'] for name, stats in results.get('micro', {}).items()}
+        for route, stats in results.get('replay', {}).get('routes', {}).items():
+            rows[f'replay {route}'] = stats['p50_ms']
+        return rows
+
+    old, new = timings(before), timings(after)
+    regressions = 0
+    print(f"{'benchmark':60} {before.get('commit') or 'before':>10} {after.get('commit') or 'after':>10}")
+    for name in sorted(old.keys() & new.keys()):
+        ratio = new[name] / old[name] if old[name] else 1
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  ⚠️'
+            regressions += 1
+        print(f'{name:60} {old[name]:9.2f}ms {new[name]:9.2f}ms  x{ratio:.2f}{flag}')
+    return 1 if regressions else 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        parser = argparse.ArgumentParser(prog='python -m benchmarks compare')
+        parser.add_argument('before')
+        parser.add_argument('after')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='slowdown ratio reported as a regression (default 0.2 = +20%%)')
+        args = parser.parse_args(sys.argv[2:])
+        sys.exit(compare(args.before, args.after, args.threshold))
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--scale', default='tiny', choices=['tiny', 'small', 'medium', 'large'],
+                        help='10², 10³, 10⁴ or 10⁵ workers and tasks')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--tasks', type=int)
+    parser.add_argument('--periods', type=int, help='availability periods per worker')
+    parser.add_argument('--backend', default='python', choices=['python', 'numpy'])
+    parser.add_argument('--repeat', type=int, default=20, help='runs per micro-benchmark')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--mix', help='JSONL request mix to replay (e.g. benchmarks/mix.jsonl)')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='JSON file (default: stdout)')
+    args = parser.parse_args()
+    # Paths are relative to where the command runs, not to the benchmark directory
+    args.mix = args.mix and os.path.abspath(args.mix)
+    args.output = args.output and os.path.abspath(args.output)
+
+    results = run(args)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
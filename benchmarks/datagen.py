@@ -0,0 +1,126 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+from init_db import init_db, add_skills
+
+FIRST_NAMES = ['Camille', 'Lucas', 'Léa', 'Hugo', 'Chloé', 'Louis', 'Manon', 'Nathan', 'Inès', 'Jules',
+               'Emma', 'Théo', 'Sarah', 'Tom', 'Jade', 'Enzo', 'Lina', 'Maël', 'Clara', 'Noah']
+LAST_NAMES = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy',
+              'Moreau', 'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux']
+DEPARTMENTS = ['Informatique', 'Data', 'RH', 'Finance', 'Logistique', 'Production', 'Qualité',
+               'Marketing', 'Achats', 'Juridique', 'Communication', 'Maintenance']
+SKILLS = ['Python', 'SQL', 'Excel', 'Power BI', 'Java', 'JavaScript', 'R', 'Machine Learning',
+          'Gestion de projet', 'Anglais', 'Communication', 'Comptabilité', 'SAP', 'Word', 'Soudure',
+          'Cariste', 'Électricité', 'Mécanique', 'Hygiène', 'Sécurité', 'Audit', 'Paie',
+          'Recrutement', 'Négociation', 'Logistique', 'Supply chain', 'Photoshop', 'Rédaction',
+          'Marketing digital', 'Droit social', 'Statistiques', 'Docker', 'Linux', 'Réseau',
+          'Agronomie', 'Contrôle qualité', 'Lean', 'Vente', 'Service client', 'Allemand']
+PRIORITIES = ['basse', 'moyenne', 'haute']
+TASK_WORDS = ['Inventaire', 'Tableau de bord', 'Audit', 'Migration', 'Formation', 'Rapport',
+              'Nettoyage des données', 'Support', 'Préparation', 'Contrôle', 'Saisie', 'Étude']
+
+# Named scales: workers, tasks, availability periods per worker
+SCALES = {
+    'tiny': (100, 100, 3),
+    'small': (1_000, 1_000, 3),
+    'medium': (10_000, 10_000, 3),
+    'large': (100_000, 100_000, 2),
+}
+
+
+def _skills(rng, count):
+    # Zipf-like: a few skills are very common, most are rare
+    weights = [1 / (rank + 1) for rank in range(len(SKILLS))]
+    return sorted(set(rng.choices(SKILLS, weights, k=count)))
+
+
+def generate(db_path, workers=1_000, tasks=1_000, periods_per_worker=3, chiefs=None,
+             days=365, assigned_ratio=0.3, seed=0):
+    """Fill a fresh database (init_db schema) with synthetic data
+
+    db_path must be the path of the current config.yaml. Returns the row
+    count of each table.
+    """
+    rng = random.Random(seed)
+    init_db()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    first_day = date(date.today().year, 1, 1)
+    day = lambda n: (first_day + timedelta(days=n)).isoformat()
+
+    chiefs = chiefs or max(1, workers // 20)
+    cursor.executemany('INSERT INTO chiefs (name, department, email) VALUES (?, ?, ?)', [
+        (f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', rng.choice(DEPARTMENTS), f'chef{i}@example.com')
+        for i in range(chiefs)
+    ])
+    chief_rows = cursor.execute('SELECT id, name FROM chiefs').fetchall()
+
+    worker_rows = []
+    for i in range(workers):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        worker_rows.append((name, rng.choice(DEPARTMENTS), rng.choice(chief_rows)[1],
+                            _skills(rng, rng.randint(1, 6)), f'06{rng.randrange(10**8):08d}',
+                            f'alternant{i}@example.com'))
+    cursor.executemany('''
+        INSERT INTO workers (name, department, worker_chief, skills, phone_number, email)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(*row[:3], ','.join(row[3]), *row[4:]) for row in worker_rows])
+    worker_ids = [row[0] for row in cursor.execute('SELECT id FROM workers ORDER BY id')]
+    add_skills(cursor, 'worker_skills', 'worker_id',
+               [(worker_id, row[3]) for worker_id, row in zip(worker_ids, worker_rows)])
+
+    # Alternating school/company periods: disjoint periods per worker
+    periods = []
+    for worker_id in worker_ids:
+        start = rng.randrange(0, 30)
+        for _ in range(periods_per_worker):
+            length = rng.randint(7, 60)
+            if start + length >= days:
+                break
+            periods.append((worker_id, day(start), day(start + length)))
+            start += length + rng.randint(7, 30)
+    cursor.executemany('INSERT INTO availability_periods (worker_id, start_date, end_date) VALUES (?, ?, ?)',
+                       periods)
+
+    task_rows = []
+    for i in range(tasks):
+        chief_id, chief_name = rng.choice(chief_rows)
+        start = rng.randrange(0, days - 15)
+        task_rows.append((chief_id, chief_name, f'{rng.choice(TASK_WORDS)} {i}', 'Tâche générée',
+                          _skills(rng, rng.randint(0, 4)), rng.choice(DEPARTMENTS + ['']),
+                          rng.choice(PRIORITIES), rng.randint(1, 10), day(start),
+                          day(start + rng.randint(0, 10))))
+    cursor.executemany('''
+        INSERT INTO proposed_tasks
+        (chief_id, chief_name, title, description, required_skills, required_department,
+         priority, estimated_days, start_date, end_date, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'en attente')
+    ''', [(*row[:4], ','.join(row[4]), *row[5:]) for row in task_rows])
+    task_ids = [row[0] for row in cursor.execute('SELECT id FROM proposed_tasks ORDER BY id')]
+    add_skills(cursor, 'task_skills', 'task_id',
+               [(task_id, row[4]) for task_id, row in zip(task_ids, task_rows)])
+
+    # Confirm some tasks to random workers, without double-booking anyone
+    booked = {}
+    assignments = []
+    for task_id, row in zip(task_ids, task_rows):
+        if rng.random() >= assigned_ratio:
+            continue
+        worker_id = rng.choice(worker_ids)
+        start_date, end_date = row[8], row[9]
+        if any(s <= end_date and e >= start_date for s, e in booked.get(worker_id, ())):
+            continue
+        booked.setdefault(worker_id, []).append((start_date, end_date))
+        assignments.append((task_id, worker_id, start_date, end_date, rng.randint(40, 100)))
+    cursor.executemany('''
+        INSERT INTO task_assignments (task_id, worker_id, start_date, end_date, match_score, status)
+        VALUES (?, ?, ?, ?, ?, 'assignée')
+    ''', assignments)
+    cursor.executemany("UPDATE proposed_tasks SET status = 'assignée', matched_worker_id = ? WHERE id = ?",
+                       [(row[1], row[0]) for row in assignments])
+
+    conn.commit()
+    counts = {table: cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('workers', 'chiefs', 'availability_periods', 'proposed_tasks', 'task_assignments')}
+    conn.close()
+    return counts
@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+
+LIST_ENDPOINTS = [
+    '/api/workers',
+    '/api/workers?limit=100',
+    '/api/chiefs',
+    '/api/availability',
+    '/api/tasks',
+    '/api/tasks?status=en+attente&limit=100',
+    '/api/assignments',
+    '/api/assignments?limit=100',
+]
+
+# Single overlap groups (tasks x candidate workers) solved by mode=optimal: the
+# worst case, every task of the batch sharing a day
+ASSIGNMENT_SIZES = [(500, 500), (1000, 1000), (2000, 1000)]
+
+
+def assignment_weights(n_rows, n_cols, candidates=50, seed=0):
+    """Random scores of `candidates` workers per task, as built by optimal_plan"""
+    rng = random.Random(seed)
+    return {(row, col): rng.uniform(1, 100)
+            for row in range(n_rows) for col in rng.sample(range(n_cols), candidates)}
+
+
+def summarize(durations):
+    """Timing statistics of a list of durations (seconds), in milliseconds"""
+    ordered = sorted(durations)
+    percentile = lambda p: ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+    return {
+        'runs': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'min_ms': ordered[0] * 1000,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def measure(function, repeat, before=None):
+    """Run function `repeat` times (after `before`, untimed) and summarize"""
+    durations = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def _request(client, method, path, **kwargs):
+    def run():
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {path}: {response.status_code} {response.get_data(as_text=True)[:200]}')
+        response.get_data()
+    return run
+
+
+def run(server, repeat=20):
+    """Time the matcher, the suggestions and each list endpoint"""
+    import matching
+
+    client = server.app.test_client()
+    results = {}
+
+    conn = server.pool.acquire()
+    pending = [dict(row) for row in conn.execute("SELECT * FROM proposed_tasks WHERE status = 'en attente'")]
+    workers = [dict(row) for row in conn.execute('SELECT * FROM workers')]
+    availability = [dict(row) for row in conn.execute('SELECT * FROM availability_periods')]
+    assignments = [dict(row) for row in conn.execute("SELECT * FROM task_assignments WHERE status = 'assignée'")]
+    conn.close()
+
+    # The matcher alone, then through the API (cold cache, then warm)
+    match_repeat = max(1, repeat // 5)
+    results['matching.match_tasks'] = measure(
+        lambda: matching.match_tasks(pending, workers, availability, assignments,
+                                     backend=server.MATCHING_BACKEND), match_repeat)
+    reset_cache = server.match_cache.clear if server.match_cache is not None else None
+    results['POST /api/match-tasks (cold)'] = measure(
+        _request(client, 'POST', '/api/match-tasks'), match_repeat, before=reset_cache)
+    results['POST /api/match-tasks (warm)'] = measure(_request(client, 'POST', '/api/match-tasks'), repeat)
+    results['POST /api/match-tasks?mode=optimal'] = measure(
+        _request(client, 'POST', '/api/match-tasks?mode=optimal'), match_repeat)
+    for n_rows, n_cols in ASSIGNMENT_SIZES:
+        weights = assignment_weights(n_rows, n_cols)
+        results[f'matching.solve_assignment {n_rows}x{n_cols}'] = measure(
+            lambda: matching.solve_assignment(weights, n_rows, n_cols), match_repeat)
+
+    results['GET /api/suggestions/skills (cold)'] = measure(
+        _request(client, 'GET', '/api/suggestions/skills'), repeat, before=server.suggestions.index.reset)
+    results['GET /api/suggestions/skills'] = measure(_request(client, 'GET', '/api/suggestions/skills'), repeat)
+    results['GET /api/suggestions/skills?q=p&limit=10'] = measure(
+        _request(client, 'GET', '/api/suggestions/skills?q=p&limit=10'), repeat)
+
+    for path in LIST_ENDPOINTS:
+        results[f'GET {path}'] = measure(_request(client, 'GET', path), repeat)
+    return results
@@ -0,0 +1,68 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from benchmarks.micro import summarize
+
+
+def load_mix(path):
+    """Request mix, one JSON object per line:
+
+        {"method": "GET", "path": "/api/workers", "weight": 10}
+        {"method": "POST", "path": "/api/workers", "json": {...}, "weight": 1}
+
+    Blank lines and lines starting with # are skipped.
+    """
+    mix = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                entry = json.loads(line)
+                entry.setdefault('method', 'GET')
+                entry.setdefault('weight', 1)
+                mix.append(entry)
+    return mix
+
+
+def replay(server, mix, requests=1000, concurrency=4, seed=0):
+    """Send `requests` requests drawn from the weighted mix over `concurrency` threads
+
+    Returns the throughput and the latency percentiles, overall and per entry.
+    """
+    rng = random.Random(seed)
+    plan = rng.choices(mix, [entry['weight'] for entry in mix], k=requests)
+    lock = threading.Lock()
+    durations = defaultdict(list)
+    statuses = defaultdict(int)
+
+    def worker(entries):
+        client = server.app.test_client()
+        for entry in entries:
+            start = time.perf_counter()
+            response = client.open(entry['path'], method=entry['method'], json=entry.get('json'))
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            with lock:
+                durations[f"{entry['method']} {entry['path']}"].append(elapsed)
+                statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(plan[i::concurrency],)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    every = [duration for values in durations.values() for duration in values]
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'wall_s': wall,
+        'throughput_rps': requests / wall,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'latency': summarize(every),
+        'routes': {route: summarize(values) for route, values in sorted(durations.items())},
+    }
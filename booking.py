@@ -0,0 +1,130 @@
+import json
+from intervals import IntervalSet, to_day
+
+
+class Conflict(Exception):
+    """Assignments rejected as a whole; conflicts lists what is wrong with each one"""
+
+    def __init__(self, conflicts):
+        super().__init__(f'{len(conflicts)} conflit(s)')
+        self.conflicts = conflicts
+
+
+def _conflict(position, item, error, **details):
+    return {'index': position, 'task_id': item.get('task_id'), 'worker_id': item.get('worker_id'),
+            'error': error, **details}
+
+
+def check(cursor, items):
+    """Conflicts of a batch of assignments with the database and with each other
+
+    Each item needs task_id, worker_id, start_date and end_date. Overlaps with
+    the worker's confirmed assignments are found by one query over all the
+    items, through the (worker_id, start_date, end_date) index.
+    """
+    conflicts = []
+    valid = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not all(item.get(field) for field in
+                                                 ('task_id', 'worker_id', 'start_date', 'end_date')):
+            conflicts.append(_conflict(position, item if isinstance(item, dict) else {},
+                                       'Champs task_id, worker_id, start_date et end_date requis'))
+            continue
+        try:
+            start, end = to_day(item['start_date']), to_day(item['end_date'])
+        except (TypeError, ValueError):
+            conflicts.append(_conflict(position, item, 'Dates invalides (format attendu : AAAA-MM-JJ)'))
+            continue
+        if start > end:
+            conflicts.append(_conflict(position, item, 'start_date postérieure à end_date'))
+            continue
+        valid.append((position, item, start, end))
+
+    batch = json.dumps([{'position': position, 'task_id': item['task_id'], 'worker_id': item['worker_id'],
+                         'start_date': item['start_date'], 'end_date': item['end_date']}
+                        for position, item, _, _ in valid])
+
+    cursor.execute('''
+        SELECT json_extract(b.value, '$.position') AS position,
+               t.id AS task_id, t.status, w.id AS worker_id
+        FROM json_each(?) b
+        LEFT JOIN proposed_tasks t ON t.id = json_extract(b.value, '$.task_id')
+        LEFT JOIN workers w ON w.id = json_extract(b.value, '$.worker_id')
+    ''', (batch,))
+    rows = {row['position']: row for row in cursor.fetchall()}
+
+    cursor.execute('''
+        SELECT json_extract(b.value, '$.position') AS position,
+               a.id, a.task_id, a.start_date, a.end_date
+        FROM json_each(?) b
+        JOIN task_assignments a
+          ON a.worker_id = json_extract(b.value, '$.worker_id')
+         AND a.start_date <= json_extract(b.value, '$.end_date')
+         AND a.end_date >= json_extract(b.value, '$.start_date')
+        WHERE a.status = 'assignée'
+        ORDER BY a.start_date
+    ''', (batch,))
+    overlaps = {}
+    for row in cursor.fetchall():
+        overlaps.setdefault(row['position'], row)
+
+    # Items of the batch are also checked against each other
+    booked = {}
+    tasks = {}
+    for position, item, start, end in valid:
+        row = rows[position]
+        if row['task_id'] is None:
+            conflicts.append(_conflict(position, item, 'Tâche inconnue'))
+        elif row['worker_id'] is None:
+            conflicts.append(_conflict(position, item, 'Alternant inconnu'))
+        elif row['status'] == 'assignée':
+            conflicts.append(_conflict(position, item, 'Tâche déjà assignée'))
+        elif item['task_id'] in tasks:
+            conflicts.append(_conflict(position, item, 'Tâche présente deux fois dans le lot',
+                                       other_index=tasks[item['task_id']]))
+        elif position in overlaps:
+            existing = overlaps[position]
+            conflicts.append(_conflict(
+                position, item,
+                f"Alternant déjà assigné du {existing['start_date']} au {existing['end_date']}",
+                assignment_id=existing['id'], other_task_id=existing['task_id']))
+        else:
+            intervals = booked.setdefault(item['worker_id'], IntervalSet())
+            other = next(intervals.overlapping(start, end), None)
+            if other is not None:
+                conflicts.append(_conflict(position, item, 'Chevauche une autre assignation du lot',
+                                           other_index=other[2]))
+                continue
+            intervals.add(start, end, position)
+            tasks[item['task_id']] = position
+
+    return sorted(conflicts, key=lambda conflict: conflict['index'])
+
+
+def confirm(cursor, items):
+    """Insert a batch of assignments and mark their tasks assigned, or raise Conflict
+
+    The caller's transaction should be BEGIN IMMEDIATE, so that no other
+    writer can book the same worker between the check and the inserts.
+    Returns the inserted rows, for changes.notify().
+    """
+    conflicts = check(cursor, items)
+    if conflicts:
+        raise Conflict(conflicts)
+
+    cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', ('task_assignments',))
+    first_id = (cursor.fetchone() or {'seq': 0})['seq'] + 1
+    cursor.executemany('''
+        INSERT INTO task_assignments
+        (task_id, worker_id, start_date, end_date, match_score, status)
+        VALUES (?, ?, ?, ?, ?, 'assignée')
+    ''', [(item['task_id'], item['worker_id'], item['start_date'], item['end_date'],
+           item.get('match_score', 0)) for item in items])
+    cursor.executemany('UPDATE proposed_tasks SET status = ?, matched_worker_id = ? WHERE id = ?',
+                       [('assignée', item['worker_id'], item['task_id']) for item in items])
+
+    cursor.execute('''
+        SELECT id, task_id, worker_id, start_date, end_date, status FROM task_assignments
+        WHERE id >= ? ORDER BY id
+    ''', (first_id,))
+    return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+from datetime import date
+
+# Rows inserted per executemany call
+BATCH_SIZE = 500
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class RowError(ValueError):
+    """Invalid import line (reported with its line number)"""
+
+
+def upload_format(request):
+    """'csv' or 'jsonl', from ?format= or the Content-Type of the upload"""
+    if request.args.get('format'):
+        return request.args['format']
+    mimetype = request.files['file'].mimetype if 'file' in request.files else request.mimetype
+    return 'jsonl' if 'json' in mimetype else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) from a binary CSV or JSON Lines stream
+
+    A line that cannot be parsed yields (line number, RowError) instead. A
+    CSV file the reader cannot go on with raises RowError naming the line.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'jsonl':
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, RowError('JSON invalide')
+                continue
+            yield number, row if isinstance(row, dict) else RowError('Objet JSON attendu')
+    elif fmt == 'csv':
+        header = text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(header, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        try:
+            fields = next(csv.reader([header], dialect), [])
+        except csv.Error as e:
+            raise RowError(f'CSV invalide ligne 1 : {e}')
+        reader = csv.DictReader(text, fields, dialect=dialect)
+        rows = iter(reader)
+        while True:
+            # The header is line 1, the next record starts after the lines read so far
+            start = reader.line_num + 2
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                raise RowError(f'CSV invalide ligne {start} : {e}')
+            # +1: the header was read before the reader started counting
+            yield reader.line_num + 1, row
+    else:
+        raise RowError(f'Format inconnu : {fmt} (csv ou jsonl)')
+
+
+def _text(row, field, required=False):
+    value = row.get(field)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int, float))):
+        raise RowError(f'Champ {field} : texte attendu')
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'Champ {field} requis')
+    return value
+
+
+def _integer(row, field, default=None):
+    if isinstance(row.get(field), (bool, list, dict)):
+        raise RowError(f'Champ {field} : nombre entier attendu')
+    value = _text(row, field, required=default is None)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f'Champ {field} : nombre entier attendu')
+
+
+def _date(row, field, required=True):
+    value = row.get(field)
+    if value is not None and not isinstance(value, str):
+        raise RowError(f'Champ {field} : date AAAA-MM-JJ attendue')
+    value = _text(row, field, required)
+    if value:
+        try:
+            value = date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise RowError(f'Champ {field} : date AAAA-MM-JJ attendue')
+    return value or None
+
+
+def _skills(row, field):
+    value = row.get(field) or []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(skill, str) for skill in value):
+        raise RowError(f'Champ {field} : liste de compétences attendue')
+    return [skill.strip() for skill in value if skill.strip()]
+
+
+def _period(row):
+    start_date, end_date = _date(row, 'start_date'), _date(row, 'end_date')
+    if start_date > end_date:
+        raise RowError('start_date postérieure à end_date')
+    return start_date, end_date
+
+
+def worker_values(row, context):
+    """Validated worker row (columns of the workers table, skills as a list)"""
+    return {
+        'name': _text(row, 'name', required=True),
+        'department': _text(row, 'department'),
+        'worker_chief': _text(row, 'worker_chief'),
+        'skills': _skills(row, 'skills'),
+        'phone_number': _text(row, 'phone_number') or None,
+        'email': _text(row, 'email'),
+    }
+
+
+def availability_values(row, context):
+    """Validated availability period of an existing worker"""
+    worker_id = _integer(row, 'worker_id')
+    if worker_id not in context['worker_ids']:
+        raise RowError(f'Alternant {worker_id} inconnu')
+    start_date, end_date = _period(row)
+    return {'worker_id': worker_id, 'start_date': start_date, 'end_date': end_date}
+
+
+def task_values(row, context):
+    """Validated task of an existing chief; the chief's name is filled in when missing"""
+    chief_id = _integer(row, 'chief_id')
+    if chief_id not in context['chiefs']:
+        raise RowError(f'Responsable {chief_id} inconnu')
+    start_date, end_date = _period(row)
+    return {
+        'chief_id': chief_id,
+        'chief_name': _text(row, 'chief_name') or context['chiefs'][chief_id],
+        'title': _text(row, 'title', required=True),
+        'description': _text(row, 'description'),
+        'required_skills': _skills(row, 'required_skills'),
+        'required_department': _text(row, 'required_department'),
+        'priority': _text(row, 'priority') or 'medium',
+        'estimated_days': _integer(row, 'estimated_days', default=1),
+        'start_date': start_date,
+        'end_date': end_date,
+        'status': 'en attente',
+    }
+
+
+def write_csv(rows, columns):
+    """Yield a CSV document line by line"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
@@ -0,0 +1,269 @@
+import json
+import threading
+from intervals import to_day
+import change_log
+
+# Day states of /api/calendar runs
+UNAVAILABLE, FREE, ASSIGNED = 0, 1, 2
+
+# Tables whose change_log entries make a persisted calendar stale
+TABLES = ('availability_periods', 'task_assignments', 'workers')
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def column_counts(bitmaps, width):
+    """Number of bitmaps having bit d set, for each d < width
+
+    The bitmaps are added as binary numbers written vertically (one int per
+    bit of the counter), so each addition is a few big-int operations over
+    every day at once instead of one test per worker and per day.
+    """
+    planes = []
+    for bits in bitmaps:
+        for i in range(len(planes)):
+            carry = planes[i] & bits
+            planes[i] ^= bits
+            bits = carry
+            if not bits:
+                break
+        if bits:
+            planes.append(bits)
+    return [sum(((plane >> day) & 1) << weight for weight, plane in enumerate(planes)) for day in range(width)]
+
+
+def runs(free, assigned, width):
+    """Run-length encoding of the days 0..width-1: [state, length, state, length, ...]"""
+    full = (1 << width) - 1
+    # Bit d is set where day d+1 differs from day d
+    edges = ((free ^ (free >> 1)) | (assigned ^ (assigned >> 1))) & (full >> 1)
+    encoded = []
+    start = 0
+    while start < width:
+        if edges:
+            lowest = edges & -edges
+            edges ^= lowest
+            end = lowest.bit_length()
+        else:
+            end = width
+        state = FREE if free >> start & 1 else ASSIGNED if assigned >> start & 1 else UNAVAILABLE
+        encoded += [state, end - start]
+        start = end
+    return encoded
+
+
+class DayCalendars:
+    """Per-worker calendars as bitsets of days: bit n is the day `epoch + n`.
+
+    `available` is the union of a worker's availability periods, `assigned`
+    the union of their confirmed assignments; the free days are
+    available & ~assigned. Free-day counts and team capacity are then
+    AND/popcount operations instead of date string comparisons. Days before
+    the epoch are never available.
+
+    A day is free here exactly when /api/workers/available would answer the
+    worker for that single day. A run of free days may however span two
+    adjacent periods, whereas /api/workers/available and the matcher want a
+    single period covering the whole range (periods.compact merges them).
+
+    The bitsets are kept in memory, rebuilt per worker when changes.notify()
+    reports a change, and saved to worker_calendars along with the change_log
+    version they reflect, so a restart only replays the changes made since.
+    Saving is left to save(), run by the caller as a write operation.
+    """
+
+    def __init__(self, epoch='2020-01-01'):
+        self.epoch = epoch
+        self.origin = to_day(epoch)
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.available = {}
+        self.assigned = {}
+        self.dirty = set()
+        # Workers whose calendar save() still has to write (None: all), and the version they reflect
+        self.unsaved = set()
+        self.unsaved_version = None
+
+    def reset(self):
+        """Drop everything; the next query reloads from the database"""
+        with self.lock:
+            self.loaded = False
+            self.available.clear()
+            self.assigned.clear()
+            self.dirty.clear()
+            self.unsaved, self.unsaved_version = set(), None
+
+    def days(self, start_date, end_date):
+        """Bits of the days [start_date, end_date]"""
+        start = max(to_day(start_date), self.origin)
+        end = to_day(end_date)
+        if end < start:
+            return 0
+        return ((1 << (end - start + 1)) - 1) << (start - self.origin)
+
+    def _row_days(self, row):
+        """Bits of the days of a stored period or assignment, 0 when its dates do not parse"""
+        try:
+            return self.days(row['start_date'], row['end_date'])
+        except (TypeError, ValueError):
+            return 0
+
+    def window(self, bits, start, width):
+        """The `width` bits of a calendar from day number `start` on"""
+        offset = start - self.origin
+        bits = bits >> offset if offset >= 0 else bits << -offset
+        return bits & ((1 << width) - 1)
+
+    def free(self, worker_id):
+        return self.available.get(worker_id, 0) & ~self.assigned.get(worker_id, 0)
+
+    def on_change(self, table, op, row):
+        if table not in TABLES or (table == 'workers' and op != 'delete'):
+            return
+        with self.lock:
+            if self.loaded:
+                self.dirty.add(row['id'] if table == 'workers' else row['worker_id'])
+
+    def load(self, conn):
+        """Read the saved calendars, replaying the changes made since (no-op once loaded)"""
+        with self.lock:
+            if self.loaded:
+                return
+            version = self._version(conn)
+            saved = conn.execute('SELECT epoch, version FROM calendar_meta').fetchone()
+            stale = self._stale_workers(conn, saved['version']) if saved and saved['epoch'] == self.epoch else None
+            if stale is None:
+                self._build(conn)
+                self.unsaved, self.unsaved_version = None, version
+            else:
+                for row in conn.execute('SELECT * FROM worker_calendars'):
+                    self.available[row['worker_id']] = int.from_bytes(row['available'], 'little')
+                    self.assigned[row['worker_id']] = int.from_bytes(row['assigned'], 'little')
+                self.dirty = stale
+            self.loaded = True
+
+    def refresh(self, conn):
+        """Load, then rebuild the calendars of the workers changed since; reads only"""
+        self.load(conn)
+        with self.lock:
+            if not self.dirty:
+                return
+            # Read first: every change up to this version has been committed
+            version = self._version(conn)
+            dirty, self.dirty = self.dirty, set()
+            self._build(conn, dirty)
+            if self.unsaved is not None:
+                self.unsaved |= dirty
+            self.unsaved_version = version
+
+    def save(self, cursor):
+        """Write the calendars rebuilt since the last save (an operation for server.write)"""
+        with self.lock:
+            if self.unsaved_version is None:
+                return
+            worker_ids, version = self.unsaved, self.unsaved_version
+            self.unsaved, self.unsaved_version = set(), None
+            try:
+                self._save(cursor, worker_ids, version)
+            except Exception:
+                # Left for the next save
+                self.unsaved, self.unsaved_version = worker_ids, version
+                raise
+
+    @staticmethod
+    def _version(conn):
+        return conn.execute('SELECT COALESCE(MAX(version), 0) AS version FROM change_log').fetchone()['version']
+
+    @staticmethod
+    def _stale_workers(conn, since):
+        """Workers changed after version `since`, None when a full rebuild is needed"""
+        if since > DayCalendars._version(conn):
+            # The database was restored from an older copy
+            return None
+        if since < change_log.complete_since(conn):
+            # The changes made since were pruned from the log
+            return None
+        changed = conn.execute(f'''
+            SELECT DISTINCT table_name, row_id, op FROM change_log
+            WHERE version > ? AND table_name IN ({', '.join('?' * len(TABLES))})
+        ''', (since, *TABLES)).fetchall()
+        stale = set()
+        rows = {'availability_periods': [], 'task_assignments': []}
+        for entry in changed:
+            if entry['table_name'] == 'workers':
+                if entry['op'] == 'delete':
+                    stale.add(entry['row_id'])
+            elif entry['op'] == 'delete':
+                # The deleted row no longer tells whose calendar it was in
+                return None
+            else:
+                rows[entry['table_name']].append(entry['row_id'])
+        for table, ids in rows.items():
+            if ids:
+                stale.update(row['worker_id'] for row in conn.execute(
+                    f'SELECT worker_id FROM {table} WHERE id IN (SELECT value FROM json_each(?))',
+                    (json.dumps(ids),)))
+        return stale
+
+    def _build(self, conn, worker_ids=None):
+        """Recompute the calendars of some workers (all when worker_ids is None)"""
+        ids = json.dumps(sorted(worker_ids)) if worker_ids is not None else None
+        available = dict.fromkeys(worker_ids or (), 0)
+        assigned = dict.fromkeys(worker_ids or (), 0)
+        for row in conn.execute('''
+            SELECT worker_id, start_date, end_date FROM availability_periods
+            WHERE ? IS NULL OR worker_id IN (SELECT value FROM json_each(?))
+        ''', (ids, ids)):
+            days = self._row_days(row)
+            available[row['worker_id']] = available.get(row['worker_id'], 0) | days
+        for row in conn.execute('''
+            SELECT worker_id, start_date, end_date FROM task_assignments
+            WHERE status = 'assignée' AND (? IS NULL OR worker_id IN (SELECT value FROM json_each(?)))
+        ''', (ids, ids)):
+            days = self._row_days(row)
+            assigned[row['worker_id']] = assigned.get(row['worker_id'], 0) | days
+
+        if worker_ids is None:
+            self.available.clear()
+            self.assigned.clear()
+        for worker_id in set(available) | set(assigned):
+            for calendars, bits in ((self.available, available), (self.assigned, assigned)):
+                if bits.get(worker_id):
+                    calendars[worker_id] = bits[worker_id]
+                else:
+                    calendars.pop(worker_id, None)
+
+    def _save(self, cursor, worker_ids, version):
+        """Write the calendars of some workers (all when None) and the version they reflect"""
+        if worker_ids is None:
+            cursor.execute('DELETE FROM worker_calendars')
+            worker_ids = set(self.available) | set(self.assigned)
+        else:
+            cursor.executemany('DELETE FROM worker_calendars WHERE worker_id = ?',
+                               [(worker_id,) for worker_id in worker_ids])
+        kept = [worker_id for worker_id in worker_ids if worker_id in self.available or worker_id in self.assigned]
+        cursor.executemany('INSERT INTO worker_calendars (worker_id, available, assigned) VALUES (?, ?, ?)', [
+            (worker_id, *(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+                          for bits in (self.available.get(worker_id, 0), self.assigned.get(worker_id, 0))))
+            for worker_id in kept
+        ])
+        cursor.execute('INSERT OR REPLACE INTO calendar_meta (id, epoch, version) VALUES (1, ?, ?)',
+                       (self.epoch, version))
+
+    def free_days(self, worker_id, start_date, end_date):
+        """Number of free days of a worker in [start_date, end_date]"""
+        return popcount(self.free(worker_id) & self.days(start_date, end_date))
+
+    def matrix(self, worker_ids, start_date, end_date):
+        """Free days, day runs and per-day free capacity of some workers over a window"""
+        start, width = to_day(start_date), to_day(end_date) - to_day(start_date) + 1
+        with self.lock:
+            free = [self.window(self.free(worker_id), start, width) for worker_id in worker_ids]
+            assigned = [self.window(self.assigned.get(worker_id, 0), start, width) for worker_id in worker_ids]
+        return {
+            'free_days': [popcount(bits) for bits in free],
+            'runs': [runs(f, a, width) for f, a in zip(free, assigned)],
+            'capacity': column_counts(free, width),
+        }
@@ -0,0 +1,63 @@
+"""Retention of the change_log table read by /api/changes
+
+    python change_log.py prune [--dry-run]
+
+deletes the entries older than the retention of ./config.yaml
+(changes.retention.versions / days). It can run with the server up, or use
+POST /api/changes/prune instead. A client whose version is older than what
+is kept gets 410 from /api/changes and reloads everything.
+"""
+
+# Default retention: versions behind the latest, days
+KEEP_VERSIONS = 100000
+KEEP_DAYS = 30
+
+
+def complete_since(cursor):
+    """Lowest `since` for which the log still holds every later change"""
+    oldest = cursor.execute('SELECT MIN(version) FROM change_log').fetchone()[0]
+    return 0 if oldest is None else oldest - 1
+
+
+def prune(cursor, keep_versions=None, keep_days=None):
+    """Delete the entries more than keep_versions behind the latest or older than keep_days
+
+    The latest entry is always kept: its version is the current one.
+    Returns the number of entries deleted.
+    """
+    latest = cursor.execute('SELECT COALESCE(MAX(version), 0) FROM change_log').fetchone()[0]
+    limit = 0
+    if keep_versions is not None:
+        limit = max(limit, latest - keep_versions)
+    if keep_days is not None:
+        limit = max(limit, cursor.execute('''
+            SELECT COALESCE(MAX(version), 0) FROM change_log WHERE changed_at < datetime('now', ?)
+        ''', (f'-{keep_days} days',)).fetchone()[0])
+    limit = min(limit, latest - 1)
+    return cursor.execute('DELETE FROM change_log WHERE version <= ?', (limit,)).rowcount
+
+
+if __name__ == '__main__':
+    import argparse
+    import sqlite3
+    from omegaconf import OmegaConf
+
+    parser = argparse.ArgumentParser(description="Purge le journal des modifications")
+    parser.add_argument('command', choices=['prune'])
+    parser.add_argument('--dry-run', action='store_true', help='affiche le résultat sans rien écrire')
+    args = parser.parse_args()
+
+    cfg = OmegaConf.load('config.yaml')
+    conn = sqlite3.connect(cfg.db.path)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    deleted = prune(cursor,
+                    keep_versions=OmegaConf.select(cfg, 'changes.retention.versions', default=KEEP_VERSIONS),
+                    keep_days=OmegaConf.select(cfg, 'changes.retention.days', default=KEEP_DAYS))
+    kept = cursor.execute('SELECT COUNT(*) FROM change_log').fetchone()[0]
+    if args.dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    print(f"{'🔎' if args.dry_run else '✅'} {deleted} entrées supprimées, {kept} conservées")
+    conn.close()
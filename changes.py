@@ -0,0 +1,13 @@
+_listeners = []
+
+
+def listen(listener):
+    """Register listener(table, op, row), called after each committed write"""
+    _listeners.append(listener)
+    return listener
+
+
+def notify(table, op, row):
+    """Tell the in-memory indexes that a row was inserted, updated or deleted"""
+    for listener in _listeners:
+        listener(table, op, row)
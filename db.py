@@ -0,0 +1,116 @@
+import queue
+import sqlite3
+import threading
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'mmap_size': 268435456,
+    'cache_size': -16000,
+}
+
+
+class PooledConnection:
+    """sqlite3 connection borrowed from a ConnectionPool; close() gives it back"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """Keeps up to `size` idle SQLite connections with the pragmas already applied"""
+
+    def __init__(self, path, size=8, pragmas=None, timeout=5.0, uri=False):
+        self.path = path
+        self.uri = uri
+        self.size = size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.in_use = 0
+        self.retired = False
+
+    def connect(self):
+        """New connection with the pragmas applied, outside the pool"""
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, uri=self.uri)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            hit = True
+        except queue.Empty:
+            conn = self.connect()
+            hit = False
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.in_use += 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        with self._lock:
+            self.in_use -= 1
+        # Whatever the request left uncommitted (e.g. after an exception) is dropped
+        if conn.in_transaction:
+            conn.rollback()
+        if not self.retired and self._idle.qsize() < self.size:
+            self._idle.put(conn)
+            if self.retired:
+                # retire() ran meanwhile
+                self.close_all()
+        else:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def retire(self):
+        """Close the idle connections now and the borrowed ones when they come back"""
+        self.retired = True
+        self.close_all()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': self._idle.qsize(),
+                'in_use': self.in_use,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+import changes
+
+
+class Broadcaster:
+    """Fan-out of change notifications to any number of subscribers.
+
+    Events go into one shared ring buffer with increasing ids; a subscriber
+    is only the id of the last event it has seen, so publishing costs the
+    same whatever the number of idle connections.
+    """
+
+    def __init__(self, backlog=1000):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=backlog)
+        self.last_id = 0
+        self.closed = False
+        # asyncio subscribers: one wake-up event per event loop, not per client
+        self._loops = set()
+        self._wakeups = {}
+
+    def publish(self, name, data):
+        with self._condition:
+            self.last_id += 1
+            self._events.append((self.last_id, name, data))
+            self._condition.notify_all()
+            loops = list(self._loops)
+        self._wake_loops(loops)
+
+    def close(self):
+        """End every stream (server shutdown)"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            loops = list(self._loops)
+        self._wake_loops(loops)
+
+    def _wake_loops(self, loops):
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                # Loop closed
+                with self._condition:
+                    self._loops.discard(loop)
+
+    def _wake(self, loop):
+        wakeup = self._wakeups.pop(loop, None)
+        if wakeup is not None:
+            wakeup.set()
+
+    def events_after(self, event_id):
+        """Events newer than event_id, or None if some were already dropped from the buffer"""
+        if self._events and event_id < self._events[0][0] - 1:
+            return None
+        return [event for event in self._events if event[0] > event_id]
+
+    def wait(self, event_id, timeout):
+        """Block until there are events newer than event_id (or timeout)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.last_id > event_id or self.closed, timeout)
+            return self.events_after(event_id)
+
+    async def wait_async(self, event_id, timeout):
+        """wait() for asyncio code: the loop keeps serving while nothing happens"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            self._loops.add(loop)
+        deadline = time.monotonic() + timeout
+        while self.last_id <= event_id and not self.closed:
+            wakeup = self._wakeups.setdefault(loop, asyncio.Event())
+            remaining = deadline - time.monotonic()
+            if self.last_id > event_id or self.closed or remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        with self._condition:
+            return self.events_after(event_id)
+
+
+def format_event(event_id, name, data):
+    return f'id: {event_id}\nevent: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+def stream(broadcaster, last_event_id=None, heartbeat=15):
+    """Server-Sent Events stream, from last_event_id if the client reconnects"""
+    yield 'retry: 3000\n\n'
+    seen = broadcaster.last_id if last_event_id is None else last_event_id
+    while not broadcaster.closed:
+        events = broadcaster.wait(seen, heartbeat)
+        if events is None:
+            # Too far behind: the client has to reload everything
+            seen = broadcaster.last_id
+            yield format_event(seen, 'resync', {})
+        elif not events:
+            yield ': heartbeat\n\n'
+        for event_id, name, data in events or ():
+            seen = event_id
+            yield format_event(event_id, name, data)
+
+
+async def astream(broadcaster, last_event_id=None, heartbeat=15):
+    """stream() as an async generator, for the ASGI server"""
+    yield 'retry: 3000\n\n'
+    seen = broadcaster.last_id if last_event_id is None else last_event_id
+    while not broadcaster.closed:
+        events = await broadcaster.wait_async(seen, heartbeat)
+        if events is None:
+            seen = broadcaster.last_id
+            yield format_event(seen, 'resync', {})
+        elif not events:
+            yield ': heartbeat\n\n'
+        for event_id, name, data in events or ():
+            seen = event_id
+            yield format_event(event_id, name, data)
+
+
+broadcaster = Broadcaster()
+
+
+@changes.listen
+def _on_change(table, op, row):
+    broadcaster.publish('change', {'table': table, 'op': op, 'id': row.get('id')})
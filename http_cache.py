@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from functools import wraps
+from flask import request, Response
+import versions
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Versions restart from zero with the process: the boot id keeps old ETags from matching
+BOOT_ID = uuid.uuid4().hex[:8]
+
+COMPRESSIBLE = {'application/json', 'application/javascript', 'text/javascript',
+                'text/html', 'text/css', 'text/plain', 'image/svg+xml'}
+
+# A year: asset URLs change with their content (?v=<hash>)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def etag_for(*tables, table_versions=None):
+    """Strong ETag of a GET response: data version of its tables plus the URL
+
+    table_versions: versions the data was read at, when not the current
+    ones (a response served from a snapshot).
+    """
+    if table_versions is None:
+        table_versions = versions.get(*tables)
+    key = f'{BOOT_ID}:{table_versions}:{request.full_path}'
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def is_fresh(etag):
+    """True if the client's If-None-Match holds etag, in any content encoding"""
+    tags = request.if_none_match
+    return any(tags.contains(tag) for tag in (etag, f'{etag}-gzip', f'{etag}-br'))
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def conditional(*tables, snapshot=None):
+    """Answer GETs with 304 while none of `tables` changed, before the view runs
+
+    snapshot: the snapshot.Snapshot the view may read from; when it answers
+    the request, the ETag is made from the versions of its copy.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            generation = snapshot.current() if snapshot is not None else None
+            etag = etag_for(*tables, table_versions=generation and generation.versions(tables))
+            if is_fresh(etag):
+                return not_modified(etag)
+
+            response = view(*args, **kwargs)
+            if not isinstance(response, Response):
+                return response
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def compress(response, min_size=1024, level=6):
+    """Gzip or Brotli encode a text response larger than min_size bytes"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=min(level, 11))
+    else:
+        data = gzip.compress(data, compresslevel=level, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+
+    # A strong ETag names one exact byte sequence, so each encoding gets its own
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+    return response
+
+
+class StaticFiles:
+    """Static files read once per modification, with content-hash ETags.
+
+    index.html is rewritten so its local scripts and images point to
+    `path?v=<hash>`: those URLs change with the file and can be cached for
+    a year, while index.html itself is revalidated on every load.
+    """
+
+    ASSET_LINK = re.compile(r'''(src|href)="(?!https?:|mailto:|/|#)([^"?]+)"''')
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._files = {}
+        self._index = None
+
+    def _load(self, path):
+        """(bytes, digest) of a file, or None if it is missing"""
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep) or not os.path.isfile(full_path):
+            return None
+        mtime = os.stat(full_path).st_mtime_ns
+        cached = self._files.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(full_path, 'rb') as f:
+                data = f.read()
+            cached = self._files[path] = (mtime, data, hashlib.sha1(data).hexdigest()[:12])
+        return cached[1], cached[2]
+
+    def _read(self, path):
+        content = self._load(path)
+        if path != 'index.html' or content is None:
+            return content
+
+        # Rewritten again only when index.html or one of its assets changed
+        html = content[0].decode()
+        links = {link: self._load(link) for _, link in self.ASSET_LINK.findall(html)}
+        key = (content[1], tuple((link, asset and asset[1]) for link, asset in links.items()))
+        if self._index is None or self._index[0] != key:
+            def versioned(match):
+                attribute, link = match.groups()
+                if links[link] is None:
+                    return match.group(0)
+                return f'{attribute}="{link}?v={links[link][1]}"'
+            data = self.ASSET_LINK.sub(versioned, html).encode()
+            self._index = (key, data, hashlib.sha1(data).hexdigest()[:12])
+        return self._index[1], self._index[2]
+
+    def response(self, path):
+        """The file as a Response (304 when unchanged), or None if missing"""
+        content = self._read(path)
+        if content is None:
+            return None
+        data, digest = content
+
+        if is_fresh(digest):
+            response = not_modified(digest)
+        else:
+            response = Response(data, mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            response.set_etag(digest)
+        # Only the hashed URL is immutable: a plain URL may serve new content tomorrow
+        response.headers['Cache-Control'] = IMMUTABLE if request.args.get('v') == digest else 'no-cache'
+        return response
@@ -84,5 +84,357 @@ def init_db():
     ''')
     
     conn.commit()    
+    migrate(conn)
     conn.close()
-    print("✅ Database initialized successfully")
\ No newline at end of file
+    print("✅ Database initialized successfully")
+
+
+# Schema migrations, applied in order. PRAGMA user_version stores how many
+# of them the database already has, so each one runs exactly once.
+
+def add_indexes(cursor):
+    """Secondary indexes for the date-range, status and join lookups"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_availability_worker_dates ON availability_periods(worker_id, start_date, end_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_worker_dates ON task_assignments(worker_id, start_date, end_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_task ON task_assignments(task_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON proposed_tasks(status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_chief ON proposed_tasks(chief_id)')
+
+
+def add_skills_tables(cursor):
+    """Normalized skills, backfilled from the comma-separated columns"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS skills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS worker_skills (
+            worker_id INTEGER NOT NULL,
+            skill_id INTEGER NOT NULL,
+            PRIMARY KEY (worker_id, skill_id),
+            FOREIGN KEY (worker_id) REFERENCES workers(id) ON DELETE CASCADE,
+            FOREIGN KEY (skill_id) REFERENCES skills(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_skills (
+            task_id INTEGER NOT NULL,
+            skill_id INTEGER NOT NULL,
+            PRIMARY KEY (task_id, skill_id),
+            FOREIGN KEY (task_id) REFERENCES proposed_tasks(id) ON DELETE CASCADE,
+            FOREIGN KEY (skill_id) REFERENCES skills(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_worker_skills_skill ON worker_skills(skill_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_skills_skill ON task_skills(skill_id)')
+
+    cursor.execute('SELECT id, skills FROM workers WHERE skills IS NOT NULL')
+    for worker_id, csv in cursor.fetchall():
+        set_skills(cursor, 'worker_skills', 'worker_id', worker_id, csv.split(','))
+    cursor.execute('SELECT id, required_skills FROM proposed_tasks WHERE required_skills IS NOT NULL')
+    for task_id, csv in cursor.fetchall():
+        set_skills(cursor, 'task_skills', 'task_id', task_id, csv.split(','))
+
+
+def add_list_indexes(cursor):
+    """Indexes behind the filters and keyset pagination of the list endpoints"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workers_created ON workers(created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workers_department ON workers(department)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_created ON proposed_tasks(created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_availability_start ON availability_periods(start_date, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_start ON task_assignments(start_date, id)')
+
+
+# Rows whose serialized form embeds columns of another table: when the
+# parent row changes, the dependent rows are logged as updated too.
+CHANGE_LOG_DEPENDENTS = {
+    'workers': "SELECT 'task_assignments', id, 'update' FROM task_assignments WHERE worker_id = NEW.id",
+    'proposed_tasks': "SELECT 'task_assignments', id, 'update' FROM task_assignments WHERE task_id = NEW.id",
+    'chiefs': '''SELECT 'task_assignments', a.id, 'update' FROM task_assignments a
+                 JOIN proposed_tasks t ON t.id = a.task_id WHERE t.chief_id = NEW.id''',
+}
+
+
+def add_change_log(cursor):
+    """change_log table filled by triggers, read by /api/changes"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    for table in ('workers', 'chiefs', 'availability_periods', 'proposed_tasks', 'task_assignments'):
+        for op, event, row in (('insert', 'INSERT', 'NEW'), ('update', 'UPDATE', 'NEW'), ('delete', 'DELETE', 'OLD')):
+            dependents = ''
+            if op == 'update' and table in CHANGE_LOG_DEPENDENTS:
+                dependents = f'INSERT INTO change_log (table_name, row_id, op) {CHANGE_LOG_DEPENDENTS[table]};'
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_log_{op} AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+                    {dependents}
+                END
+            ''')
+
+
+def add_calendars(cursor):
+    """Saved day bitsets of calendars.DayCalendars and the change_log version they reflect"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS worker_calendars (
+            worker_id INTEGER PRIMARY KEY,
+            available BLOB NOT NULL,
+            assigned BLOB NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS calendar_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            epoch TEXT NOT NULL,
+            version INTEGER NOT NULL
+        )
+    ''')
+
+
+# FTS5 index -> (indexed table, columns)
+SEARCH_INDEXES = {
+    'workers_fts': ('workers', ('name', 'department', 'skills', 'worker_chief')),
+    'tasks_fts': ('proposed_tasks', ('title', 'description', 'required_skills')),
+}
+
+
+def add_search_index(cursor):
+    """FTS5 indexes of workers and tasks for /api/search, kept in sync by triggers
+
+    External content tables: the text stays in workers / proposed_tasks, the
+    index only stores the tokens. Accents are ignored ("évaluation" matches
+    "evaluation") and 2-3 letter prefixes are indexed for search-as-you-type.
+    """
+    for index, (table, columns) in SEARCH_INDEXES.items():
+        names = ', '.join(columns)
+        new = ', '.join(f'NEW.{column}' for column in columns)
+        old = ', '.join(f'OLD.{column}' for column in columns)
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {names}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {new});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {old});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {names} ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {old});
+                INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {new});
+            END
+        ''')
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+# Aggregates of /api/analytics, maintained by triggers. Each helper returns
+# an UPSERT adding sign x the rows of its source matching `where`, so the
+# same statement backfills the tables (where = 1), adds a row after it is
+# written (NEW) and takes it away before it is changed or deleted (OLD).
+# Deleting a worker removes their rows in a BEFORE DELETE trigger: during
+# the cascade, the periods' and assignments' own triggers no longer see them.
+
+def _analytics_days(column, table, sign, where):
+    """Available (periods) or assigned (confirmed assignments) worker-days per day and department"""
+    status = " AND r.status = 'assignée'" if table == 'task_assignments' else ''
+    return f'''
+        INSERT INTO analytics_days (day, department, {column})
+        SELECT c.day, COALESCE(w.department, ''), {sign} * COUNT(*)
+        FROM {table} r
+        JOIN workers w ON w.id = r.worker_id
+        JOIN calendar_days c ON c.day BETWEEN date(r.start_date) AND date(r.end_date)
+        WHERE {where}{status}
+        GROUP BY c.day, COALESCE(w.department, '')
+        ON CONFLICT (day, department) DO UPDATE SET {column} = {column} + excluded.{column};
+    '''
+
+
+def _analytics_backlog(sign, where):
+    """Pending tasks per start week, priority and required department"""
+    return f'''
+        INSERT INTO analytics_backlog (week, priority, department, pending)
+        SELECT COALESCE(date(t.start_date, 'weekday 0', '-6 days'), ''), COALESCE(t.priority, ''),
+               COALESCE(t.required_department, ''), {sign} * COUNT(*)
+        FROM proposed_tasks t
+        WHERE t.status = 'en attente' AND {where}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (week, priority, department) DO UPDATE SET pending = pending + excluded.pending;
+    '''
+
+
+def _analytics_lead_times(where):
+    """Days from proposal to assignment, per assignment week and required department"""
+    return f'''
+        INSERT INTO analytics_lead_times (week, department, assignments, total_days)
+        SELECT date(a.created_at, 'weekday 0', '-6 days'), COALESCE(t.required_department, ''),
+               COUNT(*), SUM(julianday(a.created_at) - julianday(t.created_at))
+        FROM task_assignments a
+        JOIN proposed_tasks t ON t.id = a.task_id
+        WHERE a.status = 'assignée' AND {where}
+        GROUP BY 1, 2
+        ON CONFLICT (week, department) DO UPDATE SET
+            assignments = assignments + excluded.assignments,
+            total_days = total_days + excluded.total_days;
+    '''
+
+
+def _trigger(cursor, name, when, body):
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {when} BEGIN {body} END')
+
+
+def add_analytics(cursor):
+    """Aggregate tables behind /api/analytics, backfilled then kept up to date by triggers
+
+    Lead times are events: an assignment counts in the week it was made,
+    even if it is cancelled later. Days outside calendar_days (2000-2099)
+    are not counted.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS calendar_days (
+            day TEXT PRIMARY KEY,
+            week TEXT NOT NULL,
+            month TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO calendar_days (day, week, month)
+        WITH RECURSIVE days(day) AS (
+            SELECT '2000-01-01'
+            UNION ALL
+            SELECT date(day, '+1 day') FROM days WHERE day < '2099-12-31'
+        )
+        SELECT day, date(day, 'weekday 0', '-6 days'), substr(day, 1, 7) FROM days
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_days (
+            day TEXT NOT NULL,
+            department TEXT NOT NULL,
+            available INTEGER NOT NULL DEFAULT 0,
+            assigned INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, department)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_backlog (
+            week TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            department TEXT NOT NULL,
+            pending INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (week, priority, department)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_lead_times (
+            week TEXT NOT NULL,
+            department TEXT NOT NULL,
+            assignments INTEGER NOT NULL DEFAULT 0,
+            total_days REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (week, department)
+        ) WITHOUT ROWID
+    ''')
+
+    # Rebuilt from scratch, so that running the migration again does not count rows twice
+    for table in ('analytics_days', 'analytics_backlog', 'analytics_lead_times'):
+        cursor.execute(f'DELETE FROM {table}')
+    cursor.execute(_analytics_days('available', 'availability_periods', 1, '1'))
+    cursor.execute(_analytics_days('assigned', 'task_assignments', 1, '1'))
+    cursor.execute(_analytics_backlog(1, '1'))
+    cursor.execute(_analytics_lead_times('1'))
+
+    for column, table, columns in (('available', 'availability_periods', 'worker_id, start_date, end_date'),
+                                   ('assigned', 'task_assignments', 'worker_id, start_date, end_date, status')):
+        _trigger(cursor, f'{table}_analytics_insert', f'AFTER INSERT ON {table}',
+                 _analytics_days(column, table, 1, 'r.id = NEW.id'))
+        _trigger(cursor, f'{table}_analytics_delete', f'BEFORE DELETE ON {table}',
+                 _analytics_days(column, table, -1, 'r.id = OLD.id'))
+        _trigger(cursor, f'{table}_analytics_update_old', f'BEFORE UPDATE OF {columns} ON {table}',
+                 _analytics_days(column, table, -1, 'r.id = OLD.id'))
+        _trigger(cursor, f'{table}_analytics_update_new', f'AFTER UPDATE OF {columns} ON {table}',
+                 _analytics_days(column, table, 1, 'r.id = NEW.id'))
+
+    # A worker changing department moves all their days
+    _trigger(cursor, 'workers_analytics_update_old', 'BEFORE UPDATE OF department ON workers',
+             _analytics_days('available', 'availability_periods', -1, 'r.worker_id = OLD.id')
+             + _analytics_days('assigned', 'task_assignments', -1, 'r.worker_id = OLD.id'))
+    _trigger(cursor, 'workers_analytics_update_new', 'AFTER UPDATE OF department ON workers',
+             _analytics_days('available', 'availability_periods', 1, 'r.worker_id = NEW.id')
+             + _analytics_days('assigned', 'task_assignments', 1, 'r.worker_id = NEW.id'))
+    _trigger(cursor, 'workers_analytics_delete', 'BEFORE DELETE ON workers',
+             _analytics_days('available', 'availability_periods', -1, 'r.worker_id = OLD.id')
+             + _analytics_days('assigned', 'task_assignments', -1, 'r.worker_id = OLD.id'))
+
+    columns = 'status, priority, required_department, start_date'
+    _trigger(cursor, 'proposed_tasks_analytics_insert', 'AFTER INSERT ON proposed_tasks',
+             _analytics_backlog(1, 't.id = NEW.id'))
+    _trigger(cursor, 'proposed_tasks_analytics_delete', 'BEFORE DELETE ON proposed_tasks',
+             _analytics_backlog(-1, 't.id = OLD.id'))
+    _trigger(cursor, 'proposed_tasks_analytics_update_old', f'BEFORE UPDATE OF {columns} ON proposed_tasks',
+             _analytics_backlog(-1, 't.id = OLD.id'))
+    _trigger(cursor, 'proposed_tasks_analytics_update_new', f'AFTER UPDATE OF {columns} ON proposed_tasks',
+             _analytics_backlog(1, 't.id = NEW.id'))
+
+    _trigger(cursor, 'task_assignments_analytics_lead_time', 'AFTER INSERT ON task_assignments',
+             _analytics_lead_times('a.id = NEW.id'))
+
+
+MIGRATIONS = [
+    add_indexes,
+    add_skills_tables,
+    add_list_indexes,
+    add_change_log,
+    add_calendars,
+    add_search_index,
+    add_analytics,
+]
+
+
+def migrate(conn):
+    """Apply the migrations the database doesn't have yet"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✅ Migration {number} ({migration.__name__}) applied")
+
+
+def set_skills(cursor, junction, owner_column, owner_id, skills):
+    """Replace the skills linked to a worker (worker_skills) or a task (task_skills)"""
+    cursor.execute(f'DELETE FROM {junction} WHERE {owner_column} = ?', (owner_id,))
+    add_skills(cursor, junction, owner_column, [(owner_id, skills)])
+
+
+def add_skills(cursor, junction, owner_column, links):
+    """Link skills to many new workers or tasks at once: links is [(owner_id, skills)]"""
+    pairs = {(owner_id, s.strip()) for owner_id, skills in links for s in skills if s and s.strip()}
+    cursor.executemany('INSERT OR IGNORE INTO skills (name) VALUES (?)', {(name,) for _, name in pairs})
+    cursor.executemany(f'''
+        INSERT INTO {junction} ({owner_column}, skill_id)
+        SELECT ?, id FROM skills WHERE name = ?
+    ''', pairs)
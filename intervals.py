@@ -0,0 +1,88 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+
+def to_day(value):
+    """Convert an ISO date (YYYY-MM-DD, optionally followed by a time) to a day number"""
+    return date.fromisoformat(value[:10]).toordinal()
+
+
+def to_days(start_date, end_date):
+    """(start, end) day numbers of a stored period, None when a date is missing or unreadable"""
+    try:
+        return to_day(start_date), to_day(end_date)
+    except (TypeError, ValueError):
+        return None
+
+
+def from_day(day):
+    """Convert a day number back to an ISO date string"""
+    return date.fromordinal(day).isoformat()
+
+
+class IntervalSet:
+    """Closed [start, end] day intervals kept sorted by start.
+
+    Intervals longer than the query window can only start ``max_length`` days
+    before it, so overlap and containment queries bisect to that slice instead
+    of scanning every interval: O(log n + k), k being the number of intervals
+    starting in the slice. ``max_length`` is the longest interval ever added,
+    so a single very long one widens the slice of every query, and queries
+    then tend towards a linear scan.
+    """
+
+    __slots__ = ('_starts', '_items', 'max_length')
+
+    def __init__(self, intervals=()):
+        self._items = sorted(intervals)
+        self._starts = [item[0] for item in self._items]
+        self.max_length = max((end - start for start, end, _ in self._items), default=0)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, start, end, key=None):
+        """Insert the interval [start, end] identified by key"""
+        item = (start, end, key)
+        index = bisect_right(self._items, item)
+        self._items.insert(index, item)
+        self._starts.insert(index, start)
+        # max_length is never shrunk on removal: a larger bound is still correct
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, start, end, key=None):
+        """Remove the interval [start, end] identified by key, if present"""
+        item = (start, end, key)
+        index = bisect_left(self._items, item)
+        if index < len(self._items) and self._items[index] == item:
+            del self._items[index]
+            del self._starts[index]
+            return True
+        return False
+
+    def covering(self, start, end):
+        """Yield every interval containing the whole of [start, end]"""
+        lo = bisect_left(self._starts, end - self.max_length)
+        hi = bisect_right(self._starts, start)
+        for i in range(lo, hi):
+            if self._items[i][1] >= end:
+                yield self._items[i]
+
+    def covers(self, start, end):
+        """True if a single interval contains the whole of [start, end]"""
+        return next(self.covering(start, end), None) is not None
+
+    def overlapping(self, start, end):
+        """Yield every interval sharing at least one day with [start, end]"""
+        lo = bisect_left(self._starts, start - self.max_length)
+        hi = bisect_right(self._starts, end)
+        for i in range(lo, hi):
+            if self._items[i][1] >= start:
+                yield self._items[i]
+
+    def overlaps(self, start, end):
+        """True if any interval shares at least one day with [start, end]"""
+        return next(self.overlapping(start, end), None) is not None
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import wraps
+from flask import copy_current_request_context
+
+
+class Saturated(Exception):
+    """Every worker is busy and the queue is full (answered with a 429)"""
+
+
+class JobTimeout(Exception):
+    """The job did not finish in time (answered with a 503)"""
+
+
+class JobPool:
+    """Bounded thread pool for the heavy endpoints (matching, bulk import).
+
+    At most `workers` jobs run at once and `queue` more wait for a worker;
+    past that, new jobs are refused right away instead of piling up behind
+    a slow one, so the light endpoints keep their threads.
+    """
+
+    def __init__(self, workers=2, queue=4, timeout=60):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn in the pool and wait for its result
+
+        Raises Saturated when no slot is free, JobTimeout after `timeout`
+        seconds. A timed-out job keeps its slot until it really ends.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise Saturated()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except RuntimeError:
+            # Shutting down
+            self._slots.release()
+            raise Saturated()
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise JobTimeout()
+
+    def offload(self, view):
+        """Decorator running a Flask view in the pool, with its request context"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return self.run(copy_current_request_context(view), *args, **kwargs)
+        return wrapper
+
+    def shutdown(self, wait=True):
+        """Refuse new jobs and wait for the running ones"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
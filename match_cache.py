@@ -0,0 +1,112 @@
+import json
+import threading
+import matching
+import versions
+
+# Tables whose rows feed the matcher
+TABLES = ('workers', 'availability_periods', 'task_assignments', 'proposed_tasks')
+
+
+class MatchCache:
+    """Candidate lists of the pending tasks, kept between matching runs.
+
+    The write endpoints report through changes.notify() which tasks and
+    workers changed. A run on an unchanged dataset returns the previous
+    result; otherwise only the changed tasks are re-ranked against every
+    worker, and only the changed workers are re-scored against the other
+    tasks.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.lock = threading.Lock()
+        self.pending = []
+        self.ranked = {}
+        self.built_versions = None
+        self.matches = None
+        self.dirty_tasks = set()
+        self.dirty_workers = set()
+
+    def on_change(self, table, op, row):
+        with self.lock:
+            if table == 'proposed_tasks':
+                self.dirty_tasks.add(row['id'])
+            elif table == 'workers':
+                self.dirty_workers.add(row['id'])
+            elif table in ('availability_periods', 'task_assignments'):
+                self.dirty_workers.add(row['worker_id'])
+
+    def clear(self):
+        with self.lock:
+            self.ranked = {}
+            self.built_versions = None
+            self.matches = None
+
+    def get_matches(self, conn, limit=matching.TOP_CANDIDATES):
+        """Same result as matching.match_tasks over the current database"""
+        with self.lock:
+            current = versions.get(*TABLES)
+            # The dirty sets catch a change whose version was bumped during the last refresh
+            if (self.matches is None or current != self.built_versions
+                    or self.dirty_tasks or self.dirty_workers):
+                self._refresh(conn)
+                self.built_versions = current
+                self.matches = [{'task': task, 'candidates': self.ranked[task['id']][:limit]}
+                                for task in self.pending if self.ranked[task['id']]]
+            return self.matches
+
+    def _refresh(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM proposed_tasks WHERE status = 'en attente'")
+        self.pending = [dict(row) for row in cursor.fetchall()]
+
+        pending_ids = {task['id'] for task in self.pending}
+        self.ranked = {task_id: ranked for task_id, ranked in self.ranked.items() if task_id in pending_ids}
+        stale_tasks = [task for task in self.pending
+                       if task['id'] not in self.ranked or task['id'] in self.dirty_tasks]
+        stale_workers = self.dirty_workers
+        self.dirty_tasks, self.dirty_workers = set(), set()
+
+        # Changed or new tasks: ranked against every worker
+        if stale_tasks:
+            workers, availability, assignments = self._load(cursor)
+            self.ranked.update(self.matcher.rank_all(stale_tasks, workers, availability, assignments))
+
+        # Changed workers: re-scored against the tasks that were already cached
+        fresh_ids = {task['id'] for task in stale_tasks}
+        cached = [task for task in self.pending if task['id'] not in fresh_ids]
+        if stale_workers and cached:
+            workers, availability, assignments = self._load(cursor, stale_workers)
+            rescored = self.matcher.rank_all(cached, workers, availability, assignments)
+            for task in cached:
+                kept = [c for c in self.ranked[task['id']] if c['worker_id'] not in stale_workers]
+                merged = kept + rescored[task['id']]
+                # Same order as a full run: score, then worker order
+                merged.sort(key=lambda c: (-c['score'], c['worker_id']))
+                self.ranked[task['id']] = merged
+
+    @staticmethod
+    def _load(cursor, worker_ids=None):
+        """Workers, availability and confirmed assignments, optionally of some workers only"""
+        ids = json.dumps(sorted(worker_ids)) if worker_ids is not None else None
+
+        cursor.execute('''
+            SELECT * FROM workers
+            WHERE ? IS NULL OR id IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        ''', (ids, ids))
+        workers = [dict(row) for row in cursor.fetchall()]
+
+        cursor.execute('''
+            SELECT * FROM availability_periods
+            WHERE ? IS NULL OR worker_id IN (SELECT value FROM json_each(?))
+        ''', (ids, ids))
+        availability = [dict(row) for row in cursor.fetchall()]
+
+        cursor.execute('''
+            SELECT * FROM task_assignments
+            WHERE status = 'assignée' AND (? IS NULL OR worker_id IN (SELECT value FROM json_each(?)))
+        ''', (ids, ids))
+        assignments = [dict(row) for row in cursor.fetchall()]
+
+        return workers, availability, assignments
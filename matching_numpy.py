@@ -0,0 +1,136 @@
+import numpy as np
+from intervals import to_days
+from matching import split_skills, task_days, make_candidate, TOP_CANDIDATES
+
+
+def _day_arrays(rows):
+    """Start and end day arrays of the rows, and the rows kept (unreadable dates are left out)"""
+    days = [(to_days(row['start_date'], row['end_date']), row) for row in rows]
+    days = [(day, row) for day, row in days if day is not None]
+    starts = np.array([day[0] for day, _ in days], dtype=np.int64)
+    ends = np.array([day[1] for day, _ in days], dtype=np.int64)
+    return starts, ends, [row for _, row in days]
+
+
+def _any_per_worker(hits, worker_positions, n_workers):
+    """Collapse a tasks x rows boolean matrix into tasks x workers (any row of the worker)"""
+    result = np.zeros((hits.shape[0], n_workers), dtype=bool)
+    if not len(worker_positions):
+        return result
+    order = np.argsort(worker_positions, kind='stable')
+    positions = worker_positions[order]
+    group_starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+    result[:, positions[group_starts]] = np.logical_or.reduceat(hits[:, order], group_starts, axis=1)
+    return result
+
+
+def score_matrix(tasks, workers, availability, assignments):
+    """Score every task against every worker in one pass.
+
+    Returns (scores, available): two tasks x workers arrays, scores being the
+    30/30/40 skill/department/availability score of the pure-Python path.
+    """
+    n_tasks, n_workers = len(tasks), len(workers)
+    position = {worker['id']: i for i, worker in enumerate(workers)}
+
+    # Availability mask (40 points): day numbers instead of ISO strings
+    days = [task_days(task) for task in tasks]
+    dated = np.array([day is not None for day in days], dtype=bool)
+    task_start = np.array([day[0] if day else 0 for day in days], dtype=np.int64)
+    task_end = np.array([day[1] if day else 0 for day in days], dtype=np.int64)
+
+    period_start, period_end, periods = _day_arrays(
+        [period for period in availability if period['worker_id'] in position])
+    period_worker = np.array([position[period['worker_id']] for period in periods], dtype=np.int64)
+    covered = (period_start[None, :] <= task_start[:, None]) & (period_end[None, :] >= task_end[:, None])
+
+    booked_start, booked_end, booked_rows = _day_arrays(
+        [assignment for assignment in assignments if assignment['worker_id'] in position])
+    booked_worker = np.array([position[row['worker_id']] for row in booked_rows], dtype=np.int64)
+    overlapping = (booked_start[None, :] <= task_end[:, None]) & (booked_end[None, :] >= task_start[:, None])
+
+    available = (_any_per_worker(covered, period_worker, n_workers)
+                 & ~_any_per_worker(overlapping, booked_worker, n_workers)
+                 & dated[:, None])
+
+    # Skill match (30 points): (tasks x skills) . (skills x workers) counts the shared skills
+    vocabulary = {}
+    task_skills = [[vocabulary.setdefault(s, len(vocabulary)) for s in split_skills(task['required_skills'])]
+                   for task in tasks]
+    worker_skills = [[vocabulary.setdefault(s, len(vocabulary)) for s in split_skills(worker['skills'])]
+                     for worker in workers]
+    task_matrix = np.zeros((n_tasks, len(vocabulary)), dtype=np.float64)
+    worker_matrix = np.zeros((n_workers, len(vocabulary)), dtype=np.float64)
+    for i, ids in enumerate(task_skills):
+        task_matrix[i, ids] = 1
+    for i, ids in enumerate(worker_skills):
+        worker_matrix[i, ids] = 1
+    shared = task_matrix @ worker_matrix.T
+    required = task_matrix.sum(axis=1)[:, None]
+    skill = np.divide(shared, required, out=np.zeros_like(shared), where=required > 0) * 30
+
+    # Department match (30 points): equality broadcast over integer ids
+    departments = {}
+    worker_department = np.array([departments.setdefault(worker['department'], len(departments))
+                                  for worker in workers], dtype=np.int64)
+    task_department = np.array([departments.setdefault(task['required_department'], len(departments))
+                                if task['required_department'] else -1 for task in tasks], dtype=np.int64)
+    department = (task_department[:, None] == worker_department[None, :]) * 30
+
+    scores = skill + department + 40
+    return scores, available
+
+
+def top_candidates(scores, available, limit):
+    """Column indexes of the best `limit` available workers of each row.
+
+    Ties are broken by worker order, like the stable sort of the Python path.
+    """
+    keys = np.where(available, -scores, np.inf)
+    if keys.shape[1] > limit:
+        part = np.argpartition(keys, limit - 1, axis=1)[:, :limit]
+        threshold = np.take_along_axis(keys, part, axis=1).max(axis=1)
+    else:
+        threshold = np.full(keys.shape[0], np.inf)
+
+    result = []
+    for row, bound in enumerate(threshold):
+        cols = np.flatnonzero((keys[row] <= bound) & available[row])
+        order = np.lexsort((cols, keys[row, cols]))[:limit]
+        result.append(cols[order])
+    return result
+
+
+def _candidates(task, workers, scores, cols):
+    # Integer scores stay integers in the JSON, as in the Python path
+    as_number = float if task['required_skills'] else int
+    return [make_candidate(task, workers[col], as_number(scores[col])) for col in cols]
+
+
+def rank_all(tasks, workers, availability, assignments):
+    """NumPy implementation of matching.rank_all"""
+    if not tasks or not workers:
+        return {task['id']: [] for task in tasks}
+
+    scores, available = score_matrix(tasks, workers, availability, assignments)
+
+    ranked = {}
+    for row, task in enumerate(tasks):
+        cols = np.flatnonzero(available[row])
+        cols = cols[np.lexsort((cols, -scores[row, cols]))]
+        ranked[task['id']] = _candidates(task, workers, scores[row], cols)
+    return ranked
+
+
+def match_tasks(pending_tasks, workers, availability, assignments, limit=TOP_CANDIDATES):
+    """NumPy implementation of matching.match_tasks"""
+    if not pending_tasks or not workers:
+        return []
+
+    scores, available = score_matrix(pending_tasks, workers, availability, assignments)
+
+    matches = []
+    for row, (task, cols) in enumerate(zip(pending_tasks, top_candidates(scores, available, limit))):
+        if len(cols):
+            matches.append({'task': task, 'candidates': _candidates(task, workers, scores[row], cols)})
+    return matches
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from operator import attrgetter, itemgetter
+from pagination import InvalidQuery
+
+
+def split_csv(value):
+    """Comma-separated column as a list"""
+    return value.split(',') if value else []
+
+
+class Model:
+    """Row returned by the API: a dataclass with __slots__, built from query rows.
+
+    Slots keep each row small and orjson writes dataclasses without an
+    intermediate dict. CONVERTERS maps a column to the function turning its
+    stored value into the API value.
+    """
+
+    __slots__ = ()
+    CONVERTERS = {}
+
+    @classmethod
+    def from_rows(cls, rows, description):
+        """Models from rows of a query, its cursor.description giving the columns"""
+        positions = {column[0]: i for i, column in enumerate(description)}
+        values = itemgetter(*(positions[name] for name in cls.__slots__))
+        models = [cls(*values(row)) for row in rows]
+        for name, convert in cls.CONVERTERS.items():
+            for model in models:
+                setattr(model, name, convert(getattr(model, name)))
+        return models
+
+    def __getitem__(self, name):
+        # ListQuery reads the cursor columns of the last row by name
+        return getattr(self, name)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@dataclass
+class Worker(Model):
+    __slots__ = ('id', 'name', 'department', 'worker_chief', 'skills', 'phone_number', 'email', 'created_at')
+    CONVERTERS = {'skills': split_csv}
+    id: int
+    name: str
+    department: str
+    worker_chief: str
+    skills: list
+    phone_number: str
+    email: str
+    created_at: str
+
+
+@dataclass
+class Chief(Model):
+    __slots__ = ('id', 'name', 'department', 'email', 'created_at')
+    id: int
+    name: str
+    department: str
+    email: str
+    created_at: str
+
+
+@dataclass
+class AvailabilityPeriod(Model):
+    __slots__ = ('id', 'worker_id', 'start_date', 'end_date', 'created_at')
+    id: int
+    worker_id: int
+    start_date: str
+    end_date: str
+    created_at: str
+
+
+@dataclass
+class Task(Model):
+    __slots__ = ('id', 'chief_id', 'chief_name', 'title', 'description', 'required_skills',
+                 'required_department', 'priority', 'estimated_days', 'start_date', 'end_date',
+                 'status', 'matched_worker_id', 'created_at')
+    CONVERTERS = {'required_skills': split_csv}
+    id: int
+    chief_id: int
+    chief_name: str
+    title: str
+    description: str
+    required_skills: list
+    required_department: str
+    priority: str
+    estimated_days: int
+    start_date: str
+    end_date: str
+    status: str
+    matched_worker_id: int
+    created_at: str
+
+
+@dataclass
+class Assignment(Model):
+    """Assignment with the task, worker and chief columns of ASSIGNMENTS_SELECT"""
+    __slots__ = ('id', 'task_id', 'worker_id', 'start_date', 'end_date', 'match_score', 'status',
+                 'created_at', 'title', 'description', 'priority', 'worker_name', 'worker_phone',
+                 'chief_name')
+    id: int
+    task_id: int
+    worker_id: int
+    start_date: str
+    end_date: str
+    match_score: float
+    status: str
+    created_at: str
+    title: str
+    description: str
+    priority: str
+    worker_name: str
+    worker_phone: str
+    chief_name: str
+
+
+def requested_fields(args, model):
+    """Fields asked for with ?fields=id,name (None: all of them)"""
+    if not args.get('fields'):
+        return None
+    fields = tuple(name.strip() for name in args['fields'].split(',') if name.strip())
+    unknown = [name for name in fields if name not in model.__slots__]
+    if unknown or not fields:
+        raise InvalidQuery(f"Champ(s) inconnu(s) : {', '.join(unknown)} (disponibles : {', '.join(model.__slots__)})")
+    return fields
+
+
+def project(page, fields):
+    """Keep only `fields` of the models of a list or of a paginated {'items': ...} page"""
+    if fields is None:
+        return page
+    if isinstance(page, dict):
+        return {**page, 'items': project(page['items'], fields)}
+    if len(fields) == 1:
+        return [{fields[0]: getattr(model, fields[0])} for model in page]
+    values = attrgetter(*fields)
+    return [dict(zip(fields, values(model))) for model in page]
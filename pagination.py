@@ -0,0 +1,85 @@
+import base64
+import json
+
+MAX_LIMIT = 500
+
+
+class InvalidQuery(ValueError):
+    """Bad filter or pagination parameter (answered with a 400)"""
+
+
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidQuery('Curseur invalide')
+    return sort_value, row_id
+
+
+class ListQuery:
+    """WHERE filters and keyset pagination for a list endpoint.
+
+    Rows are ordered by (sort_column, id_column) so the last row of a page
+    gives the cursor of the next one: ?limit=N&cursor=<next_cursor>.
+    Without limit, every matching row is returned as before.
+    """
+
+    def __init__(self, args, sort_column, id_column='id', descending=False):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+        self.clauses = []
+        self.params = []
+
+        self.limit = None
+        if args.get('limit'):
+            try:
+                self.limit = int(args['limit'])
+            except ValueError:
+                raise InvalidQuery('Paramètre limit invalide')
+            if not 1 <= self.limit <= MAX_LIMIT:
+                raise InvalidQuery(f'limit doit être entre 1 et {MAX_LIMIT}')
+        self.cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+
+    def where(self, clause, *params):
+        self.clauses.append(clause)
+        self.params.extend(params)
+
+    def sql(self, select):
+        """Complete the SELECT with filters, cursor, order and limit"""
+        clauses = list(self.clauses)
+        params = list(self.params)
+        direction = 'DESC' if self.descending else 'ASC'
+
+        if self.cursor is not None:
+            operator = '<' if self.descending else '>'
+            clauses.append(f'({self.sort_column}, {self.id_column}) {operator} (?, ?)')
+            params.extend(self.cursor)
+
+        if clauses:
+            select += ' WHERE ' + ' AND '.join(clauses)
+        select += f' ORDER BY {self.sort_column} {direction}, {self.id_column} {direction}'
+        if self.limit is not None:
+            # One extra row tells whether there is a next page
+            select += ' LIMIT ?'
+            params.append(self.limit + 1)
+        return select, params
+
+    def response(self, rows):
+        """The plain list, or {'items', 'next_cursor'} when paginated"""
+        if self.limit is None:
+            return rows
+
+        next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[self.sort_column.split('.')[-1]],
+                                        last[self.id_column.split('.')[-1]])
+        return {'items': rows, 'next_cursor': next_cursor}
@@ -0,0 +1,133 @@
+import itertools
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+import matching
+
+# Columns the scorer reads; the rest is left out of the snapshot
+WORKER_FIELDS = ('id', 'name', 'department', 'skills')
+PERIOD_FIELDS = ('id', 'worker_id', 'start_date', 'end_date')
+
+# Chunks per process: smaller chunks even out the load between processes
+CHUNKS_PER_PROCESS = 4
+
+# Snapshot of the current matching run, in each worker process: (token, data)
+_snapshot = None
+
+
+def _compact(rows, fields):
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def _load_snapshot(ref):
+    """Workers, availability and assignments of a run, read once per process"""
+    global _snapshot
+    name, size, token, backend = ref
+    if _snapshot is None or _snapshot[0] != token:
+        memory = SharedMemory(name)
+        try:
+            workers, availability, assignments = pickle.loads(bytes(memory.buf[:size]))
+        finally:
+            memory.close()
+        if backend == 'numpy':
+            data = (workers, availability, assignments)
+        else:
+            data = matching.WorkerIndex(workers, availability, assignments)
+        _snapshot = (token, data)
+    return _snapshot[1]
+
+
+def _rank_chunk(ref, tasks, limit):
+    """Candidates of a chunk of tasks, keyed by task id (runs in a worker process)"""
+    data = _load_snapshot(ref)
+    if ref[3] == 'numpy':
+        import matching_numpy
+        if limit is None:
+            return matching_numpy.rank_all(tasks, *data)
+        matches = matching_numpy.match_tasks(tasks, *data, limit)
+        return {match['task']['id']: match['candidates'] for match in matches}
+    return {task['id']: matching.rank_candidates(task, data)[:limit] for task in tasks}
+
+
+class Matcher:
+    """matching.rank_all / match_tasks spread over a pool of processes.
+
+    Pending tasks are cut into chunks scored in parallel. The workers,
+    availability and assignments are pickled once per run into shared
+    memory; each process unpickles them (and builds its WorkerIndex) once,
+    whatever the number of chunks it gets. Batches smaller than min_tasks,
+    or processes <= 1, stay in the calling process.
+    """
+
+    def __init__(self, backend='python', processes=1, min_tasks=500):
+        if backend not in ('python', 'numpy'):
+            raise ValueError(f'Unknown matching backend: {backend}')
+        self.backend = backend
+        self.processes = processes
+        self.min_tasks = min_tasks
+        self._executor = None
+        self._lock = threading.Lock()
+        self._tokens = itertools.count(1)
+
+    def _parallel(self, tasks):
+        return self.processes > 1 and len(tasks) >= self.min_tasks
+
+    def rank_all(self, tasks, workers, availability, assignments):
+        """Same result as matching.rank_all"""
+        if self._parallel(tasks):
+            ranked = self._map(tasks, workers, availability, assignments, None)
+            if ranked is not None:
+                return ranked
+        return matching.rank_all(tasks, workers, availability, assignments, self.backend)
+
+    def match_tasks(self, pending_tasks, workers, availability, assignments, limit=matching.TOP_CANDIDATES):
+        """Same result as matching.match_tasks"""
+        if self._parallel(pending_tasks) and workers:
+            ranked = self._map(pending_tasks, workers, availability, assignments, limit)
+            if ranked is not None:
+                return [{'task': task, 'candidates': ranked[task['id']]}
+                        for task in pending_tasks if ranked.get(task['id'])]
+        return matching.match_tasks(pending_tasks, workers, availability, assignments, limit, self.backend)
+
+    def _map(self, tasks, workers, availability, assignments, limit):
+        """Ranked candidates of every task, or None if the pool broke down"""
+        blob = pickle.dumps((_compact(workers, WORKER_FIELDS),
+                             _compact(availability, PERIOD_FIELDS),
+                             _compact(assignments, PERIOD_FIELDS)), pickle.HIGHEST_PROTOCOL)
+        memory = SharedMemory(create=True, size=len(blob))
+        try:
+            memory.buf[:len(blob)] = blob
+            ref = (memory.name, len(blob), next(self._tokens), self.backend)
+
+            size = -(-len(tasks) // (self.processes * CHUNKS_PER_PROCESS))
+            chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+            ranked = {}
+            # map() yields in chunk order, so the merge keeps the task order
+            for part in self._pool().map(_rank_chunk, itertools.repeat(ref), chunks, itertools.repeat(limit)):
+                ranked.update(part)
+            return ranked
+        except BrokenProcessPool:
+            # A process died (e.g. out of memory): start a new pool next time
+            self.shutdown()
+            return None
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs request threads is not safe
+                self._executor = ProcessPoolExecutor(self.processes,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def shutdown(self):
+        """Stop the worker processes (a new pool starts on the next large batch)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
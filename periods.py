@@ -0,0 +1,163 @@
+"""Availability periods: recurrence rules, coalescing and compaction
+
+    python periods.py compact [--dry-run]
+
+merges the overlapping or adjacent periods of every worker in the database
+of ./config.yaml. Run it with the server stopped (its in-memory indexes are
+not told), or use POST /api/availability/compact instead.
+"""
+import json
+from collections import defaultdict
+from intervals import to_day, to_days, from_day
+from pagination import InvalidQuery
+
+# Longest span a recurrence rule may cover
+MAX_RULE_DAYS = 3 * 366
+
+
+def coalesce(ranges):
+    """Sorted minimal day ranges covering `ranges`: overlapping or adjacent ones are merged"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def parse_day(value, name):
+    """Day number of an ISO date sent by a client, InvalidQuery (400) naming the field otherwise"""
+    try:
+        return to_day(value)
+    except (TypeError, ValueError):
+        raise InvalidQuery(f'{name} invalide (format attendu : AAAA-MM-JJ)')
+
+
+def expand(rule):
+    """Day ranges of a recurrence rule
+
+    {'startDate', 'until', 'weekdays': [1, 2, 3] (1 = lundi ... 7 = dimanche,
+    every day by default), 'interval': 2 (one week in two, counted from the
+    week of startDate)}.
+    """
+    if not isinstance(rule, dict):
+        raise InvalidQuery('Règle de récurrence invalide')
+    start = parse_day(rule.get('startDate'), 'startDate')
+    until = parse_day(rule.get('until'), 'until')
+    if start > until:
+        raise InvalidQuery('until doit être postérieure à startDate')
+    if until - start >= MAX_RULE_DAYS:
+        raise InvalidQuery(f'Une règle couvre au plus {MAX_RULE_DAYS} jours')
+    weekdays = rule.get('weekdays') or list(range(1, 8))
+    if not isinstance(weekdays, list) or not all(day in range(1, 8) for day in weekdays):
+        raise InvalidQuery('weekdays : jours de 1 (lundi) à 7 (dimanche)')
+    interval = rule.get('interval', 1)
+    if not isinstance(interval, int) or interval < 1:
+        raise InvalidQuery('interval doit être un nombre de semaines positif')
+
+    # Day 1 of the proleptic calendar is a Monday
+    first_monday = start - (start - 1) % 7
+    days = [day for day in range(start, until + 1)
+            if (day - 1) % 7 + 1 in weekdays and (day - first_monday) // 7 % interval == 0]
+    return coalesce((day, day) for day in days)
+
+
+def parse(data):
+    """(worker ids, day ranges) of a POST /api/availability/generate body"""
+    if not isinstance(data, dict):
+        raise InvalidQuery('Aucune donnée fournie')
+    worker_ids = data.get('workerIds') or ([data['workerId']] if data.get('workerId') else [])
+    if (not isinstance(worker_ids, list) or not worker_ids
+            or not all(isinstance(worker_id, int) for worker_id in worker_ids)):
+        raise InvalidQuery('workerId ou workerIds requis (identifiants numériques)')
+    ranges = []
+    for rule in data.get('rules') or []:
+        ranges += expand(rule)
+    for period in data.get('periods') or []:
+        if not isinstance(period, dict):
+            raise InvalidQuery('Période invalide')
+        start = parse_day(period.get('startDate'), 'startDate')
+        end = parse_day(period.get('endDate'), 'endDate')
+        if start > end:
+            raise InvalidQuery('endDate doit être postérieure à startDate')
+        ranges.append((start, end))
+    if not ranges:
+        raise InvalidQuery('Aucune règle ni période fournie')
+    return worker_ids, coalesce(ranges)
+
+
+def merge(cursor, ranges):
+    """Add day ranges to the workers' periods, coalesced with the ones they already have
+
+    ranges: {worker_id: [(start day, end day)]}, an empty list only compacts
+    the worker's periods. A period that already is one of the final ranges
+    is kept, the others are deleted and the missing ranges inserted.
+    Periods with unreadable dates are left alone. Returns (inserted rows,
+    deleted rows), for changes.notify.
+    """
+    cursor.execute('''
+        SELECT id, worker_id, start_date, end_date FROM availability_periods
+        WHERE worker_id IN (SELECT value FROM json_each(?))
+        ORDER BY id
+    ''', (json.dumps(list(ranges)),))
+    existing = defaultdict(list)
+    for row in cursor.fetchall():
+        days = to_days(row['start_date'], row['end_date'])
+        if days is not None and days[0] <= days[1]:
+            existing[row['worker_id']].append((*days, dict(row)))
+
+    inserted, deleted = [], []
+    for worker_id, new in ranges.items():
+        periods = existing[worker_id]
+        wanted = set(coalesce(list(new) + [(start, end) for start, end, _ in periods]))
+        for start, end, row in periods:
+            if (start, end) in wanted:
+                wanted.discard((start, end))
+            else:
+                deleted.append(row)
+        for start, end in sorted(wanted):
+            cursor.execute('''
+                INSERT INTO availability_periods (worker_id, start_date, end_date)
+                VALUES (?, ?, ?)
+            ''', (worker_id, from_day(start), from_day(end)))
+            inserted.append({'id': cursor.lastrowid, 'worker_id': worker_id,
+                             'start_date': from_day(start), 'end_date': from_day(end)})
+
+    cursor.execute('DELETE FROM availability_periods WHERE id IN (SELECT value FROM json_each(?))',
+                   (json.dumps([row['id'] for row in deleted]),))
+    return inserted, deleted
+
+
+def compact(cursor):
+    """Coalesce the periods of every worker; returns (inserted rows, deleted rows)"""
+    cursor.execute('SELECT DISTINCT worker_id FROM availability_periods')
+    return merge(cursor, {row[0]: [] for row in cursor.fetchall()})
+
+
+if __name__ == '__main__':
+    import argparse
+    import sqlite3
+    from omegaconf import OmegaConf
+
+    parser = argparse.ArgumentParser(description='Compacte les périodes de disponibilité')
+    parser.add_argument('command', choices=['compact'])
+    parser.add_argument('--dry-run', action='store_true', help='affiche le résultat sans rien écrire')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(OmegaConf.load('config.yaml').db.path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('SELECT COUNT(*) FROM availability_periods')
+    before = cursor.fetchone()[0]
+    inserted, deleted = compact(cursor)
+    after = before - len(deleted) + len(inserted)
+    if args.dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    print(f"{'🔎' if args.dry_run else '✅'} {before} périodes -> {after} "
+          f"({len(deleted)} supprimées, {len(inserted)} créées)")
+    conn.close()
@@ -0,0 +1,44 @@
+import re
+
+DEFAULT_LIMIT = 20
+
+# Result type -> SELECT over its FTS5 index (see init_db.SEARCH_INDEXES).
+# bm25 weights favour the name/title, then the skills; lower rank is better.
+SOURCES = {
+    'worker': '''
+        SELECT 'worker' AS type, rowid AS id, name AS title,
+               snippet(workers_fts, -1, '<mark>', '</mark>', '…', 12) AS snippet,
+               bm25(workers_fts, 10.0, 2.0, 4.0, 1.0) AS rank
+        FROM workers_fts WHERE workers_fts MATCH ?
+    ''',
+    'task': '''
+        SELECT 'task' AS type, rowid AS id, title,
+               snippet(tasks_fts, -1, '<mark>', '</mark>', '…', 12) AS snippet,
+               bm25(tasks_fts, 10.0, 1.0, 4.0) AS rank
+        FROM tasks_fts WHERE tasks_fts MATCH ?
+    ''',
+}
+
+
+def match_query(text):
+    """FTS5 query matching the words of free text, each as a prefix
+
+    'mar dup' -> '"mar"* "dup"*': every word must start a word of the row.
+    Operators and quotes typed by the user are treated as plain text.
+    Returns None when the text has no word.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_sql(match, types, query):
+    """Ranked results of several types as one SELECT, paginated by (rank, key)
+
+    query is a ListQuery sorted on rank with id_column 'key', a unique
+    '<type>:<id>' string, so pages stay stable across result types.
+    """
+    union = ' UNION ALL '.join(SOURCES[name] for name in types)
+    sql, params = query.sql(f"SELECT * FROM (SELECT *, type || ':' || id AS key FROM ({union}))")
+    return sql, [match] * len(types) + params
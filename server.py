@@ -1,120 +1,503 @@
+import json
+import logging
+import os
 import sqlite3
+import threading
+import time
 from omegaconf import OmegaConf
 from datetime import datetime
-from init_db import init_db
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from intervals import to_day
+from init_db import init_db, set_skills, add_skills
+import matching
+import changes
+from availability_index import index as availability_index
+from calendars import DayCalendars
+import suggestions
+import search
+import analytics
+import periods
+import change_log
+from match_cache import MatchCache
+from parallel import Matcher
+from db import ConnectionPool, DEFAULT_PRAGMAS
+from writer import WriteQueue
+from snapshot import Snapshot
+from pagination import ListQuery, InvalidQuery
+import events
+import bulk
+import booking
+from jobs import JobPool, Saturated, JobTimeout
+from http_cache import conditional, compress, StaticFiles
+import tracing
+import metrics
+import models
+from models import Worker, Chief, AvailabilityPeriod, Task, Assignment
+from serialization import JSONProvider
+from flask import Flask, request, jsonify, g, Response, abort
 from flask_cors import CORS
 
 cfg = OmegaConf.load("config.yaml")
 
-app = Flask(__name__, static_folder='.')
-CORS(app)
+# Scoring backend of the matcher: 'python' (default) or 'numpy'
+MATCHING_BACKEND = OmegaConf.select(cfg, 'matching.backend', default='python')
 
-def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(cfg.db.path)
-    conn.row_factory = sqlite3.Row
+# Large batches of pending tasks are scored on every core
+matcher = Matcher(
+    MATCHING_BACKEND,
+    processes=OmegaConf.select(cfg, 'matching.processes', default=os.cpu_count() or 1),
+    min_tasks=OmegaConf.select(cfg, 'matching.parallel_min_tasks', default=500),
+)
+
+# Keep candidate lists between matching runs, recomputing only what changed
+match_cache = None
+if OmegaConf.select(cfg, 'matching.cache', default=True):
+    match_cache = MatchCache(matcher)
+    changes.listen(match_cache.on_change)
+
+# Per-worker day bitsets behind /api/calendar (bit n = epoch + n days)
+day_calendars = DayCalendars(OmegaConf.select(cfg, 'calendar.epoch', default='2020-01-01'))
+changes.listen(day_calendars.on_change)
+CALENDAR_MAX_DAYS = OmegaConf.select(cfg, 'calendar.max_days', default=366)
+
+CHANGE_LOG_RETENTION = {
+    'keep_versions': OmegaConf.select(cfg, 'changes.retention.versions', default=change_log.KEEP_VERSIONS),
+    'keep_days': OmegaConf.select(cfg, 'changes.retention.days', default=change_log.KEEP_DAYS),
+}
+
+app = Flask(__name__, static_folder=None)
+# orjson when installed ('auto'), or 'orjson' / 'stdlib'
+app.json = JSONProvider(app, backend=OmegaConf.select(cfg, 'http.json', default='auto'))
+CORS(app, expose_headers=['ETag', 'Server-Timing', 'X-Snapshot-Age'])
+
+static_files = StaticFiles(app.root_path)
+
+# Gzip (or Brotli, when installed) for text responses above min_size bytes
+COMPRESSION = OmegaConf.select(cfg, 'http.compression', default=True)
+COMPRESS_MIN_SIZE = OmegaConf.select(cfg, 'http.compress_min_size', default=1024)
+
+pool = ConnectionPool(
+    cfg.db.path,
+    size=OmegaConf.select(cfg, 'db.pool_size', default=8),
+    pragmas={**DEFAULT_PRAGMAS, **cfg.db.get('pragmas', {})},
+)
+
+# Optional: one thread commits the writes of concurrent requests together
+writer = None
+if OmegaConf.select(cfg, 'db.write_queue.enabled', default=False):
+    writer = WriteQueue(
+        pool.connect,
+        window=OmegaConf.select(cfg, 'db.write_queue.window_ms', default=2) / 1000,
+        max_batch=OmegaConf.select(cfg, 'db.write_queue.max_batch', default=64),
+    )
+
+# Optional: list and reporting views read an in-memory copy of the database
+# refreshed every interval seconds, or the live one past max_age (and with ?fresh=1)
+snapshot = None
+if OmegaConf.select(cfg, 'db.snapshot.enabled', default=False):
+    snapshot = Snapshot(
+        pool,
+        interval=OmegaConf.select(cfg, 'db.snapshot.interval', default=5),
+        max_age=OmegaConf.select(cfg, 'db.snapshot.max_age', default=30),
+    )
+
+# Matching and bulk imports run in a bounded pool: 429 when it is full
+job_pool = JobPool(
+    workers=OmegaConf.select(cfg, 'server.job_workers', default=2),
+    queue=OmegaConf.select(cfg, 'server.job_queue', default=4),
+    timeout=OmegaConf.select(cfg, 'server.job_timeout', default=60),
+)
+
+# Per-request timings: Server-Timing header, one JSON log line, /api/metrics
+TRACING = OmegaConf.select(cfg, 'metrics.enabled', default=True)
+SLOW_REQUEST_MS = OmegaConf.select(cfg, 'metrics.slow_ms', default=500)
+
+request_log = logging.getLogger('pairtache.requests')
+if OmegaConf.select(cfg, 'metrics.log', default=True):
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    request_log.addHandler(_handler)
+    request_log.setLevel(logging.INFO)
+else:
+    # Not even the slow-request warnings: logging's last-resort handler would print them
+    request_log.addHandler(logging.NullHandler())
+request_log.propagate = False
+
+REQUESTS = metrics.Counter('pairtache_requests_total', 'HTTP requests', ('method', 'route', 'status'))
+REQUEST_SECONDS = metrics.Histogram('pairtache_request_duration_seconds', 'Request wall time',
+                                    ('method', 'route'))
+DB_SECONDS = metrics.Histogram('pairtache_request_db_seconds', 'Time spent in SQLite per request',
+                               ('method', 'route'))
+DB_QUERIES = metrics.Counter('pairtache_db_queries_total', 'SQL statements executed', ('method', 'route'))
+DB_ROWS = metrics.Counter('pairtache_db_rows_total', 'Rows read or written', ('method', 'route'))
+
+# Opt-in: folded stacks of the requests slower than threshold_ms, for flame graphs
+sampler = None
+if TRACING and OmegaConf.select(cfg, 'metrics.profile.enabled', default=False):
+    sampler = tracing.Sampler(
+        interval=OmegaConf.select(cfg, 'metrics.profile.interval_ms', default=5) / 1000,
+        threshold=OmegaConf.select(cfg, 'metrics.profile.threshold_ms', default=500) / 1000,
+        directory=OmegaConf.select(cfg, 'metrics.profile.directory', default='profiles'),
+    )
+
+def get_db(read=False):
+    """Get the request's database connection, borrowed from the pool
+
+    read=True (list and reporting views): a connection to the snapshot when
+    it answers the request (see Snapshot.current).
+    """
+    name, source = 'db', pool
+    generation = snapshot.current() if read and snapshot is not None else None
+    if generation is not None:
+        name, source = 'snapshot_db', generation.pool
+    conn = g.get(name)
+    if conn is None or conn.closed:
+        conn = source.acquire()
+        trace = tracing.current()
+        if trace is not None:
+            # Offloaded views run in a job thread: sample it too
+            trace.threads.add(threading.get_ident())
+            conn = tracing.TracedConnection(conn, trace)
+        setattr(g, name, conn)
     return conn
 
+def write(operation):
+    """Run operation(cursor) in a write transaction and return its result
+
+    With the write queue, the operation runs in the writer thread, committed
+    with the writes of other requests; otherwise in its own BEGIN IMMEDIATE
+    transaction. Either way an exception rolls back the operation's writes
+    and is raised here.
+    """
+    trace = tracing.current()
+    if writer is None:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            result = operation(cursor)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        conn.close()
+        return result
+    if trace is None:
+        return writer.submit(operation)
+    start, db = time.perf_counter(), trace.db_time
+    try:
+        return writer.submit(operation, trace)
+    finally:
+        # Time spent waiting for the writer thread, its SQL being counted in db
+        trace.add('queue', time.perf_counter() - start - (trace.db_time - db))
+
+@app.errorhandler(InvalidQuery)
+def invalid_query(error):
+    return jsonify({'error': str(error)}), 400
+
+@app.errorhandler(Saturated)
+def saturated(error):
+    return jsonify({'error': 'Serveur occupé, réessayez dans quelques secondes'}), 429, {'Retry-After': '5'}
+
+@app.errorhandler(JobTimeout)
+def job_timeout(error):
+    return jsonify({'error': 'Délai de traitement dépassé'}), 503
+
+@app.before_request
+def start_trace():
+    if TRACING:
+        trace = request.environ[tracing.ENVIRON_KEY] = tracing.Trace()
+        if sampler is not None:
+            sampler.begin(trace)
+
+# Registered before compress_response so that it runs after it
+@app.after_request
+def record_trace(response):
+    trace = tracing.current()
+    if trace is None:
+        return response
+    total = trace.elapsed()
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    db = trace.db_time
+    REQUESTS.inc(request.method, route, response.status_code)
+    REQUEST_SECONDS.observe(total, request.method, route)
+    DB_SECONDS.observe(db, request.method, route)
+    DB_QUERIES.inc(request.method, route, amount=len(trace.queries))
+    DB_ROWS.inc(request.method, route, amount=trace.rows)
+    response.headers['Server-Timing'] = trace.server_timing(total)
+    response.headers['Timing-Allow-Origin'] = '*'
+
+    entry = {
+        'time': datetime.now().isoformat(timespec='milliseconds'),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'route': route,
+        'status': response.status_code,
+        'ms': round(total * 1000, 2),
+        'db_ms': round(db * 1000, 2),
+        'queries': len(trace.queries),
+        'rows': trace.rows,
+        **{f'{phase}_ms': round(seconds * 1000, 2) for phase, seconds in trace.phases.items()},
+    }
+    slow = total * 1000 >= SLOW_REQUEST_MS
+    if slow:
+        entry['slowest_queries'] = trace.slowest()
+    if sampler is not None:
+        profile = sampler.end(trace, f'{request.method} {route}')
+        if profile:
+            entry['profile'] = profile
+    request_log.log(logging.WARNING if slow else logging.INFO, json.dumps(entry, ensure_ascii=False))
+    return response
+
+@app.after_request
+def compress_response(response):
+    if COMPRESSION:
+        trace = tracing.current()
+        start = time.perf_counter()
+        compress(response, min_size=COMPRESS_MIN_SIZE)
+        if trace is not None:
+            trace.add('compress', time.perf_counter() - start)
+    return response
+
+@app.teardown_request
+def end_trace(exception):
+    # after_request is skipped when the response could not be built
+    trace = tracing.current()
+    if sampler is not None and trace is not None:
+        sampler.end(trace, f'{request.method} {request.path}')
+
+@app.after_request
+def snapshot_age(response):
+    generation = g.get('snapshot')
+    if generation is not None:
+        response.headers['X-Snapshot-Age'] = f'{generation.age():.1f}'
+    return response
+
+@app.teardown_appcontext
+def release_db(exception):
+    """Give the connections back to their pool, even when the view raised"""
+    for name in ('db', 'snapshot_db'):
+        conn = g.pop(name, None)
+        if conn is not None:
+            conn.close()
+
+ASSIGNMENTS_SELECT = '''
+    SELECT a.*, t.title, t.description, t.priority, w.name as worker_name, w.phone_number as worker_phone, ch.name as chief_name
+    FROM task_assignments a
+    JOIN proposed_tasks t ON a.task_id = t.id
+    JOIN workers w ON a.worker_id = w.id
+    JOIN chiefs ch ON t.chief_id = ch.id
+'''
+
+# API collection name -> (table, SELECT, id column, row model)
+COLLECTIONS = {
+    'workers': ('workers', 'SELECT * FROM workers', 'id', Worker),
+    'chiefs': ('chiefs', 'SELECT * FROM chiefs', 'id', Chief),
+    'availability': ('availability_periods', 'SELECT * FROM availability_periods', 'id', AvailabilityPeriod),
+    'tasks': ('proposed_tasks', 'SELECT * FROM proposed_tasks', 'id', Task),
+    'assignments': ('task_assignments', ASSIGNMENTS_SELECT, 'a.id', Assignment),
+}
+
 # API Routes
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'ok', 'message': 'Server is running'})
+    status = {'status': 'ok', 'message': 'Server is running', 'db_pool': pool.stats()}
+    if snapshot is not None:
+        status['snapshot'] = snapshot.stats()
+    return jsonify(status)
+
+def suggestion_limit():
+    """Optional ?limit= of the suggestion endpoints"""
+    if not request.args.get('limit'):
+        return None
+    try:
+        limit = int(request.args['limit'])
+    except ValueError:
+        raise InvalidQuery('Paramètre limit invalide')
+    if limit < 1:
+        raise InvalidQuery('limit doit être positif')
+    return limit
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics: latency and SQL time histograms per route, pool usage"""
+    stats = pool.stats()
+    scraped = [
+        metrics.gauge('pairtache_db_pool_in_use', 'Connections borrowed from the pool', stats['in_use']),
+        metrics.gauge('pairtache_db_pool_idle', 'Idle pooled connections', stats['idle']),
+    ]
+    if writer is not None:
+        stats = writer.stats()
+        scraped += [
+            metrics.gauge('pairtache_write_queue_size', 'Writes waiting for the writer thread', stats['queued']),
+            metrics.counter('pairtache_write_batches_total', 'Transactions committed by the writer thread',
+                            stats['batches']),
+            metrics.counter('pairtache_write_operations_total',
+                            'Writes committed or rolled back by the writer thread', stats['writes']),
+        ]
+    body = metrics.render(REQUESTS, REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, DB_ROWS, scraped=scraped)
+    return Response(body, content_type=metrics.CONTENT_TYPE)
 
 @app.route('/api/suggestions/<entity>/<field>', methods=['GET'])
+@conditional('workers', 'proposed_tasks', 'chiefs')
 def get_text_suggestions(entity, field):
-    allowed = {
-        "workers": ["department"],
-        "tasks": ["required_department", "priority"],
-        "chiefs": ["department","name"]
-    }
- 
-    tables = {
-        "workers": "workers",
-        "tasks": "proposed_tasks",
-        "chiefs": "chiefs"
-    }
- 
-    if entity not in allowed or field not in allowed[entity]:
-        return jsonify([])
- 
-    conn = get_db()
-    cursor = conn.cursor()
- 
-    query = f"""
-        SELECT DISTINCT {field}
-        FROM {tables[entity]}
-        WHERE {field} IS NOT NULL AND {field} != ''
+    """Values of a text column, most used first
+
+    ?q= keeps the values starting with q (case-insensitive), ?limit= the first ones.
     """
-    cursor.execute(query)
- 
-    results = [row[0] for row in cursor.fetchall()]
-    conn.close()
- 
+    if entity not in suggestions.TEXT_FIELDS or field not in suggestions.TEXT_FIELDS[entity][1]:
+        return jsonify([])
+
+    results = suggestions.index.search(get_db(), f'{entity}.{field}',
+                                       request.args.get('q', ''), suggestion_limit())
     return jsonify(results)
 
 
 @app.route('/api/suggestions/skills', methods=['GET'])
+@conditional('workers', 'proposed_tasks')
 def get_skills_suggestions():
-    conn = get_db()
+    """Skills used by at least one worker or task, most used first (?q=, ?limit=)"""
+    skills = suggestions.index.search(get_db(), 'skills',
+                                      request.args.get('q', ''), suggestion_limit())
+    return jsonify(skills)
+
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Rows inserted, updated or deleted since a change version
+
+    Without since, only the current version is returned: clients read it
+    before a full load, then ask for ?since=<version> after each write.
+    That version may come from the snapshot, as the lists of the full load
+    do: it is never ahead of what they hold. A since older than the pruned
+    part of the log gets 410: the client has to reload everything.
+    """
+    since = request.args.get('since')
+    conn = get_db(read=since is None)
     cursor = conn.cursor()
- 
-    skills_set = set()
- 
-    # Workers skills
-    cursor.execute("SELECT skills FROM workers WHERE skills IS NOT NULL")
-    for row in cursor.fetchall():
-        for s in row["skills"].split(","):
-            s = s.strip()
-            if s:
-                skills_set.add(s)
- 
-    # Tasks required_skills
-    cursor.execute("SELECT required_skills FROM proposed_tasks WHERE required_skills IS NOT NULL")
-    for row in cursor.fetchall():
-        for s in row["required_skills"].split(","):
-            s = s.strip()
-            if s:
-                skills_set.add(s)
- 
+    cursor.execute('SELECT COALESCE(MAX(version), 0) AS version FROM change_log')
+    version = cursor.fetchone()['version']
+
+    if since is None:
+        conn.close()
+        return jsonify({'version': version})
+    if not since.isdigit():
+        conn.close()
+        return jsonify({'error': 'Paramètre since invalide'}), 400
+    if int(since) < change_log.complete_since(cursor):
+        conn.close()
+        return jsonify({'error': 'Version trop ancienne, recharger toutes les données',
+                        'version': version}), 410
+
+    # Latest logged operation of each changed row
+    cursor.execute('''
+        SELECT table_name, row_id, op FROM change_log
+        WHERE version IN (
+            SELECT MAX(version) FROM change_log
+            WHERE version > ? AND version <= ?
+            GROUP BY table_name, row_id
+        )
+    ''', (int(since), version))
+    changed = cursor.fetchall()
+
+    result = {}
+    for name, (table, select, id_column, model) in COLLECTIONS.items():
+        ids = {row['row_id'] for row in changed if row['table_name'] == table and row['op'] != 'delete'}
+        deleted = {row['row_id'] for row in changed if row['table_name'] == table and row['op'] == 'delete'}
+
+        upserted = []
+        if ids:
+            query = ListQuery({}, id_column)
+            query.where(f'{id_column} IN (SELECT value FROM json_each(?))', json.dumps(sorted(ids)))
+            cursor.execute(*query.sql(select))
+            upserted = model.from_rows(cursor.fetchall(), cursor.description)
+            # Rows gone from the list since (e.g. an assignment whose worker was deleted)
+            deleted |= ids - {row.id for row in upserted}
+
+        result[name] = {'upserted': upserted, 'deleted': sorted(deleted)}
+
     conn.close()
-    return jsonify(sorted(skills_set))
+    return jsonify({'version': version, 'since': int(since), 'changes': result})
+
+@app.route('/api/changes/prune', methods=['POST'])
+def prune_changes():
+    """Delete the change_log entries past the retention (changes.retention)"""
+    deleted = write(lambda cursor: change_log.prune(cursor, **CHANGE_LOG_RETENTION))
+    return jsonify({'deleted': deleted})
+
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events: one compact 'change' event per committed write"""
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    stream = events.stream(
+        events.broadcaster,
+        int(last_event_id) if last_event_id.isdigit() else None,
+        heartbeat=OmegaConf.select(cfg, 'events.heartbeat', default=15),
+    )
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # Workers endpoints
+def workers_query(args):
+    """Filters of GET /api/workers, shared with the export"""
+    query = ListQuery(args, 'created_at', descending=True)
+    match = search.match_query(args.get('q', ''))
+    if match:
+        query.where('id IN (SELECT rowid FROM workers_fts WHERE workers_fts MATCH ?)', match)
+    if args.get('name'):
+        # Substring of the name, as typed in the search box
+        pattern = args['name'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query.where("name LIKE ? ESCAPE '\\'", f'%{pattern}%')
+    if args.get('skill'):
+        query.where('''id IN (SELECT ws.worker_id FROM worker_skills ws
+                          JOIN skills s ON s.id = ws.skill_id WHERE s.name = ?)''', args['skill'])
+    if args.get('department'):
+        query.where('department = ?', args['department'])
+    if args.get('chief'):
+        query.where('worker_chief = ?', args['chief'])
+    if args.get('available') == '1':
+        query.where('id IN (SELECT worker_id FROM availability_periods)')
+    return query
+
 @app.route('/api/workers', methods=['GET'])
+@conditional('workers', 'availability_periods', snapshot=snapshot)
 def get_workers():
-    """Get all workers"""
-    conn = get_db()
+    """Get workers
+
+    Filters: q (words of the name, department, skills or chief), name (part
+    of the name), skill, department, chief, available=1 (having at least one availability
+    period). Pagination: limit, cursor. fields=id,name,... keeps
+    only those columns.
+    """
+    query = workers_query(request.args)
+    fields = models.requested_fields(request.args, Worker)
+    conn = get_db(read=True)
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM workers ORDER BY created_at DESC')
-    workers = [dict(row) for row in cursor.fetchall()]
-    
-    # Parse skills JSON string to array
-    for worker in workers:
-        worker['skills'] = worker['skills'].split(',') if worker['skills'] else []
-    
+    cursor.execute(*query.sql('SELECT * FROM workers'))
+    workers = Worker.from_rows(cursor.fetchall(), cursor.description)
     conn.close()
-    return jsonify(workers)
+    return jsonify(models.project(query.response(workers), fields))
 
 @app.route('/api/workers', methods=['POST'])
 def create_worker():
     """Create a new worker"""
     data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
     skills_str = ','.join(data.get('skills', []))
-    cursor.execute('''
-        INSERT INTO workers (name, department, worker_chief, skills, phone_number, email)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (data['name'], data.get('department', ''), data.get('workerChief', ''), skills_str, data.get('phoneNumber'), data.get('email', '')))
-    
-    worker_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+
+    def insert(cursor):
+        cursor.execute('''
+            INSERT INTO workers (name, department, worker_chief, skills, phone_number, email)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (data['name'], data.get('department', ''), data.get('workerChief', ''), skills_str, data.get('phoneNumber'), data.get('email', '')))
+        worker_id = cursor.lastrowid
+        set_skills(cursor, 'worker_skills', 'worker_id', worker_id, data.get('skills', []))
+        return worker_id
+
+    worker_id = write(insert)
+    changes.notify('workers', 'insert', {'id': worker_id})
     
     return jsonify({'id': worker_id, 'message': 'Alternant créé avec succès'}), 201
 
@@ -126,12 +509,9 @@ def update_worker(worker_id):
     if not data:
         return jsonify({'error': 'Aucune donnée fournie'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-
     skills_str = ','.join(data.get('skills', []))
 
-    try:
+    def update(cursor):
         cursor.execute('''
             UPDATE workers
             SET name = ?,
@@ -150,72 +530,224 @@ def update_worker(worker_id):
             data.get('email', ''),
             worker_id
         ))
-
         if cursor.rowcount == 0:
-            return jsonify({'error': 'Worker non trouvé'}), 404
-
-        conn.commit()
-        return jsonify({'message': 'Alternant mis à jour avec succès'}), 200
+            return False
+        set_skills(cursor, 'worker_skills', 'worker_id', worker_id, data.get('skills', []))
+        return True
 
+    try:
+        if not write(update):
+            return jsonify({'error': 'Worker non trouvé'}), 404
     except Exception as e:
-        conn.rollback()
         return jsonify({'error': str(e)}), 500
 
-    finally:
-        conn.close()
+    changes.notify('workers', 'update', {'id': worker_id})
+    return jsonify({'message': 'Alternant mis à jour avec succès'}), 200
         
 @app.route('/api/workers/<int:worker_id>', methods=['DELETE'])
 def delete_worker(worker_id):
     """Delete a worker"""
+    def delete(cursor):
+        # Tasks assigned to this worker go back to pending
+        cursor.execute('SELECT id FROM proposed_tasks WHERE matched_worker_id = ?', (worker_id,))
+        task_ids = [row['id'] for row in cursor.fetchall()]
+        cursor.execute('''
+            UPDATE proposed_tasks SET status = 'en attente', matched_worker_id = NULL
+            WHERE matched_worker_id = ?
+        ''', (worker_id,))
+
+        # Delete associated availability slots and assignments first
+        cursor.execute('DELETE FROM availability_periods WHERE worker_id = ?', (worker_id,))
+        cursor.execute('DELETE FROM task_assignments WHERE worker_id = ?', (worker_id,))
+        cursor.execute('DELETE FROM worker_skills WHERE worker_id = ?', (worker_id,))
+        cursor.execute('DELETE FROM workers WHERE id = ?', (worker_id,))
+        return task_ids
+
+    task_ids = write(delete)
+    changes.notify('workers', 'delete', {'id': worker_id})
+    for task_id in task_ids:
+        changes.notify('proposed_tasks', 'update', {'id': task_id})
+    
+    return jsonify({'message': 'Alternant supprimé avec succès'})
+
+@app.route('/api/workers/available', methods=['GET'])
+@conditional('workers', 'availability_periods', 'task_assignments')
+def get_available_workers():
+    """Get the workers free for the whole of [start, end]"""
+    start_date = request.args.get('start')
+    end_date = request.args.get('end')
+
+    if not start_date or not end_date:
+        return jsonify({'error': 'Paramètres start et end requis'}), 400
+
     conn = get_db()
+    availability_index.load(conn)
+    try:
+        worker_ids = availability_index.free_workers(start_date, end_date)
+    except ValueError:
+        conn.close()
+        return jsonify({'error': 'Dates invalides (format attendu : AAAA-MM-JJ)'}), 400
+
     cursor = conn.cursor()
-    
-    # Delete associated availability slots first
-    cursor.execute('DELETE FROM availability_periods WHERE worker_id = ?', (worker_id,))
-    cursor.execute('DELETE FROM workers WHERE id = ?', (worker_id,))
-    
-    conn.commit()
+    cursor.execute('''
+        SELECT * FROM workers
+        WHERE id IN (SELECT value FROM json_each(?))
+        ORDER BY created_at DESC
+    ''', (json.dumps(worker_ids),))
+    workers = Worker.from_rows(cursor.fetchall(), cursor.description)
     conn.close()
-    
-    return jsonify({'message': 'Alternant supprimé avec succès'})
+    return jsonify(workers)
+
+# Search endpoint
+@app.route('/api/search', methods=['GET'])
+@conditional('workers', 'proposed_tasks', snapshot=snapshot)
+def search_all():
+    """Workers and tasks matching ?q=, best first (bm25), with a highlighted snippet
+
+    ?type=worker or ?type=task keeps one kind of result. Paginated by
+    ?limit= (default 20) and ?cursor=.
+    """
+    if not request.args.get('q'):
+        return jsonify({'error': 'Paramètre q requis'}), 400
+    types = [request.args['type']] if request.args.get('type') else list(search.SOURCES)
+    if not set(types) <= set(search.SOURCES):
+        return jsonify({'error': 'type doit être : ' + ', '.join(search.SOURCES)}), 400
+
+    query = ListQuery({'limit': search.DEFAULT_LIMIT, **request.args}, 'rank', id_column='key')
+    match = search.match_query(request.args['q'])
+    if match is None:
+        return jsonify(query.response([]))
+
+    conn = get_db(read=True)
+    cursor = conn.cursor()
+    cursor.execute(*search.search_sql(match, types, query))
+    results = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return jsonify(query.response(results))
+
+# Analytics endpoints: read the aggregate tables kept up to date by triggers
+# (init_db.add_analytics). Filters: start, end, department, period.
+
+@app.route('/api/analytics', methods=['GET'])
+@conditional('workers', 'availability_periods', 'proposed_tasks', 'task_assignments', snapshot=snapshot)
+def get_analytics():
+    """Utilization, backlog and lead times in one response"""
+    filters = analytics.Filters(request.args, periods=('week', 'month'))
+    cursor = get_db(read=True).cursor()
+    return jsonify({
+        'utilization': analytics.utilization(cursor, filters),
+        'backlog': analytics.backlog(cursor, filters),
+        'lead_times': analytics.lead_times(cursor, filters),
+    })
+
+@app.route('/api/analytics/utilization', methods=['GET'])
+@conditional('workers', 'availability_periods', 'task_assignments', snapshot=snapshot)
+def get_utilization():
+    """Assigned / available worker-days per period (day, week, month) and department"""
+    filters = analytics.Filters(request.args)
+    return jsonify(analytics.utilization(get_db(read=True).cursor(), filters))
+
+@app.route('/api/analytics/backlog', methods=['GET'])
+@conditional('proposed_tasks', snapshot=snapshot)
+def get_backlog():
+    """Pending tasks per priority and required department"""
+    filters = analytics.Filters(request.args)
+    return jsonify(analytics.backlog(get_db(read=True).cursor(), filters))
+
+@app.route('/api/analytics/lead-times', methods=['GET'])
+@conditional('proposed_tasks', 'task_assignments', snapshot=snapshot)
+def get_lead_times():
+    """Average days from proposal to assignment, per week or month"""
+    filters = analytics.Filters(request.args, periods=('week', 'month'))
+    return jsonify(analytics.lead_times(get_db(read=True).cursor(), filters))
+
+# Calendar endpoint
+@app.route('/api/calendar', methods=['GET'])
+@conditional('workers', 'availability_periods', 'task_assignments')
+def get_calendar():
+    """Schedule overview of [start, end]: one row of day runs per worker
+
+    Each worker's days are run-length encoded as [state, length, ...] with
+    state 0 = unavailable, 1 = free, 2 = assigned. capacity is the number of
+    free workers of each day. ?department= keeps one department.
+    """
+    start_date = request.args.get('start')
+    end_date = request.args.get('end')
+    if not start_date or not end_date:
+        return jsonify({'error': 'Paramètres start et end requis'}), 400
+    try:
+        days = to_day(end_date) - to_day(start_date) + 1
+    except ValueError:
+        return jsonify({'error': 'Dates invalides (format attendu : AAAA-MM-JJ)'}), 400
+    if days < 1:
+        return jsonify({'error': 'end doit être postérieure à start'}), 400
+    if days > CALENDAR_MAX_DAYS:
+        return jsonify({'error': f'Période limitée à {CALENDAR_MAX_DAYS} jours'}), 400
+
+    conn = get_db()
+    day_calendars.refresh(conn)
+    cursor = conn.cursor()
+    if request.args.get('department'):
+        cursor.execute('SELECT id, name, department FROM workers WHERE department = ? ORDER BY name, id',
+                       (request.args['department'],))
+    else:
+        cursor.execute('SELECT id, name, department FROM workers ORDER BY name, id')
+    workers = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    if day_calendars.unsaved_version is not None:
+        # Saved like any write, so a restart only replays the changes made after it
+        write(day_calendars.save)
+
+    matrix = day_calendars.matrix([worker['id'] for worker in workers], start_date, end_date)
+    for worker, free_days, runs in zip(workers, matrix['free_days'], matrix['runs']):
+        worker['free_days'] = free_days
+        worker['runs'] = runs
+    return jsonify({
+        'start': start_date[:10],
+        'end': end_date[:10],
+        'days': days,
+        'workers': workers,
+        'capacity': matrix['capacity'],
+    })
 
 # Chiefs endpoints
 @app.route('/api/chiefs', methods=['GET'])
+@conditional('chiefs', snapshot=snapshot)
 def get_chiefs():
-    """Get all chiefs"""
-    conn = get_db()
+    """Get all chiefs (?fields= keeps some columns)"""
+    fields = models.requested_fields(request.args, Chief)
+    conn = get_db(read=True)
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM chiefs ORDER BY created_at DESC')
-    chiefs = [dict(row) for row in cursor.fetchall()]
+    chiefs = Chief.from_rows(cursor.fetchall(), cursor.description)
     conn.close()
-    return jsonify(chiefs)
+    return jsonify(models.project(chiefs, fields))
 
 @app.route('/api/chiefs', methods=['POST'])
 def create_chief():
     """Create a new chief"""
     data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO chiefs (name, department, email)
-        VALUES (?, ?, ?)
-    ''', (data['name'], data.get('department', ''), data.get('email', '')))
-    
-    chief_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+
+    def insert(cursor):
+        cursor.execute('''
+            INSERT INTO chiefs (name, department, email)
+            VALUES (?, ?, ?)
+        ''', (data['name'], data.get('department', ''), data.get('email', '')))
+        return cursor.lastrowid
+
+    chief_id = write(insert)
+    changes.notify('chiefs', 'insert', {'id': chief_id})
     
     return jsonify({'id': chief_id, 'message': 'Chief created successfully'}), 201
 
 @app.route('/api/chiefs/<int:chief_id>', methods=['DELETE'])
 def delete_chief(chief_id):
     """Delete a chief"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM chiefs WHERE id = ?', (chief_id,))
-    conn.commit()
-    conn.close()
+    try:
+        write(lambda cursor: cursor.execute('DELETE FROM chiefs WHERE id = ?', (chief_id,)))
+    except sqlite3.IntegrityError:
+        return jsonify({'error': 'Ce responsable a encore des tâches proposées'}), 409
+    changes.notify('chiefs', 'delete', {'id': chief_id})
     
     return jsonify({'message': 'Chief deleted successfully'})
 
@@ -227,10 +759,7 @@ def update_chief(chief_id):
     if not data:
         return jsonify({'error': 'Aucune donnée fournie'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-
-    try:
+    def update(cursor):
         cursor.execute('''
             UPDATE chiefs
             SET name = ?,
@@ -243,109 +772,221 @@ def update_chief(chief_id):
             data.get('email', ''),
             chief_id
         ))
+        return cursor.rowcount
 
-        if cursor.rowcount == 0:
+    try:
+        if not write(update):
             return jsonify({'error': 'Responsable non trouvé'}), 404
-
-        conn.commit()
-        return jsonify({'message': 'Responsable mis à jour avec succès'}), 200
-
     except Exception as e:
-        conn.rollback()
         return jsonify({'error': str(e)}), 500
 
-    finally:
-        conn.close()
+    changes.notify('chiefs', 'update', {'id': chief_id})
+    return jsonify({'message': 'Responsable mis à jour avec succès'}), 200
         
 
 
 # Availability periods endpoints
+def availability_query(args):
+    """Filters of GET /api/availability, shared with the export"""
+    query = ListQuery(args, 'start_date')
+    if args.get('worker_id'):
+        query.where('worker_id = ?', args['worker_id'])
+    if args.get('start'):
+        query.where('end_date >= ?', args['start'])
+    if args.get('end'):
+        query.where('start_date <= ?', args['end'])
+    return query
+
 @app.route('/api/availability', methods=['GET'])
+@conditional('availability_periods', 'workers', snapshot=snapshot)
 def get_availability():
-    """Get all availability periods"""
-    conn = get_db()
+    """Get availability periods
+
+    Filters: worker_id, start/end (periods overlapping the range).
+    Pagination: limit, cursor. fields=... keeps only those columns.
+    """
+    query = availability_query(request.args)
+    fields = models.requested_fields(request.args, AvailabilityPeriod)
+    conn = get_db(read=True)
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM availability_periods ORDER BY start_date')
-    periods = [dict(row) for row in cursor.fetchall()]
+    cursor.execute(*query.sql('SELECT * FROM availability_periods'))
+    periods = AvailabilityPeriod.from_rows(cursor.fetchall(), cursor.description)
     conn.close()
-    return jsonify(periods)
+    return jsonify(models.project(query.response(periods), fields))
 
 @app.route('/api/availability', methods=['POST'])
 def create_availability():
     """Create availability period"""
     data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO availability_periods (worker_id, start_date, end_date)
-        VALUES (?, ?, ?)
-    ''', (data['workerId'], data['startDate'], data['endDate']))
-    
-    period_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    checked_period(data, 'startDate', 'endDate')
+
+    def insert(cursor):
+        cursor.execute('''
+            INSERT INTO availability_periods (worker_id, start_date, end_date)
+            VALUES (?, ?, ?)
+        ''', (data['workerId'], data['startDate'], data['endDate']))
+        return cursor.lastrowid
+
+    try:
+        period_id = write(insert)
+    except sqlite3.IntegrityError:
+        return jsonify({'error': f"Alternant inconnu : {data['workerId']}"}), 404
+    changes.notify('availability_periods', 'insert', {
+        'id': period_id, 'worker_id': data['workerId'],
+        'start_date': data['startDate'], 'end_date': data['endDate']
+    })
     
     return jsonify({'id': period_id, 'message': 'Availability period created'}), 201
 
 @app.route('/api/availability/<int:period_id>', methods=['DELETE'])
 def delete_availability(period_id):
     """Delete an availability period"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM availability_periods WHERE id = ?', (period_id,))
-    conn.commit()
-    conn.close()
+    def delete(cursor):
+        cursor.execute('SELECT * FROM availability_periods WHERE id = ?', (period_id,))
+        period = cursor.fetchone()
+        cursor.execute('DELETE FROM availability_periods WHERE id = ?', (period_id,))
+        return period and dict(period)
+
+    period = write(delete)
+    if period:
+        changes.notify('availability_periods', 'delete', period)
     
     return jsonify({'message': 'Availability period deleted successfully'})
 
+def notify_periods(inserted, deleted):
+    for row in deleted:
+        changes.notify('availability_periods', 'delete', row)
+    for row in inserted:
+        changes.notify('availability_periods', 'insert', row)
+
+@app.route('/api/availability/generate', methods=['POST'])
+def generate_availability():
+    """Create the availability of workers from recurrence rules, in one transaction
+
+    Body: workerId or workerIds, rules [{startDate, until, weekdays (1 = lundi
+    ... 7 = dimanche), interval (every n weeks)}] and/or periods [{startDate,
+    endDate}]. The days are coalesced with the workers' existing periods:
+    overlapping or adjacent periods become one.
+    """
+    worker_ids, ranges = periods.parse(request.json)
+
+    def generate(cursor):
+        cursor.execute('SELECT id FROM workers WHERE id IN (SELECT value FROM json_each(?))',
+                       (json.dumps(worker_ids),))
+        unknown = set(worker_ids) - {row['id'] for row in cursor.fetchall()}
+        if unknown:
+            raise InvalidQuery('Alternant(s) inconnu(s) : ' + ', '.join(map(str, sorted(unknown))))
+        return periods.merge(cursor, {worker_id: ranges for worker_id in worker_ids})
+
+    inserted, deleted = write(generate)
+    notify_periods(inserted, deleted)
+    return jsonify({'ids': [row['id'] for row in inserted], 'deleted': [row['id'] for row in deleted],
+                    'message': f'{len(inserted)} availability periods created'}), 201
+
+@app.route('/api/availability/compact', methods=['POST'])
+@job_pool.offload
+def compact_availability():
+    """Coalesce the overlapping or adjacent periods of every worker"""
+    inserted, deleted = write(periods.compact)
+    notify_periods(inserted, deleted)
+    return jsonify({'inserted': len(inserted), 'deleted': len(deleted)})
+
+def checked_period(data, start_field, end_field, required=True):
+    """Reject (400) a start / end date pair of a request body that to_day cannot read
+
+    Such rows would break the matching and the availability indexes. When
+    not required, either date may be left empty.
+    """
+    start, end = data.get(start_field), data.get(end_field)
+    start_day = periods.parse_day(start, start_field) if required or start else None
+    end_day = periods.parse_day(end, end_field) if required or end else None
+    if start_day is not None and end_day is not None and start_day > end_day:
+        raise InvalidQuery(f'{end_field} doit être postérieure à {start_field}')
+
 # Proposed tasks endpoints
+def tasks_query(args):
+    """Filters of GET /api/tasks, shared with the export"""
+    query = ListQuery(args, 'created_at', descending=True)
+    match = search.match_query(args.get('q', ''))
+    if match:
+        query.where('id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)', match)
+    if args.get('skill'):
+        query.where('''id IN (SELECT ts.task_id FROM task_skills ts
+                          JOIN skills s ON s.id = ts.skill_id WHERE s.name = ?)''', args['skill'])
+    if args.get('department'):
+        query.where('required_department = ?', args['department'])
+    if args.get('status'):
+        query.where('status = ?', args['status'])
+    if args.get('chief'):
+        chief = args['chief']
+        query.where('chief_id = ?' if chief.isdigit() else 'chief_name = ?', chief)
+    if args.get('start'):
+        query.where('end_date >= ?', args['start'])
+    if args.get('end'):
+        query.where('start_date <= ?', args['end'])
+    return query
+
 @app.route('/api/tasks', methods=['GET'])
+@conditional('proposed_tasks', snapshot=snapshot)
 def get_tasks():
-    """Get all proposed tasks"""
-    conn = get_db()
+    """Get proposed tasks
+
+    Filters: q (words of the title, description or skills), skill, department,
+    status, chief (id or name), start/end (tasks overlapping the range).
+    Pagination: limit, cursor. fields=... keeps only those columns.
+    """
+    query = tasks_query(request.args)
+    fields = models.requested_fields(request.args, Task)
+    conn = get_db(read=True)
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM proposed_tasks ORDER BY created_at DESC')
-    tasks = [dict(row) for row in cursor.fetchall()]
-    
-    # Parse required_skills to array
-    for task in tasks:
-        task['required_skills'] = task['required_skills'].split(',') if task['required_skills'] else []
-    
+    cursor.execute(*query.sql('SELECT * FROM proposed_tasks'))
+    tasks = Task.from_rows(cursor.fetchall(), cursor.description)
     conn.close()
-    return jsonify(tasks)
+    return jsonify(models.project(query.response(tasks), fields))
 
 @app.route('/api/tasks', methods=['POST'])
 def create_task():
     """Create a new task proposal"""
     data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
+    checked_period(data, 'start_date', 'end_date', required=False)
     skills_str = ','.join(data.get('required_skills', []))
-    cursor.execute('''
-        INSERT INTO proposed_tasks 
-        (chief_id, chief_name, title, description, required_skills, required_department, 
-         priority, estimated_days, start_date, end_date, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'en attente')
-    ''', (data['chief_id'], data['chief_name'], data['title'], data.get('description', ''),
-          skills_str, data.get('required_department', ''), data.get('priority', 'medium'),
-          data.get('estimated_days', 1), data.get('start_date'), data.get('end_date')))
-    
-    task_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+
+    def insert(cursor):
+        cursor.execute('''
+            INSERT INTO proposed_tasks 
+            (chief_id, chief_name, title, description, required_skills, required_department, 
+             priority, estimated_days, start_date, end_date, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'en attente')
+        ''', (data['chief_id'], data['chief_name'], data['title'], data.get('description', ''),
+              skills_str, data.get('required_department', ''), data.get('priority', 'medium'),
+              data.get('estimated_days', 1), data.get('start_date'), data.get('end_date')))
+        task_id = cursor.lastrowid
+        set_skills(cursor, 'task_skills', 'task_id', task_id, data.get('required_skills', []))
+        return task_id
+
+    try:
+        task_id = write(insert)
+    except sqlite3.IntegrityError:
+        return jsonify({'error': f"Responsable inconnu : {data['chief_id']}"}), 404
+    changes.notify('proposed_tasks', 'insert', {'id': task_id})
     
     return jsonify({'id': task_id, 'message': 'Task proposed successfully'}), 201
 
 @app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
     """Delete a task proposal"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM proposed_tasks WHERE id = ?', (task_id,))
-    conn.commit()
-    conn.close()
+    def delete(cursor):
+        cursor.execute('SELECT * FROM task_assignments WHERE task_id = ?', (task_id,))
+        assignments = [dict(row) for row in cursor.fetchall()]
+        cursor.execute('DELETE FROM task_assignments WHERE task_id = ?', (task_id,))
+        cursor.execute('DELETE FROM task_skills WHERE task_id = ?', (task_id,))
+        cursor.execute('DELETE FROM proposed_tasks WHERE id = ?', (task_id,))
+        return assignments
+
+    assignments = write(delete)
+    for assignment in assignments:
+        changes.notify('task_assignments', 'delete', assignment)
+    changes.notify('proposed_tasks', 'delete', {'id': task_id})
     
     return jsonify({'message': 'Task deleted successfully'})
 
@@ -353,119 +994,154 @@ def delete_task(task_id):
 def update_task(task_id):
     """Update a task"""
     data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    if 'status' in data:
-        cursor.execute('UPDATE proposed_tasks SET status = ? WHERE id = ?', 
-                      (data['status'], task_id))
-    
-    if 'matched_worker_id' in data:
-        cursor.execute('UPDATE proposed_tasks SET matched_worker_id = ?, status = ? WHERE id = ?',
-                      (data['matched_worker_id'], 'matched', task_id))
-    
-    conn.commit()
-    conn.close()
+
+    def update(cursor):
+        if 'status' in data:
+            cursor.execute('UPDATE proposed_tasks SET status = ? WHERE id = ?', 
+                          (data['status'], task_id))
+
+        if 'matched_worker_id' in data:
+            cursor.execute('UPDATE proposed_tasks SET matched_worker_id = ?, status = ? WHERE id = ?',
+                          (data['matched_worker_id'], 'matched', task_id))
+
+    write(update)
+    changes.notify('proposed_tasks', 'update', {'id': task_id})
     
     return jsonify({'message': 'Task updated successfully'})
 
 # Task assignments endpoints
+def assignments_query(args):
+    """Filters of GET /api/assignments, shared with the export"""
+    query = ListQuery(args, 'a.start_date', 'a.id')
+    if args.get('q'):
+        query.where('t.title LIKE ?', f"%{args['q']}%")
+    if args.get('worker_id'):
+        query.where('a.worker_id = ?', args['worker_id'])
+    if args.get('status'):
+        query.where('a.status = ?', args['status'])
+    if args.get('chief'):
+        chief = args['chief']
+        query.where('t.chief_id = ?' if chief.isdigit() else 'ch.name = ?', chief)
+    if args.get('start'):
+        query.where('a.end_date >= ?', args['start'])
+    if args.get('end'):
+        query.where('a.start_date <= ?', args['end'])
+    return query
+
 @app.route('/api/assignments', methods=['GET'])
+@conditional('task_assignments', 'proposed_tasks', 'workers', 'chiefs', snapshot=snapshot)
 def get_assignments():
-    """Get all task assignments"""
-    conn = get_db()
+    """Get task assignments
+
+    Filters: q (task title), worker_id, status, chief (id or name),
+    start/end (assignments overlapping the range). Pagination: limit, cursor.
+    fields=... keeps only those columns.
+    """
+    query = assignments_query(request.args)
+    fields = models.requested_fields(request.args, Assignment)
+    conn = get_db(read=True)
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT a.*, t.title, t.description, t.priority, w.name as worker_name, w.phone_number as worker_phone, ch.name as chief_name
-        FROM task_assignments a
-        JOIN proposed_tasks t ON a.task_id = t.id
-        JOIN workers w ON a.worker_id = w.id
-        JOIN chiefs ch ON t.chief_id = ch.id
-        ORDER BY a.start_date
-    ''')
-    assignments = [dict(row) for row in cursor.fetchall()]
+    cursor.execute(*query.sql(ASSIGNMENTS_SELECT))
+    assignments = Assignment.from_rows(cursor.fetchall(), cursor.description)
     conn.close()
-    return jsonify(assignments)
+    return jsonify(models.project(query.response(assignments), fields))
+
+def confirm_assignments(items):
+    """Insert assignments in one write transaction, all or none
+
+    Returns the created rows, or raises booking.Conflict.
+    """
+    created = write(lambda cursor: booking.confirm(cursor, items))
+    for row in created:
+        changes.notify('task_assignments', 'insert', row)
+        changes.notify('proposed_tasks', 'update', {'id': row['task_id']})
+    return created
+
+@app.errorhandler(booking.Conflict)
+def assignment_conflict(error):
+    return jsonify({'error': "Assignation(s) refusée(s), rien n'a été enregistré",
+                    'conflicts': error.conflicts}), 409
+
+@app.route('/api/assignments/confirm-batch', methods=['POST'])
+def confirm_assignment_batch():
+    """Confirm a list of matches (e.g. the plan of mode=optimal) all at once
+
+    Each match is checked against the worker's assignments and the rest of
+    the batch; on any conflict nothing is written and the conflicts are
+    returned with a 409.
+    """
+    data = request.json
+    items = data.get('assignments') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Liste d\'assignations requise'}), 400
+
+    created = confirm_assignments(items)
+    return jsonify({'ids': [row['id'] for row in created],
+                    'message': f'{len(created)} assignments confirmed successfully'}), 201
 
 @app.route('/api/assignments/confirm', methods=['POST'])
 def confirm_assignment():
-    """Admin confirms a proposed match and creates assignment"""
+    """Admin confirms a proposed match and creates assignment
+
+    A list of matches is confirmed like /api/assignments/confirm-batch.
+    """
     data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO task_assignments 
-        (task_id, worker_id, start_date, end_date, match_score, status)
-        VALUES (?, ?, ?, ?, ?, 'assignée')
-    ''', (data['task_id'], data['worker_id'], data['start_date'], 
-          data['end_date'], data.get('match_score', 0)))
-    
-    # Update task status
-    cursor.execute('UPDATE proposed_tasks SET status = ?, matched_worker_id = ? WHERE id = ?',
-                  ('assignée', data['worker_id'], data['task_id']))
-    
-    assignment_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
-    return jsonify({'id': assignment_id, 'message': 'Assignment confirmed successfully'}), 201
+    if isinstance(data, list):
+        return confirm_assignment_batch()
+
+    created = confirm_assignments([data])
+    return jsonify({'id': created[0]['id'], 'message': 'Assignment confirmed successfully'}), 201
 
 @app.route('/api/assignments/<int:assignment_id>', methods=['DELETE'])
 def delete_assignment(assignment_id):
     """Delete an assignment and reset task to pending"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Get task_id before deleting
-    cursor.execute('SELECT task_id FROM task_assignments WHERE id = ?', (assignment_id,))
-    result = cursor.fetchone()
-    
+    def delete(cursor):
+        # Get task_id before deleting
+        cursor.execute('SELECT * FROM task_assignments WHERE id = ?', (assignment_id,))
+        result = cursor.fetchone()
+        if result:
+            # Delete assignment
+            cursor.execute('DELETE FROM task_assignments WHERE id = ?', (assignment_id,))
+
+            # Reset task to pending
+            cursor.execute('UPDATE proposed_tasks SET status = ?, matched_worker_id = NULL WHERE id = ?',
+                          ('en attente', result['task_id']))
+        return result and dict(result)
+
+    result = write(delete)
     if result:
-        task_id = result['task_id']
-        
-        # Delete assignment
-        cursor.execute('DELETE FROM task_assignments WHERE id = ?', (assignment_id,))
-        
-        # Reset task to pending
-        cursor.execute('UPDATE proposed_tasks SET status = ?, matched_worker_id = NULL WHERE id = ?',
-                      ('en attente', task_id))
-        
-        conn.commit()
-    
-    conn.close()
+        changes.notify('task_assignments', 'delete', result)
+        changes.notify('proposed_tasks', 'update', {'id': result['task_id']})
     
     return jsonify({'message': 'Assignment cancelled successfully'})
 
 @app.route('/api/assignments', methods=['POST'])
 def create_assignment():
     """Create a task assignment (kept for compatibility)"""
-    data = request.json
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO task_assignments 
-        (task_id, worker_id, start_date, end_date, match_score, status)
-        VALUES (?, ?, ?, ?, ?, 'assignée')
-    ''', (data['task_id'], data['worker_id'], data['start_date'], 
-          data['end_date'], data.get('match_score', 0)))
-    
-    # Update task status
-    cursor.execute('UPDATE proposed_tasks SET status = ?, matched_worker_id = ? WHERE id = ?',
-                  ('assignée', data['worker_id'], data['task_id']))
-    
-    assignment_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
-    return jsonify({'id': assignment_id, 'message': 'Tâche assignée avec succès'}), 201
+    created = confirm_assignments([request.json])
+    return jsonify({'id': created[0]['id'], 'message': 'Tâche assignée avec succès'}), 201
 
 # Matching algorithm endpoint
 @app.route('/api/match-tasks', methods=['POST'])
+@job_pool.offload
 def match_tasks():
-    """Run matching algorithm to propose task-worker assignments"""
+    """Run matching algorithm to propose task-worker assignments
+
+    mode=top3 (default) ranks candidates for each task independently,
+    mode=optimal returns a conflict-free plan of the pending batch, the
+    best total score of each group of overlapping tasks.
+    """
+    mode = request.args.get('mode', 'top3')
+    if mode not in ('top3', 'optimal'):
+        return jsonify({'error': f'Mode de matching inconnu : {mode}'}), 400
+
     conn = get_db()
+    
+    if mode == 'top3' and match_cache is not None:
+        matches = match_cache.get_matches(conn)
+        conn.close()
+        return jsonify({'matches': matches, 'count': len(matches)})
+    
     cursor = conn.cursor()
     
     # Get pending tasks
@@ -483,80 +1159,169 @@ def match_tasks():
     cursor.execute('SELECT * FROM task_assignments WHERE status = "assignée"')
     existing_assignments = [dict(row) for row in cursor.fetchall()]
     
-    matches = []
+    conn.close()
     
-    for task in pending_tasks:
-        candidates = []
-        
-        task_skills = set(task['required_skills'].split(',')) if task['required_skills'] else set()
-        
-        for worker in workers_data:
-            worker_skills = set(worker['skills'].split(',')) if worker['skills'] else set()
-            score = 0
-            
-            # Skill match (30 points)
-            if task_skills:
-                skill_match = len(task_skills & worker_skills) / len(task_skills)
-                score += skill_match * 30
-            
-            # Department match (30 points)
-            if task['required_department'] and worker['department'] == task['required_department']:
-                score += 30
-            
-            # Availability match (40 points)
-            worker_availability = [a for a in availability_data if a['worker_id'] == worker['id']]
-            has_availability = False
-            if worker_availability:
-                for avail in worker_availability:
-                    if task['start_date'] >= avail['start_date'] and task['end_date'] <= avail['end_date']:
-                        # Check if worker is not already assigned during this period
-                        is_available = True
-                        for assignment in existing_assignments:
-                            if assignment['worker_id'] == worker['id']:
-                                # Check for date overlap
-                                if not (task['end_date'] < assignment['start_date'] or task['start_date'] > assignment['end_date']):
-                                    is_available = False
-                                    break
-                        if is_available:
-                            score += 40
-                            has_availability = True
-                        break
-            
-            if has_availability:  # Include all potential matches
-                candidates.append({
-                    'task_id': task['id'],
-                    'task_title': task['title'],
-                    'worker_id': worker['id'],
-                    'worker_name': worker['name'],
-                    'worker_department': worker['department'],
-                    'worker_skills': worker['skills'],
-                    'score': score,
-                    'has_availability': has_availability
-                })
-        
-        # Sort candidates by score
-        candidates.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Take top 3 candidates for each task
-        if candidates:
-            matches.append({
-                'task': task,
-                'candidates': candidates[:3]  # Top 3 matches
-            })
+    if mode == 'optimal':
+        matches, plan, unassigned = matching.optimal_plan(
+            pending_tasks, workers_data, availability_data, existing_assignments)
+        return jsonify({'matches': matches, 'count': len(matches), 'mode': mode,
+                        'plan': plan, 'unassigned': unassigned})
     
-    conn.close()
+    matches = matcher.match_tasks(pending_tasks, workers_data, availability_data, existing_assignments)
     
     return jsonify({'matches': matches, 'count': len(matches)})
 
+# Bulk import / export endpoints
+
+# API collection -> (table, line validator, (skill junction, owner column, skills field))
+IMPORTS = {
+    'workers': ('workers', bulk.worker_values, ('worker_skills', 'worker_id', 'skills')),
+    'availability': ('availability_periods', bulk.availability_values, None),
+    'tasks': ('proposed_tasks', bulk.task_values, ('task_skills', 'task_id', 'required_skills')),
+}
+
+# API collection -> filters of its list endpoint
+EXPORTS = {
+    'workers': workers_query,
+    'availability': availability_query,
+    'tasks': tasks_query,
+    'assignments': assignments_query,
+}
+
+def insert_batch(cursor, table, batch, skills):
+    """executemany one batch of validated lines (skills lists stored as CSV in the row)"""
+    columns = list(batch[0])
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [tuple(','.join(v) if isinstance(v, list) else v for v in values.values()) for values in batch],
+    )
+    return [values[skills[2]] for values in batch] if skills else [None] * len(batch)
+
+@app.route('/api/import/<collection>', methods=['POST'])
+@job_pool.offload
+def import_rows(collection):
+    """Insert workers, availability periods or tasks from a CSV or JSON Lines upload
+
+    The upload is the request body or a 'file' form field, read as a stream
+    and validated first. Columns are those of the table (skills:
+    comma-separated). The valid lines are then inserted in one write(),
+    through the write queue when it is enabled: if one line is invalid nothing
+    is written, unless ?partial=1 which inserts the valid lines. Errors are
+    reported per line.
+    """
+    if collection not in IMPORTS:
+        return jsonify({'error': 'Import possible pour : ' + ', '.join(IMPORTS)}), 404
+    fmt = bulk.upload_format(request)
+    if fmt not in bulk.FORMATS:
+        return jsonify({'error': f'Format inconnu : {fmt} (csv ou jsonl)'}), 400
+
+    table, validate, skills = IMPORTS[collection]
+    stream = request.files['file'].stream if 'file' in request.files else request.stream
+    partial = request.args.get('partial') == '1'
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, name FROM chiefs')
+    context = {'chiefs': {row['id']: row['name'] for row in cursor.fetchall()}}
+    cursor.execute('SELECT id FROM workers')
+    context['worker_ids'] = {row['id'] for row in cursor.fetchall()}
+    conn.close()
+
+    # The upload is read before writing: a slow client never holds the write lock
+    errors, rows = [], []
+    try:
+        for line, row in bulk.read_rows(stream, fmt):
+            try:
+                if isinstance(row, bulk.RowError):
+                    raise row
+                rows.append(validate(row, context))
+            except bulk.RowError as e:
+                errors.append({'line': line, 'error': str(e)})
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Fichier illisible (encodage UTF-8 attendu)'}), 400
+    except bulk.RowError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if errors and not partial:
+        return jsonify({'error': f'{len(errors)} ligne(s) invalide(s), rien n\'a été importé',
+                        'inserted': 0, 'errors': errors}), 400
+
+    def insert(cursor):
+        # Holding the write lock, new AUTOINCREMENT ids follow the current sequence
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,))
+        first_id = (cursor.fetchone() or {'seq': 0})['seq'] + 1
+        skill_lists = []
+        for start in range(0, len(rows), bulk.BATCH_SIZE):
+            skill_lists += insert_batch(cursor, table, rows[start:start + bulk.BATCH_SIZE], skills)
+        cursor.execute(f'SELECT * FROM {table} WHERE id >= ? ORDER BY id', (first_id,))
+        inserted = [dict(row) for row in cursor.fetchall()]
+        if skills:
+            add_skills(cursor, skills[0], skills[1],
+                       [(row['id'], names) for row, names in zip(inserted, skill_lists)])
+        return inserted
+
+    try:
+        inserted = write(insert) if rows else []
+    except sqlite3.IntegrityError:
+        # A worker or chief of the upload was deleted while it was being read
+        return jsonify({'error': 'Données modifiées pendant l\'import, réessayez'}), 409
+
+    for row in inserted:
+        changes.notify(table, 'insert', row)
+
+    return jsonify({'inserted': len(inserted), 'errors': errors}), 201
+
+@app.route('/api/export/<collection>', methods=['GET'])
+def export_rows(collection):
+    """Stream workers, availability, tasks or the planning as CSV (default) or JSON Lines
+
+    Takes the filters of the matching list endpoint. Rows are fetched and
+    written in chunks, never held in memory all at once.
+    """
+    if collection not in EXPORTS:
+        return jsonify({'error': 'Export possible pour : ' + ', '.join(EXPORTS)}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in bulk.FORMATS:
+        return jsonify({'error': f'Format inconnu : {fmt} (csv ou jsonl)'}), 400
+
+    _, select, _, model = COLLECTIONS[collection]
+    # The whole collection: pagination parameters don't apply to an export
+    args = {name: value for name, value in request.args.items() if name not in ('limit', 'cursor')}
+    sql, params = EXPORTS[collection](args).sql(select)
+    generation = snapshot.current() if snapshot is not None else None
+    source = pool if generation is None else generation.pool
+
+    def generate():
+        # Own connection: the request's one goes back to the pool before streaming ends
+        conn = source.acquire()
+        try:
+            cursor = conn.execute(sql, params)
+            chunks = iter(lambda: cursor.fetchmany(bulk.BATCH_SIZE), [])
+            if fmt == 'csv':
+                columns = [column[0] for column in cursor.description]
+                yield from bulk.write_csv((dict(row) for chunk in chunks for row in chunk), columns)
+            else:
+                yield from bulk.write_jsonl(item.to_dict() for chunk in chunks
+                                            for item in model.from_rows(chunk, cursor.description))
+        finally:
+            conn.close()
+
+    return Response(generate(), mimetype=bulk.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={collection}.{fmt}'
+    })
+
 @app.route('/')
 def serve_index():
-    """Serve the main HTML file"""
-    return send_file('index.html')
+    """Serve the main HTML file, its assets linked by content hash"""
+    return serve_static('index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files like app.js"""
-    return send_from_directory('.', path)
+    response = static_files.response(path)
+    if response is None:
+        abort(404)
+    return response
 
 if __name__ == '__main__':
     # Initialize database
@@ -0,0 +1,117 @@
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from flask import g, request
+from db import ConnectionPool
+import versions
+
+log = logging.getLogger('pairtache.snapshot')
+
+_names = itertools.count(1)
+
+
+class Generation:
+    """One in-memory copy of the database and the read-only pool serving it"""
+
+    def __init__(self, size):
+        self.uri = f'file:pairtache-snapshot-{next(_names)}?mode=memory&cache=shared'
+        # Keeps the in-memory database alive while the pool has no connection open
+        self.anchor = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        self.pool = ConnectionPool(self.uri, size=size, pragmas={'query_only': 'ON'}, uri=True)
+        self.table_versions = {}
+        self.fresh_at = None
+
+    def versions(self, tables):
+        """Versions of `tables` the copy was made at, like versions.get()"""
+        return tuple(self.table_versions.get(table, 0) for table in tables)
+
+    def age(self):
+        """Seconds since the copy was last known to match the database"""
+        return time.monotonic() - self.fresh_at
+
+    def close(self):
+        self.pool.retire()
+        self.anchor.close()
+
+
+class Snapshot:
+    """Read-only copy of the database for the list and reporting views
+
+    A background thread copies the database into memory with the backup API
+    every `interval` seconds when a table changed, then swaps the copy in.
+    Reads served from it never wait on the writers. A request gets the live
+    database instead with ?fresh=1, before the first copy is ready, and
+    when the copy is more than `max_age` seconds behind (refresh failing or
+    too slow).
+
+    A replaced copy is closed one refresh later: requests that picked it
+    just before the swap can still open connections to it.
+    """
+
+    def __init__(self, pool, interval=5, max_age=30):
+        self.source = pool
+        self.interval = interval
+        self.max_age = max_age
+        self._generation = None
+        self._previous = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def current(self):
+        """Generation answering the current request, None for the live database
+
+        The choice is kept for the whole request, so the ETag and the queries
+        of a view agree.
+        """
+        if 'snapshot' in g:
+            return g.snapshot
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot', daemon=True)
+                self._thread.start()
+            generation = self._generation
+        if request.args.get('fresh') == '1' or generation is None or generation.age() > self.max_age:
+            generation = None
+        g.snapshot = generation
+        return generation
+
+    def refresh(self):
+        """Copy the database if a table changed since the last copy; True if it did"""
+        start = time.monotonic()
+        # Read before the copy: the copy holds at least these changes
+        table_versions = versions.get_all()
+        current = self._generation
+        if current is not None and current.table_versions == table_versions:
+            current.fresh_at = start
+            return False
+
+        generation = Generation(self.source.size)
+        conn = self.source.acquire()
+        try:
+            conn.backup(generation.anchor)
+        except Exception:
+            generation.close()
+            raise
+        finally:
+            conn.close()
+        generation.table_versions = table_versions
+        generation.fresh_at = start
+        with self._lock:
+            retired, self._previous, self._generation = self._previous, self._generation, generation
+        if retired is not None:
+            retired.close()
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                log.exception('Snapshot refresh failed')
+            time.sleep(self.interval)
+
+    def stats(self):
+        generation = self._generation
+        return {'age': None if generation is None else round(generation.age(), 3)}
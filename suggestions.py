@@ -0,0 +1,143 @@
+import heapq
+import json
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+import changes
+
+# Autocompleted text columns: API entity -> (table, {API field: column})
+TEXT_FIELDS = {
+    'workers': ('workers', {'department': 'department'}),
+    'tasks': ('proposed_tasks', {'required_department': 'required_department', 'priority': 'priority'}),
+    'chiefs': ('chiefs', {'department': 'department', 'name': 'name'}),
+}
+
+# Skill junction of each table: (junction table, owner column)
+SKILL_JUNCTIONS = {
+    'workers': ('worker_skills', 'worker_id'),
+    'proposed_tasks': ('task_skills', 'task_id'),
+}
+
+
+class Vocabulary:
+    """Terms with their number of uses, sorted for prefix search"""
+
+    def __init__(self):
+        self.counts = {}
+        self._keys = []  # (casefolded term, term), sorted
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, term):
+        if term in self.counts:
+            self.counts[term] += 1
+        else:
+            self.counts[term] = 1
+            insort(self._keys, (term.casefold(), term))
+
+    def discard(self, term):
+        count = self.counts.get(term)
+        if count is None:
+            return
+        if count > 1:
+            self.counts[term] = count - 1
+            return
+        del self.counts[term]
+        key = (term.casefold(), term)
+        del self._keys[bisect_left(self._keys, key)]
+
+    def search(self, prefix='', limit=None):
+        """Terms starting with prefix (case-insensitive), most used first"""
+        prefix = prefix.casefold()
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + '\U0010ffff',)) if prefix else len(self._keys)
+        rank = lambda key: (-self.counts[key[1]], key)
+        if limit is None:
+            matches = sorted(self._keys[lo:hi], key=rank)
+        else:
+            matches = heapq.nsmallest(limit, self._keys[lo:hi], key=rank)
+        return [term for _, term in matches]
+
+
+class SuggestionIndex:
+    """Process-wide autocomplete vocabularies of skills and text columns.
+
+    Loaded lazily from the database on first use. Afterwards the rows
+    reported by changes.notify() are marked dirty and only those rows are
+    read again on the next search, their old terms swapped for the new ones.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.vocabularies = defaultdict(Vocabulary)
+        self.terms = {}  # (table, id) -> [(vocabulary name, term)]
+        self.dirty = defaultdict(set)
+
+    def reset(self):
+        """Drop everything; the next search reloads from the database"""
+        with self.lock:
+            self.loaded = False
+            self.vocabularies.clear()
+            self.terms.clear()
+            self.dirty.clear()
+
+    def on_change(self, table, op, row):
+        with self.lock:
+            if self.loaded and table in ('workers', 'proposed_tasks', 'chiefs'):
+                self.dirty[table].add(row['id'])
+
+    def search(self, conn, name, prefix='', limit=None):
+        """Suggestions of a vocabulary: 'skills' or '<entity>.<field>'"""
+        with self.lock:
+            self._sync(conn)
+            vocabulary = self.vocabularies.get(name)
+            return vocabulary.search(prefix, limit) if vocabulary else []
+
+    def _sync(self, conn):
+        cursor = conn.cursor()
+        if not self.loaded:
+            for entity, (table, fields) in TEXT_FIELDS.items():
+                self._read_rows(cursor, entity, table, fields, None)
+            self.loaded = True
+            return
+
+        for entity, (table, fields) in TEXT_FIELDS.items():
+            ids = self.dirty.pop(table, None)
+            if ids:
+                for row_id in ids:
+                    for name, term in self.terms.pop((table, row_id), ()):
+                        self.vocabularies[name].discard(term)
+                self._read_rows(cursor, entity, table, fields, ids)
+
+    def _read_rows(self, cursor, entity, table, fields, ids):
+        """Add the terms of the given rows (every row when ids is None)"""
+        id_filter = json.dumps(sorted(ids)) if ids is not None else None
+        columns = ', '.join(fields.values())
+        cursor.execute(f'''
+            SELECT id, {columns} FROM {table}
+            WHERE ? IS NULL OR id IN (SELECT value FROM json_each(?))
+        ''', (id_filter, id_filter))
+        for row in cursor.fetchall():
+            for field, column in fields.items():
+                if row[column]:
+                    self._add(table, row['id'], f'{entity}.{field}', row[column])
+
+        if table in SKILL_JUNCTIONS:
+            junction, owner = SKILL_JUNCTIONS[table]
+            cursor.execute(f'''
+                SELECT j.{owner} AS id, s.name FROM {junction} j
+                JOIN skills s ON s.id = j.skill_id
+                WHERE ? IS NULL OR j.{owner} IN (SELECT value FROM json_each(?))
+            ''', (id_filter, id_filter))
+            for row in cursor.fetchall():
+                self._add(table, row['id'], 'skills', row['name'])
+
+    def _add(self, table, row_id, name, term):
+        self.vocabularies[name].add(term)
+        self.terms.setdefault((table, row_id), []).append((name, term))
+
+
+index = SuggestionIndex()
+changes.listen(index.on_change)
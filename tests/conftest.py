@@ -0,0 +1,53 @@
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIG = '''\
+db:
+  path: {path}
+matching:
+  processes: 1
+metrics:
+  log: false
+'''
+
+
+@pytest.fixture(scope='session')
+def workdir(tmp_path_factory):
+    """Directory holding config.yaml and the initialized schema, read by init_db and server at import"""
+    directory = tmp_path_factory.mktemp('pairtache')
+    (directory / 'config.yaml').write_text(CONFIG.format(path=directory / 'pairtache.db'))
+    cwd = os.getcwd()
+    os.chdir(directory)
+    from init_db import init_db
+    init_db()
+    shutil.copy(directory / 'pairtache.db', directory / 'schema.db')
+    yield directory
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def db(workdir, tmp_path):
+    """Connection to a fresh, empty copy of the schema"""
+    path = tmp_path / 'test.db'
+    shutil.copy(workdir / 'schema.db', path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='session')
+def server(workdir):
+    import server
+    return server
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
@@ -0,0 +1,111 @@
+import pytest
+
+import booking
+
+
+@pytest.fixture
+def cursor(db):
+    """Two workers, three pending tasks and task 4 already assigned to worker 1 (2024-03-10 → 2024-03-20)"""
+    cursor = db.cursor()
+    cursor.executemany('INSERT INTO workers (name) VALUES (?)', [('Alice',), ('Bob',)])
+    cursor.execute("INSERT INTO chiefs (name) VALUES ('Chef')")
+    cursor.executemany('''
+        INSERT INTO proposed_tasks (chief_id, chief_name, title, status) VALUES (1, 'Chef', ?, ?)
+    ''', [('T1', 'pending'), ('T2', 'pending'), ('T3', 'pending'), ('T4', 'assignée')])
+    cursor.execute('''
+        INSERT INTO task_assignments (task_id, worker_id, start_date, end_date, status)
+        VALUES (4, 1, '2024-03-10', '2024-03-20', 'assignée')
+    ''')
+    return cursor
+
+
+def item(task_id, worker_id, start_date='2024-04-01', end_date='2024-04-05'):
+    return {'task_id': task_id, 'worker_id': worker_id, 'start_date': start_date, 'end_date': end_date}
+
+
+def errors(conflicts):
+    return [(conflict['index'], conflict['error']) for conflict in conflicts]
+
+
+def test_valid_batch(cursor):
+    assert booking.check(cursor, [item(1, 1), item(2, 2), item(3, 1, '2024-04-06', '2024-04-08')]) == []
+
+
+@pytest.mark.parametrize('bad, error', [
+    ({'task_id': 1, 'worker_id': 1, 'start_date': '2024-04-01'},
+     'Champs task_id, worker_id, start_date et end_date requis'),
+    ('pas un objet', 'Champs task_id, worker_id, start_date et end_date requis'),
+    (item(1, 1, '01/04/2024'), 'Dates invalides (format attendu : AAAA-MM-JJ)'),
+    (item(1, 1, '2024-04-05', '2024-04-01'), 'start_date postérieure à end_date'),
+    (item(99, 1), 'Tâche inconnue'),
+    (item(1, 99), 'Alternant inconnu'),
+    (item(4, 2), 'Tâche déjà assignée'),
+])
+def test_invalid_item(cursor, bad, error):
+    assert errors(booking.check(cursor, [item(2, 2), bad])) == [(1, error)]
+
+
+def test_overlap_with_confirmed_assignment(cursor):
+    conflicts = booking.check(cursor, [item(1, 1, '2024-03-20', '2024-03-25'), item(2, 2, '2024-03-15', '2024-03-16')])
+    assert errors(conflicts) == [(0, 'Alternant déjà assigné du 2024-03-10 au 2024-03-20')]
+    assert conflicts[0]['assignment_id'] == 1
+    assert conflicts[0]['other_task_id'] == 4
+
+
+def test_adjacent_to_confirmed_assignment(cursor):
+    assert booking.check(cursor, [item(1, 1, '2024-03-21', '2024-03-25'), item(2, 1, '2024-03-01', '2024-03-09')]) == []
+
+
+def test_task_twice_in_batch(cursor):
+    conflicts = booking.check(cursor, [item(1, 1), item(1, 2)])
+    assert errors(conflicts) == [(1, 'Tâche présente deux fois dans le lot')]
+    assert conflicts[0]['other_index'] == 0
+
+
+def test_overlap_within_batch(cursor):
+    conflicts = booking.check(cursor, [item(1, 1, '2024-04-01', '2024-04-05'),
+                                       item(2, 2, '2024-04-01', '2024-04-05'),
+                                       item(3, 1, '2024-04-05', '2024-04-09')])
+    assert errors(conflicts) == [(2, 'Chevauche une autre assignation du lot')]
+    assert conflicts[0]['other_index'] == 0
+
+
+def test_conflicts_sorted_by_index(cursor):
+    conflicts = booking.check(cursor, [item(1, 1), item(99, 1), {}])
+    assert [conflict['index'] for conflict in conflicts] == [1, 2]
+
+
+def test_confirm_inserts_and_assigns(cursor):
+    inserted = booking.confirm(cursor, [item(1, 1), item(2, 2)])
+    assert [(row['id'], row['task_id'], row['worker_id'], row['status']) for row in inserted] == [
+        (2, 1, 1, 'assignée'), (3, 2, 2, 'assignée')]
+    cursor.execute('SELECT id, status, matched_worker_id FROM proposed_tasks WHERE id IN (1, 2) ORDER BY id')
+    assert [tuple(row) for row in cursor.fetchall()] == [(1, 'assignée', 1), (2, 'assignée', 2)]
+    # Booked now: the same tasks cannot be confirmed twice
+    assert errors(booking.check(cursor, [item(1, 2, '2024-05-01', '2024-05-02')])) == [(0, 'Tâche déjà assignée')]
+
+
+def test_confirm_conflict_inserts_nothing(cursor):
+    with pytest.raises(booking.Conflict) as raised:
+        booking.confirm(cursor, [item(1, 1), item(2, 1, '2024-04-03', '2024-04-04')])
+    assert errors(raised.value.conflicts) == [(1, 'Chevauche une autre assignation du lot')]
+    assert cursor.execute('SELECT COUNT(*) FROM task_assignments').fetchone()[0] == 1
+
+
+def test_confirm_batch_endpoint(client):
+    worker = client.post('/api/workers', json={'name': 'Camille'}).json['id']
+    chief = client.post('/api/chiefs', json={'name': 'Chef'}).json['id']
+    tasks = [client.post('/api/tasks', json={'chief_id': chief, 'chief_name': 'Chef', 'title': title}).json['id']
+             for title in ('T1', 'T2')]
+
+    response = client.post('/api/assignments/confirm-batch', json={'assignments': [
+        item(tasks[0], worker, '2024-06-01', '2024-06-05'), item(tasks[1], worker, '2024-06-05', '2024-06-06')]})
+    assert response.status_code == 409
+    assert errors(response.json['conflicts']) == [(1, 'Chevauche une autre assignation du lot')]
+
+    response = client.post('/api/assignments/confirm-batch', json={'assignments': [
+        item(tasks[0], worker, '2024-06-01', '2024-06-05'), item(tasks[1], worker, '2024-06-06', '2024-06-07')]})
+    assert response.status_code == 201
+    assert len(response.json['ids']) == 2
+
+    assert client.post('/api/assignments/confirm-batch', json={'assignments': []}).status_code == 400
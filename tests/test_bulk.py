@@ -0,0 +1,107 @@
+import io
+
+import pytest
+
+import bulk
+
+
+def read(data, fmt):
+    return list(bulk.read_rows(io.BytesIO(data.encode()), fmt))
+
+
+def test_csv_line_numbers():
+    rows = read('name,skills\nA,"x,y"\n\nB,"deux\nlignes"\nC,z\n', 'csv')
+    assert rows[0] == (2, {'name': 'A', 'skills': 'x,y'})
+    assert rows[2] == (6, {'name': 'C', 'skills': 'z'})
+
+
+def test_csv_dialect_and_bom():
+    assert read('\ufeffname;email\nA;a@example.org\n', 'csv') == [(2, {'name': 'A', 'email': 'a@example.org'})]
+
+
+def test_csv_error_names_the_line():
+    with pytest.raises(bulk.RowError, match='ligne 3'):
+        read('name\nA\n"' + 'x' * 200000 + '"\n', 'csv')
+
+
+def test_jsonl_line_errors():
+    rows = read('{"name": "A"}\n\nnope\n[1]\n', 'jsonl')
+    assert rows[0] == (1, {'name': 'A'})
+    assert [(line, str(error)) for line, error in rows[1:]] == [(3, 'JSON invalide'), (4, 'Objet JSON attendu')]
+
+
+def test_unknown_format():
+    with pytest.raises(bulk.RowError):
+        read('', 'xlsx')
+
+
+@pytest.mark.parametrize('row, error', [
+    ({}, 'Champ name requis'),
+    ({'name': '  '}, 'Champ name requis'),
+    ({'name': ['A']}, 'Champ name : texte attendu'),
+    ({'name': 'A', 'skills': [1]}, 'Champ skills : liste de compétences attendue'),
+])
+def test_worker_errors(row, error):
+    with pytest.raises(bulk.RowError, match=error):
+        bulk.worker_values(row, {})
+
+
+def test_worker_values():
+    assert bulk.worker_values({'name': ' A ', 'skills': 'python, sql,', 'phone_number': ''}, {}) == {
+        'name': 'A', 'department': '', 'worker_chief': '', 'skills': ['python', 'sql'],
+        'phone_number': None, 'email': ''}
+
+
+@pytest.mark.parametrize('row, error', [
+    ({'worker_id': 'un', 'start_date': '2024-01-01', 'end_date': '2024-01-02'}, 'nombre entier attendu'),
+    ({'worker_id': True, 'start_date': '2024-01-01', 'end_date': '2024-01-02'}, 'nombre entier attendu'),
+    ({'worker_id': 9, 'start_date': '2024-01-01', 'end_date': '2024-01-02'}, 'Alternant 9 inconnu'),
+    ({'worker_id': 1, 'start_date': '01/01/2024', 'end_date': '2024-01-02'}, 'date AAAA-MM-JJ attendue'),
+    ({'worker_id': 1, 'start_date': 20240101, 'end_date': '2024-01-02'}, 'date AAAA-MM-JJ attendue'),
+    ({'worker_id': 1, 'end_date': '2024-01-02'}, 'Champ start_date requis'),
+    ({'worker_id': 1, 'start_date': '2024-01-03', 'end_date': '2024-01-02'}, 'postérieure'),
+])
+def test_availability_errors(row, error):
+    with pytest.raises(bulk.RowError, match=error):
+        bulk.availability_values(row, {'worker_ids': {1}})
+
+
+def test_task_values_fill_chief_name():
+    values = bulk.task_values({'chief_id': '2', 'title': 'T', 'start_date': '2024-01-01',
+                               'end_date': '2024-01-05'}, {'chiefs': {2: 'Chef'}})
+    assert (values['chief_id'], values['chief_name'], values['estimated_days']) == (2, 'Chef', 1)
+
+
+def post_csv(client, data, query=''):
+    return client.post(f'/api/import/workers?format=csv{query}', data=data.encode(), content_type='text/csv')
+
+
+def worker_count(client):
+    return len(client.get('/api/workers').json)
+
+
+def test_import_reports_line_errors(client):
+    before = worker_count(client)
+    response = post_csv(client, 'name,skills\nGaël,python\n,sql\nHélène,"a,b"\n')
+    assert response.status_code == 400
+    assert response.json['inserted'] == 0
+    assert response.json['errors'] == [{'line': 3, 'error': 'Champ name requis'}]
+    assert worker_count(client) == before
+
+
+def test_import_partial(client):
+    response = post_csv(client, 'name,skills\nInès,python\n,sql\nJade,"a,b"\n', '&partial=1')
+    assert response.status_code == 201
+    assert response.json == {'inserted': 2, 'errors': [{'line': 3, 'error': 'Champ name requis'}]}
+    names = {worker['name']: worker for worker in client.get('/api/workers?name=Jade').json}
+    assert sorted(names['Jade']['skills']) == ['a', 'b']
+
+
+def test_import_jsonl_and_bad_uploads(client):
+    response = client.post('/api/import/workers', data='{"name": "Kim"}\n'.encode(),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.json['inserted'] == 1
+    assert client.post('/api/import/workers?format=csv', data=b'name\n\xff\n').status_code == 400
+    assert client.post('/api/import/workers?format=xlsx', data=b'').status_code == 400
+    assert client.post('/api/import/chiefs?format=csv', data=b'name\nA\n').status_code == 404
@@ -0,0 +1,78 @@
+import pytest
+
+import change_log
+
+
+@pytest.fixture
+def cursor(db):
+    """change_log with versions 1 to 10, the first five logged 40 days ago"""
+    cursor = db.cursor()
+    cursor.executemany("INSERT INTO change_log (table_name, row_id, op) VALUES ('workers', ?, 'insert')",
+                       [(row_id,) for row_id in range(1, 11)])
+    cursor.execute("UPDATE change_log SET changed_at = datetime('now', '-40 days') WHERE version <= 5")
+    return cursor
+
+
+def versions(cursor):
+    return [row[0] for row in cursor.execute('SELECT version FROM change_log ORDER BY version')]
+
+
+def test_complete_since(cursor):
+    assert change_log.complete_since(cursor) == 0
+    cursor.execute('DELETE FROM change_log WHERE version <= 3')
+    assert change_log.complete_since(cursor) == 3
+    cursor.execute('DELETE FROM change_log')
+    assert change_log.complete_since(cursor) == 0
+
+
+def test_prune_keep_versions(cursor):
+    assert change_log.prune(cursor, keep_versions=4) == 6
+    assert versions(cursor) == [7, 8, 9, 10]
+    assert change_log.complete_since(cursor) == 6
+
+
+def test_prune_keep_days(cursor):
+    assert change_log.prune(cursor, keep_days=30) == 5
+    assert versions(cursor) == list(range(6, 11))
+
+
+def test_prune_stricter_limit_wins(cursor):
+    assert change_log.prune(cursor, keep_versions=8, keep_days=30) == 5
+    assert change_log.prune(cursor, keep_versions=2, keep_days=30) == 3
+    assert versions(cursor) == [9, 10]
+
+
+def test_prune_keeps_latest(cursor):
+    cursor.execute("UPDATE change_log SET changed_at = datetime('now', '-40 days')")
+    assert change_log.prune(cursor, keep_versions=0, keep_days=1) == 9
+    assert versions(cursor) == [10]
+
+
+def test_prune_nothing(cursor):
+    assert change_log.prune(cursor) == 0
+    assert change_log.prune(cursor, keep_versions=100, keep_days=100) == 0
+    cursor.execute('DELETE FROM change_log')
+    assert change_log.prune(cursor, keep_versions=0) == 0
+
+
+def test_changes_gone_after_prune(client, server, monkeypatch):
+    since = client.get('/api/changes').json['version']
+    worker = client.post('/api/workers', json={'name': 'Eden'}).json['id']
+    client.post('/api/workers', json={'name': 'Frédérique'})
+
+    response = client.get(f'/api/changes?since={since}')
+    assert response.status_code == 200
+    assert worker in [row['id'] for row in response.json['changes']['workers']['upserted']]
+    version = response.json['version']
+
+    monkeypatch.setitem(server.CHANGE_LOG_RETENTION, 'keep_versions', 1)
+    monkeypatch.setitem(server.CHANGE_LOG_RETENTION, 'keep_days', None)
+    assert client.post('/api/changes/prune').json['deleted'] > 0
+
+    response = client.get(f'/api/changes?since={since}')
+    assert response.status_code == 410
+    assert response.json['version'] == version
+    # Clients that reloaded after the prune are still served
+    assert client.get(f'/api/changes?since={version - 1}').status_code == 200
+    assert client.get(f'/api/changes?since={version}').json['changes']['workers'] == {'upserted': [], 'deleted': []}
+    assert client.get('/api/changes?since=hier').status_code == 400
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from availability_index import AvailabilityIndex
+from intervals import IntervalSet, from_day, to_day, to_days
+
+
+def random_intervals(rng, count, span=365, longest=30):
+    intervals = []
+    for key in range(count):
+        start = rng.randrange(span)
+        intervals.append((start, start + rng.randrange(longest), key))
+    return intervals
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_queries_match_brute_force(seed):
+    rng = random.Random(seed)
+    intervals = random_intervals(rng, 200)
+    # A single long interval widens every query slice
+    intervals.append((100, 300, 'long'))
+    index = IntervalSet(intervals)
+    for _ in range(200):
+        start = rng.randrange(-10, 380)
+        end = start + rng.randrange(20)
+        assert sorted(index.covering(start, end), key=str) == sorted(
+            (item for item in intervals if item[0] <= start and item[1] >= end), key=str)
+        assert sorted(index.overlapping(start, end), key=str) == sorted(
+            (item for item in intervals if item[0] <= end and item[1] >= start), key=str)
+
+
+def test_bounds_are_inclusive():
+    index = IntervalSet([(10, 20, 'a')])
+    assert index.covers(10, 20)
+    assert not index.covers(9, 20)
+    assert not index.covers(10, 21)
+    assert index.overlaps(20, 25)
+    assert index.overlaps(5, 10)
+    assert not index.overlaps(21, 25)
+    assert not index.overlaps(0, 9)
+
+
+def test_add_and_remove():
+    index = IntervalSet()
+    index.add(10, 20, 'a')
+    index.add(10, 20, 'b')
+    index.add(0, 5, 'c')
+    assert list(index) == [(0, 5, 'c'), (10, 20, 'a'), (10, 20, 'b')]
+    assert index.remove(10, 20, 'a')
+    assert not index.remove(10, 20, 'a')
+    assert not index.remove(10, 21, 'b')
+    assert list(index.overlapping(15, 15)) == [(10, 20, 'b')]
+    assert len(index) == 2
+
+
+def test_max_length_follows_added_intervals():
+    index = IntervalSet([(0, 2, 'a')])
+    index.add(0, 500, 'long')
+    assert index.max_length == 500
+    assert list(index.covering(400, 450)) == [(0, 500, 'long')]
+    index.remove(0, 500, 'long')
+    assert list(index.covering(400, 450)) == []
+
+
+def test_day_conversions():
+    assert from_day(to_day('2024-02-29')) == '2024-02-29'
+    assert to_day('2024-03-01 08:30:00') - to_day('2024-02-28') == 2
+    assert to_days('2024-01-01', '2024-01-31') == (to_day('2024-01-01'), to_day('2024-01-31'))
+    assert to_days(None, '2024-01-31') is None
+    assert to_days('2024-13-01', '2024-01-31') is None
+
+
+def row(id, worker_id, start_date, end_date):
+    return {'id': id, 'worker_id': worker_id, 'start_date': start_date, 'end_date': end_date}
+
+
+@pytest.fixture
+def index(db):
+    db.executemany('INSERT INTO availability_periods (worker_id, start_date, end_date) VALUES (?, ?, ?)', [
+        (1, '2024-01-01', '2024-01-31'),
+        (2, '2024-01-10', '2024-02-10'),
+        (3, 'janvier', '2024-01-31'),
+    ])
+    db.execute('''
+        INSERT INTO task_assignments (task_id, worker_id, start_date, end_date, status)
+        VALUES (1, 2, '2024-01-15', '2024-01-16', 'assignée')
+    ''')
+    index = AvailabilityIndex()
+    index.load(db)
+    return index
+
+
+def test_free_workers(index):
+    assert index.free_workers('2024-01-10', '2024-01-14') == [1, 2]
+    assert index.free_workers('2024-01-10', '2024-01-15') == [1]
+    assert index.free_workers('2024-01-20', '2024-02-05') == [2]
+    assert index.free_workers('2023-12-31', '2024-01-05') == []
+
+
+def test_free_workers_follow_changes(index):
+    index.on_change('task_assignments', 'insert', row(2, 1, '2024-01-12', '2024-01-12'))
+    index.on_change('availability_periods', 'insert', row(4, 3, '2024-01-01', '2024-01-31'))
+    assert index.free_workers('2024-01-10', '2024-01-14') == [2, 3]
+    index.on_change('task_assignments', 'delete', row(2, 1, '2024-01-12', '2024-01-12'))
+    index.on_change('workers', 'delete', {'id': 2})
+    assert index.free_workers('2024-01-10', '2024-01-14') == [1, 3]
+    assert index.overlapping_assignments('2024-01-01', '2024-12-31') == []
+
+
+def test_available_workers_endpoint(client):
+    worker = client.post('/api/workers', json={'name': 'Dominique'}).json['id']
+    assert client.post('/api/availability', json={
+        'workerId': worker, 'startDate': '2031-05-01', 'endDate': '2031-05-31'}).status_code == 201
+
+    response = client.get('/api/workers/available?start=2031-05-02&end=2031-05-30')
+    assert response.status_code == 200
+    assert [found['id'] for found in response.json] == [worker]
+    assert client.get('/api/workers/available?start=2031-05-02&end=2031-06-01').json == []
+    assert client.get('/api/workers/available?start=2031-05-02').status_code == 400
+    assert client.get('/api/workers/available?start=mai&end=2031-05-30').status_code == 400
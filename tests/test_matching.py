@@ -0,0 +1,47 @@
+import random
+import pytest
+import matching
+
+scipy_optimize = pytest.importorskip('scipy.optimize')
+
+
+def total(weights, pairs):
+    return sum(weights[pair] for pair in pairs)
+
+
+def random_weights(n_rows, n_cols, density, seed):
+    rng = random.Random(seed)
+    return {(row, col): rng.randint(1, 100)
+            for row in range(n_rows) for col in range(n_cols) if rng.random() < density}
+
+
+@pytest.mark.parametrize('n_rows,n_cols', [(1, 1), (5, 5), (8, 3), (3, 8), (20, 30), (30, 12)])
+@pytest.mark.parametrize('density', [0.2, 1.0])
+def test_python_solver_matches_scipy(monkeypatch, n_rows, n_cols, density):
+    for seed in range(5):
+        weights = random_weights(n_rows, n_cols, density, seed)
+        with_scipy = matching.solve_assignment(weights, n_rows, n_cols)
+        monkeypatch.setattr(matching, 'linear_sum_assignment', None)
+        pure_python = matching.solve_assignment(weights, n_rows, n_cols)
+        monkeypatch.undo()
+
+        assert total(weights, pure_python) == total(weights, with_scipy)
+        for pairs in (with_scipy, pure_python):
+            assert all(pair in weights for pair in pairs)
+            assert len({row for row, _ in pairs}) == len(pairs)
+            assert len({col for _, col in pairs}) == len(pairs)
+
+
+def test_no_candidates():
+    assert matching.solve_assignment({}, 3, 2) == []
+
+
+def test_optimal_plan_never_books_a_worker_twice():
+    workers = [{'id': i, 'name': f'w{i}', 'department': 'A', 'skills': 'py'} for i in (1, 2)]
+    availability = [{'id': i, 'worker_id': i, 'start_date': '2025-01-01', 'end_date': '2025-12-31'} for i in (1, 2)]
+    tasks = [{'id': i, 'title': f't{i}', 'required_skills': 'py', 'required_department': 'A',
+              'start_date': '2025-03-01', 'end_date': '2025-03-10', 'priority': 'moyenne'} for i in (1, 2, 3)]
+    matches, plan, unassigned = matching.optimal_plan(tasks, workers, availability, [])
+    assert len(plan) == 2
+    assert len({entry['worker_id'] for entry in plan}) == 2
+    assert len(unassigned) == 1
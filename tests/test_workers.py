@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def workers(client):
+    """Ids of workers whose names exercise the name filter, created once for the module"""
+    names = ['Léa Martin', 'Léo Martinez', 'Noé 100%', 'Zoé_B', 'Zoé\\B']
+    return {name: client.post('/api/workers', json={'name': name, 'skills': ['python']}).json['id']
+            for name in names}
+
+
+@pytest.fixture(scope='module')
+def client(server):
+    return server.app.test_client()
+
+
+def names(response):
+    assert response.status_code == 200
+    return sorted(worker['name'] for worker in response.json)
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('martin', ['Léa Martin', 'Léo Martinez']),
+    ('Martinez', ['Léo Martinez']),
+    ('%', ['Noé 100%']),
+    ('_', ['Zoé_B']),
+    ('\\', ['Zoé\\B']),
+    ('zoé', ['Zoé\\B', 'Zoé_B']),
+])
+def test_name_filter(client, workers, name, expected):
+    assert names(client.get('/api/workers', query_string={'name': name})) == sorted(expected)
+
+
+def test_pages_cover_the_list(client, workers):
+    everyone = client.get('/api/workers').json
+    seen, cursor = [], None
+    while True:
+        page = client.get('/api/workers', query_string={'limit': 2, **({'cursor': cursor} if cursor else {})}).json
+        assert len(page['items']) <= 2
+        seen += page['items']
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert [worker['id'] for worker in seen] == [worker['id'] for worker in everyone]
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=501', 'limit=deux', 'cursor=%25%25'])
+def test_invalid_pagination(client, query):
+    response = client.get(f'/api/workers?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_fields_projection(client, workers):
+    response = client.get('/api/workers', query_string={'name': 'Léa', 'fields': 'id,name'})
+    assert response.json == [{'id': workers['Léa Martin'], 'name': 'Léa Martin'}]
+
+
+def test_etag(client, workers):
+    response = client.get('/api/workers')
+    etag = response.headers['ETag']
+    assert client.get('/api/workers', headers={'If-None-Match': etag}).status_code == 304
+    client.put(f"/api/workers/{workers['Noé 100%']}", json={'name': 'Noé 100%', 'department': 'R&D'})
+    assert client.get('/api/workers', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_unknown_worker(client):
+    assert client.put('/api/workers/999999', json={'name': 'Personne'}).status_code == 404
+    assert client.put('/api/workers/999999', json={}).status_code == 400
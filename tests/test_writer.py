@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+from concurrent.futures import Future
+import pytest
+from writer import WriteQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    path = str(tmp_path / 'test.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+    conn.commit()
+    conn.close()
+
+    def connect():
+        return sqlite3.connect(path, check_same_thread=False)
+
+    queue = WriteQueue(connect, window=0.05)
+    queue.names = lambda: [row[0] for row in connect().execute('SELECT name FROM items ORDER BY id')]
+    return queue
+
+
+def insert(name):
+    def operation(cursor):
+        cursor.execute('INSERT INTO items (name) VALUES (?)', (name,))
+        return cursor.lastrowid
+    return operation
+
+
+def submit_all(queue, operations):
+    """Submit operations from concurrent threads; returns their results or exceptions in order"""
+    outcomes = [None] * len(operations)
+
+    def run(i, operation):
+        try:
+            outcomes[i] = queue.submit(operation)
+        except Exception as error:
+            outcomes[i] = error
+
+    threads = [threading.Thread(target=run, args=(i, operation)) for i, operation in enumerate(operations)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive(), 'submit() never returned'
+    return outcomes
+
+
+def test_submit_returns_result(queue):
+    assert queue.submit(insert('a')) == 1
+    assert queue.names() == ['a']
+
+
+def test_failed_operation_is_rolled_back_alone(queue):
+    outcomes = submit_all(queue, [insert('a'), insert('a'), insert('b')])
+    assert sum(isinstance(outcome, sqlite3.IntegrityError) for outcome in outcomes) == 1
+    assert sorted(queue.names()) == ['a', 'b']
+
+
+def execute_batch(queue, operations):
+    """Run operations as one batch of the writer; returns their exceptions (None when committed)"""
+    batch = [(operation, None, Future()) for operation in operations]
+    queue._execute(queue.connect(), batch)
+    assert all(future.done() for _, _, future in batch), 'a caller would wait forever'
+    return [future.exception() for _, _, future in batch]
+
+
+def test_lost_transaction_fails_the_rest_of_the_batch(queue):
+    def lose_transaction(cursor):
+        cursor.execute('INSERT INTO items (name) VALUES (?)', ('lost',))
+        # What SQLite does on disk full or I/O errors
+        cursor.execute('ROLLBACK')
+        raise sqlite3.OperationalError('disk I/O error')
+
+    errors = execute_batch(queue, [insert('a'), lose_transaction, insert('b')])
+    assert all(isinstance(error, sqlite3.OperationalError) for error in errors)
+    assert queue.names() == []
+
+
+def test_every_caller_is_answered_when_the_queue_itself_fails(queue):
+    def release_savepoint(cursor):
+        # The queue's own RELEASE then fails: no such savepoint
+        cursor.execute('RELEASE operation')
+
+    errors = execute_batch(queue, [insert('a'), release_savepoint, insert('b')])
+    assert all(isinstance(error, sqlite3.OperationalError) for error in errors)
+    assert queue.names() == []
+    # The queue still serves the next batches
+    assert queue.submit(insert('c')) is not None
+    assert queue.names() == ['c']
@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import request, has_request_context
+
+# WSGI environ key of the request's Trace (shared with the job threads, which copy the request)
+ENVIRON_KEY = 'pairtache.trace'
+
+
+class Trace:
+    """Timings of one request: wall time, SQL queries and named phases (json, compress)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = []  # [sql, seconds, rows]
+        self.phases = defaultdict(float)
+        self.threads = {threading.get_ident()}
+
+    def query(self, sql):
+        record = [sql, 0.0, 0]
+        self.queries.append(record)
+        return record
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def db_time(self):
+        return sum(record[1] for record in self.queries)
+
+    @property
+    def rows(self):
+        return sum(record[2] for record in self.queries)
+
+    def server_timing(self, total):
+        """Server-Timing header value: db, json, compress, the rest of the app, total"""
+        db = self.db_time
+        parts = [f'db;dur={db * 1000:.2f};desc="{len(self.queries)} queries, {self.rows} rows"']
+        parts += [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in self.phases.items()]
+        app = total - db - sum(self.phases.values())
+        parts += [f'app;dur={max(app, 0) * 1000:.2f}', f'total;dur={total * 1000:.2f}']
+        return ', '.join(parts)
+
+    def slowest(self, count=10):
+        """The slowest queries, SQL on one line"""
+        ordered = sorted(self.queries, key=lambda record: record[1], reverse=True)[:count]
+        return [{'sql': ' '.join(sql.split()), 'ms': round(seconds * 1000, 2), 'rows': rows}
+                for sql, seconds, rows in ordered]
+
+
+def current():
+    """Trace of the current request, None outside a request or when tracing is off"""
+    if not has_request_context():
+        return None
+    return request.environ.get(ENVIRON_KEY)
+
+
+class TracedCursor:
+    """sqlite3 cursor recording the time and row count of each statement in a Trace
+
+    Fetching is timed with the statement that produced the rows: SQLite does
+    most of the work of a SELECT while stepping through its results.
+    """
+
+    def __init__(self, cursor, trace):
+        self._cursor = cursor
+        self._trace = trace
+        self._record = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._record[1] += time.perf_counter() - start
+
+    def _executed(self):
+        # Writes report their row count, reads count the rows as they are fetched
+        if self._cursor.description is None and self._cursor.rowcount > 0:
+            self._record[2] = self._cursor.rowcount
+        return self
+
+    def execute(self, sql, parameters=()):
+        self._record = self._trace.query(sql)
+        self._timed(self._cursor.execute, sql, parameters)
+        return self._executed()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._record = self._trace.query(sql)
+        self._timed(self._cursor.executemany, sql, seq_of_parameters)
+        return self._executed()
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._record[2] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        self._record[2] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._record[2] += len(rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(256)
+            if not rows:
+                return
+            yield from rows
+
+
+class TracedConnection:
+    """Connection (pooled or not) whose statements and commits are recorded in a Trace"""
+
+    def __init__(self, conn, trace):
+        self._conn = conn
+        self._trace = trace
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def cursor(self):
+        return TracedCursor(self._conn.cursor(), self._trace)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        record = self._trace.query('COMMIT')
+        start = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            record[1] += time.perf_counter() - start
+
+
+def _folded(frame):
+    """Stack of a frame in the folded format of flamegraph.pl / speedscope (root first)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """Sampling profiler for slow requests
+
+    While a request runs, the stacks of its threads (the request thread and
+    the job thread of an offloaded view) are sampled every `interval`
+    seconds. Requests slower than `threshold` seconds get their samples
+    written to `directory` as folded stacks, one file per request:
+
+        flamegraph.pl profiles/*.folded > flame.svg
+    """
+
+    def __init__(self, interval=0.005, threshold=0.5, directory='profiles'):
+        self.interval = interval
+        self.threshold = threshold
+        self.directory = directory
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self, trace):
+        with self._lock:
+            self._active[trace] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampler', daemon=True)
+                self._thread.start()
+
+    def end(self, trace, name):
+        """Stop sampling the request; returns the path of its profile if it was slow"""
+        with self._lock:
+            stacks = self._active.pop(trace, None)
+        elapsed = trace.elapsed()
+        if not stacks or elapsed < self.threshold:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-')
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}-{elapsed * 1000:.0f}ms.folded')
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for trace, stacks in self._active.items():
+                    for ident in tuple(trace.threads):
+                        frame = frames.get(ident)
+                        if frame is not None and ident != me:
+                            stacks[_folded(frame)] += 1
@@ -0,0 +1,29 @@
+import threading
+from collections import defaultdict
+import changes
+
+_lock = threading.Lock()
+_versions = defaultdict(int)
+
+
+def bump(table):
+    """Mark a table as changed"""
+    with _lock:
+        _versions[table] += 1
+
+
+def get(*tables):
+    """Current version of each table, usable as a cache key"""
+    with _lock:
+        return tuple(_versions[table] for table in tables)
+
+
+def get_all():
+    """Versions of every table changed since startup, as a dict"""
+    with _lock:
+        return dict(_versions)
+
+
+@changes.listen
+def _on_change(table, op, row):
+    bump(table)
@@ -0,0 +1,133 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+import tracing
+
+
+class WriteQueue:
+    """Single writer thread committing the writes of concurrent requests together
+
+    Requests submit operation(cursor) and wait for its result. The thread
+    takes the operations queued within `window` seconds of the first one
+    (at most `max_batch`) and runs them in one BEGIN IMMEDIATE transaction,
+    each in its own savepoint: an operation that raises is rolled back
+    alone and its caller gets the exception, the others share one commit
+    (one fsync) and never wait on each other for the write lock.
+    """
+
+    def __init__(self, connect, window=0.002, max_batch=64):
+        self.connect = connect
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, operation, trace=None):
+        """Run operation(cursor) in the writer thread; returns its result or raises its exception
+
+        The statements of the operation and the shared commit are recorded
+        in `trace` (the Trace of the calling request).
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='writer', daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((operation, trace, future))
+        return future.result()
+
+    def _run(self):
+        conn = self.connect()
+        # Transactions and savepoints are issued explicitly
+        conn.isolation_level = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._execute(conn, batch)
+            with self._lock:
+                self.batches += 1
+                self.writes += len(batch)
+
+    def _execute(self, conn, batch):
+        try:
+            self._commit_batch(conn, batch)
+        except Exception as error:
+            # A statement of the queue itself failed (ROLLBACK TO, RELEASE, ...):
+            # nothing of the batch is committed, and no caller may be left waiting
+            if conn.in_transaction:
+                try:
+                    conn.execute('ROLLBACK')
+                except sqlite3.Error:
+                    pass
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+
+    def _commit_batch(self, conn, batch):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as error:
+            for _, _, future in batch:
+                future.set_exception(error)
+            return
+
+        done = []  # (future, result, trace) of the operations to commit
+        lost = None  # error that made SQLite roll back the whole transaction
+        for operation, trace, future in batch:
+            if lost is not None:
+                # Without a transaction the operation would be committed on its own
+                future.set_exception(lost)
+                continue
+            cursor = conn.cursor()
+            if trace is not None:
+                cursor = tracing.TracedCursor(cursor, trace)
+            conn.execute('SAVEPOINT operation')
+            try:
+                result = operation(cursor)
+            except Exception as error:
+                future.set_exception(error)
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK TO operation')
+                    conn.execute('RELEASE operation')
+                else:
+                    # Some errors (disk full, ...) make SQLite roll back the whole transaction
+                    lost = error
+                    for earlier, _, _ in done:
+                        earlier.set_exception(error)
+                    done = []
+                continue
+            conn.execute('RELEASE operation')
+            done.append((future, result, trace))
+
+        if not done:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            return
+        start = time.perf_counter()
+        try:
+            conn.execute('COMMIT')
+        except sqlite3.Error as error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for future, _, _ in done:
+                future.set_exception(error)
+            return
+        seconds = time.perf_counter() - start
+        for future, result, trace in done:
+            if trace is not None:
+                trace.query('COMMIT')[1] = seconds
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {'queued': self._queue.qsize(), 'batches': self.batches, 'writes': self.writes}